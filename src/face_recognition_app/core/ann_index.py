@@ -0,0 +1,260 @@
+"""
+ann_index.py
+Index approximatif (IVF) des plus proches voisins, en NumPy pur.
+
+Pour les galeries de 100k+ visages, comparer chaque visage détecté à toute la
+galerie domine le CPU. L'index partitionne la galerie en `nlist` cellules par
+k-means ; une requête n'explore que les `nprobe` cellules les plus proches.
+
+Les distances des candidats sont recalculées exactement sur les vecteurs float32
+de la galerie (re-ranking). En mode borné, on explore en plus toute cellule
+pouvant encore contenir un vecteur plus proche que le k-ième trouvé ou que le
+seuil de reconnaissance (inégalité triangulaire : d(q, x) ≥ d(q, c) − rayon(c)) :
+les décisions reconnu / inconnu sont alors garanties identiques à la recherche
+exhaustive. En dimension 128 cette borne élague peu : ce mode sert surtout de
+référence, nprobe reste le réglage rappel / latence en production.
+
+Les lignes de l'index sont celles de la galerie : un ajout se fait en fin de
+tableau, une suppression décale les lignes suivantes (comme le store).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+KMEANS_ITERATIONS = 10
+TRAIN_POINTS_PER_LIST = 256
+# Marge sur la borne inférieure : couvre l'arrondi float32 des rayons
+_BOUND_SLACK = 1e-3
+_CHUNK_ROWS = 8192
+
+
+def _sq_norms(x: np.ndarray) -> np.ndarray:
+    return np.einsum("ij,ij->i", x, x)
+
+
+def nearest_centroids(data: np.ndarray, centroids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Retourne (indice, distance) du centroïde le plus proche de chaque ligne."""
+    c_sq = _sq_norms(centroids)
+    assign = np.empty(len(data), dtype=np.int32)
+    dist = np.empty(len(data), dtype=np.float32)
+    for start in range(0, len(data), _CHUNK_ROWS):
+        chunk = data[start:start + _CHUNK_ROWS]
+        d2 = c_sq[None, :] - 2.0 * (chunk @ centroids.T)
+        best = np.argmin(d2, axis=1)
+        assign[start:start + len(chunk)] = best
+        d2_best = d2[np.arange(len(chunk)), best] + _sq_norms(chunk)
+        dist[start:start + len(chunk)] = np.sqrt(np.maximum(d2_best, 0.0))
+    return assign, dist
+
+
+def kmeans(data: np.ndarray, k: int, iterations: int = KMEANS_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """K-means (Lloyd) : retourne les k centroïdes."""
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assign, _ = nearest_centroids(data, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, data)
+        counts = np.bincount(assign, minlength=k)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        # Cellule vide : on la ré-ensemence sur un point aléatoire
+        if empty.any():
+            centroids[empty] = data[rng.choice(len(data), size=int(empty.sum()), replace=False)]
+    return centroids
+
+
+class IVFIndex:
+    """
+    Index à listes inversées (IVF-Flat). Immuable : appended() / deleted()
+    retournent une nouvelle instance, ce qui permet des lectures sans verrou.
+
+    Usage :
+        index = IVFIndex.build(matrix)
+        rows, dists = index.search(matrix, probes, k=1, nprobe=16)[0]
+    """
+
+    def __init__(
+        self,
+        centroids: np.ndarray,
+        radii: np.ndarray,
+        assign: np.ndarray,
+        trained_size: int,
+    ) -> None:
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.radii = np.asarray(radii, dtype=np.float32)
+        self.assign = np.asarray(assign, dtype=np.int32)
+        self.trained_size = int(trained_size)
+        self._c_sq = _sq_norms(self.centroids)
+        # Listes inversées au format CSR : lignes triées par cellule
+        self._order = np.argsort(self.assign, kind="stable").astype(np.int64)
+        self._offsets = np.searchsorted(
+            self.assign[self._order], np.arange(len(self.centroids) + 1)
+        )
+
+    # ── Construction ──────────────────────────────────────────────────────────
+
+    @classmethod
+    def build(
+        cls,
+        matrix: np.ndarray,
+        nlist: Optional[int] = None,
+        iterations: int = KMEANS_ITERATIONS,
+        seed: int = 0,
+    ) -> "IVFIndex":
+        data = np.ascontiguousarray(matrix, dtype=np.float32)
+        n = len(data)
+        if n == 0:
+            raise ValueError("Impossible de construire un index sur une galerie vide")
+        if nlist is None:
+            nlist = int(np.clip(np.sqrt(n), 1, 4096))
+        nlist = min(nlist, n)
+
+        rng = np.random.default_rng(seed)
+        train_size = min(n, nlist * TRAIN_POINTS_PER_LIST)
+        train = data if train_size == n else data[rng.choice(n, size=train_size, replace=False)]
+        centroids = kmeans(train, nlist, iterations, seed)
+
+        assign, dist = nearest_centroids(data, centroids)
+        radii = np.zeros(nlist, dtype=np.float32)
+        np.maximum.at(radii, assign, dist)
+        logger.info("Index IVF construit : %d vecteur(s), %d liste(s)", n, nlist)
+        return cls(centroids, radii, assign, trained_size=n)
+
+    # ── Mises à jour incrémentales ────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return len(self.assign)
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    def appended(self, vectors: np.ndarray) -> "IVFIndex":
+        """Nouvel index avec des vecteurs ajoutés en fin de galerie."""
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        assign, dist = nearest_centroids(vectors, self.centroids)
+        radii = self.radii.copy()
+        np.maximum.at(radii, assign, dist)
+        return IVFIndex(
+            self.centroids, radii, np.concatenate([self.assign, assign]), self.trained_size,
+        )
+
+    def deleted(self, rows) -> "IVFIndex":
+        """Nouvel index sans les lignes données (les suivantes sont décalées)."""
+        # Les rayons restent des bornes supérieures valides
+        return IVFIndex(
+            self.centroids, self.radii, np.delete(self.assign, list(rows)), self.trained_size,
+        )
+
+    def needs_retrain(self) -> bool:
+        """Les centroïdes dérivent quand la galerie a doublé ou fondu de moitié."""
+        n = len(self)
+        return n > 2 * self.trained_size or n < self.trained_size // 2
+
+    # ── Recherche ─────────────────────────────────────────────────────────────
+
+    def search(
+        self,
+        matrix: np.ndarray,
+        probes: np.ndarray,
+        k: int = 1,
+        nprobe: int = 16,
+        max_distance: float = float("inf"),
+        bounded: bool = False,
+        sq_norms: Optional[np.ndarray] = None,
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Recherche les k plus proches lignes de `matrix` pour chaque probe.
+
+        nprobe       : cellules explorées d'office (compromis rappel / latence)
+        max_distance : en mode borné, les cellules dont la borne inférieure
+                       dépasse ce seuil ne sont jamais explorées
+        bounded      : explore les cellules restantes pouvant contenir un
+                       meilleur voisin → résultat exact
+        Retourne, pour chaque probe, (lignes, distances) triées par distance.
+        """
+        probes = np.atleast_2d(np.asarray(probes, dtype=np.float32))
+        if sq_norms is None:
+            sq_norms = _sq_norms(matrix)
+        nprobe = max(1, min(nprobe, self.nlist))
+
+        p_sq = _sq_norms(probes)
+        dc = np.sqrt(np.maximum(p_sq[:, None] + self._c_sq[None, :] - 2.0 * (probes @ self.centroids.T), 0.0))
+
+        results = []
+        for i, probe in enumerate(probes):
+            list_order = np.argsort(dc[i])
+            rows, dists = self._scan(matrix, sq_norms, probe, p_sq[i], list_order[:nprobe])
+            rows, dists = self._top_k(rows, dists, k)
+
+            if bounded and nprobe < self.nlist:
+                bound = max_distance
+                if len(dists) == k:
+                    bound = min(bound, float(dists[-1]))
+                remaining = list_order[nprobe:]
+                lower = dc[i, remaining] - self.radii[remaining] - _BOUND_SLACK
+                extra = remaining[lower < bound]
+                if extra.size:
+                    e_rows, e_dists = self._scan(matrix, sq_norms, probe, p_sq[i], extra)
+                    rows, dists = self._top_k(
+                        np.concatenate([rows, e_rows]), np.concatenate([dists, e_dists]), k,
+                    )
+            results.append((rows, dists))
+        return results
+
+    def _scan(self, matrix, sq_norms, probe, probe_sq, lists) -> Tuple[np.ndarray, np.ndarray]:
+        """Distances exactes (re-ranking float32) entre la probe et les lignes des cellules."""
+        parts = [self._order[self._offsets[c]:self._offsets[c + 1]] for c in lists]
+        rows = np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+        if rows.size == 0:
+            return rows, np.empty(0, dtype=np.float32)
+        d2 = probe_sq + sq_norms[rows] - 2.0 * (matrix[rows] @ probe)
+        return rows, np.sqrt(np.maximum(d2, 0.0))
+
+    @staticmethod
+    def _top_k(rows: np.ndarray, dists: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if len(dists) > k:
+            keep = np.argpartition(dists, k - 1)[:k]
+            rows, dists = rows[keep], dists[keep]
+        order = np.argsort(dists, kind="stable")
+        return rows[order], dists[order]
+
+    # ── Persistance ───────────────────────────────────────────────────────────
+
+    def save(self, path: Path, generation: int) -> None:
+        """Sauvegarde atomique (.npz) avec la génération du store couverte."""
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                centroids=self.centroids,
+                radii=self.radii,
+                assign=self.assign,
+                trained_size=np.int64(self.trained_size),
+                generation=np.int64(generation),
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional[Tuple["IVFIndex", int]]:
+        """Retourne (index, génération) ou None si le fichier est absent / illisible."""
+        try:
+            with np.load(path) as data:
+                index = cls(
+                    data["centroids"], data["radii"], data["assign"], int(data["trained_size"]),
+                )
+                return index, int(data["generation"])
+        except (OSError, KeyError, ValueError) as exc:
+            if Path(path).exists():
+                logger.warning("Index ANN illisible (%s) : %s", path, exc)
+            return None
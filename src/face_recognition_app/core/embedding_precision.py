@@ -0,0 +1,234 @@
+"""
+embedding_precision.py
+Précision de stockage en mémoire de la galerie d'encodages.
+
+Le store conserve toujours des float32 sur disque ; la galerie chargée pour
+l'appariement peut être réduite sur les nœuds à mémoire limitée :
+
+  float32 → 512 octets par visage (défaut, BLAS direct)
+  float16 → 256 octets par visage
+  int8    → 132 octets par visage (128 octets + une échelle float32 par vecteur :
+            x ≈ scale · q, q ∈ [-127, 127])
+
+Les produits scalaires sont calculés par blocs de lignes converties en float32 :
+la mémoire transitoire reste bornée et le calcul passe toujours par BLAS.
+
+Rapport de précision :
+    python -m face_recognition_app.core.embedding_precision
+compare les décisions reconnu / inconnu de chaque précision avec un calcul
+float64 de référence sur la galerie existante.
+"""
+
+from __future__ import annotations
+
+import argparse
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from ..storage.matrix_store import EMBEDDING_DIM
+
+PRECISIONS = ("float32", "float16", "int8")
+INT8_MAX = 127
+_CHUNK_ROWS = 8192
+# accuracy_report : probes par bloc telles que bloc × galerie ≤ ce nombre de distances
+_REPORT_BLOCK_DISTANCES = 1 << 22
+
+
+class QuantizedMatrix:
+    """
+    Matrice (N, 128) stockée en float32, float16 ou int8 (+ échelle par ligne).
+    Immuable. L'indexation (matrix[rows]) retourne des lignes déquantifiées float32,
+    ce qui permet de l'utiliser telle quelle dans IVFIndex.search.
+    """
+
+    def __init__(self, data: np.ndarray, precision: str, scales: Optional[np.ndarray] = None) -> None:
+        if precision not in PRECISIONS:
+            raise ValueError(f"Précision inconnue : {precision!r} (attendu : {', '.join(PRECISIONS)})")
+        self.data = data
+        self.precision = precision
+        self.scales = scales
+
+    # ── Construction ──────────────────────────────────────────────────────────
+
+    @classmethod
+    def from_float(cls, matrix, precision: str = "float32") -> "QuantizedMatrix":
+        """Quantifie une matrice float (ndarray ou memmap, lue par blocs)."""
+        matrix = np.asarray(matrix).reshape(-1, EMBEDDING_DIM)
+        n = len(matrix)
+        if precision == "float32":
+            # Copie : la galerie ne doit pas dépendre d'une memmap (réécrite à la suppression)
+            return cls(np.array(matrix, dtype=np.float32, order="C"), precision)
+        if precision == "float16":
+            data = np.empty((n, EMBEDDING_DIM), dtype=np.float16)
+            for start in range(0, n, _CHUNK_ROWS):
+                data[start:start + _CHUNK_ROWS] = matrix[start:start + _CHUNK_ROWS]
+            return cls(data, precision)
+        if precision == "int8":
+            data = np.empty((n, EMBEDDING_DIM), dtype=np.int8)
+            scales = np.empty(n, dtype=np.float32)
+            for start in range(0, n, _CHUNK_ROWS):
+                chunk = np.asarray(matrix[start:start + _CHUNK_ROWS], dtype=np.float32)
+                scale = np.abs(chunk).max(axis=1) / INT8_MAX
+                scale[scale == 0] = 1.0
+                data[start:start + len(chunk)] = np.clip(
+                    np.rint(chunk / scale[:, None]), -INT8_MAX, INT8_MAX,
+                )
+                scales[start:start + len(chunk)] = scale
+            return cls(data, precision, scales)
+        raise ValueError(f"Précision inconnue : {precision!r} (attendu : {', '.join(PRECISIONS)})")
+
+    @classmethod
+    def concatenate(cls, parts: Iterable["QuantizedMatrix"], precision: str) -> "QuantizedMatrix":
+        parts = list(parts)
+        if not parts:
+            return cls.from_float(np.empty((0, EMBEDDING_DIM), dtype=np.float32), precision)
+        data = np.concatenate([p.data for p in parts])
+        scales = np.concatenate([p.scales for p in parts]) if precision == "int8" else None
+        return cls(data, precision, scales)
+
+    def take(self, rows) -> "QuantizedMatrix":
+        """Sous-matrice (toujours quantifiée) des lignes données."""
+        scales = self.scales[rows] if self.scales is not None else None
+        return QuantizedMatrix(self.data[rows], self.precision, scales)
+
+    # ── Accès ─────────────────────────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def __getitem__(self, rows) -> np.ndarray:
+        """Lignes déquantifiées en float32."""
+        out = np.asarray(self.data[rows], dtype=np.float32)
+        if self.scales is not None:
+            out = out * self.scales[rows][..., None]
+        return out
+
+    def dequantize(self) -> np.ndarray:
+        return self[:]
+
+    def sq_norms(self) -> np.ndarray:
+        """Normes au carré des lignes déquantifiées (cohérentes avec dot())."""
+        out = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), _CHUNK_ROWS):
+            chunk = self[start:start + _CHUNK_ROWS]
+            out[start:start + len(chunk)] = np.einsum("ij,ij->i", chunk, chunk)
+        return out
+
+    def dot(self, probes: np.ndarray) -> np.ndarray:
+        """Produits scalaires (M, N) entre des probes float32 et les lignes."""
+        probes = np.atleast_2d(np.asarray(probes, dtype=np.float32))
+        if self.precision == "float32":
+            return probes @ self.data.T
+        out = np.empty((len(probes), len(self)), dtype=np.float32)
+        for start in range(0, len(self), _CHUNK_ROWS):
+            chunk = np.asarray(self.data[start:start + _CHUNK_ROWS], dtype=np.float32)
+            block = probes @ chunk.T
+            if self.scales is not None:
+                block *= self.scales[start:start + len(chunk)][None, :]
+            out[:, start:start + len(chunk)] = block
+        return out
+
+
+# ── Rapport de précision ──────────────────────────────────────────────────────
+
+def accuracy_report(
+    names,
+    matrix,
+    threshold: float,
+    probes: Optional[np.ndarray] = None,
+    precisions: Iterable[str] = PRECISIONS,
+    noise: float = 0.03,
+    max_probes: int = 1000,
+    seed: int = 0,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Compare, pour chaque précision, les décisions (nom reconnu ou inconnu au
+    seuil threshold) avec un calcul float64 de référence.
+
+    Sans probes fournies, on simule de nouvelles captures : des lignes de la
+    galerie tirées au hasard, bruitées (écart-type noise).
+
+    Retourne {précision: {"agreement", "max_distance_error", "bytes_per_face"}}.
+    """
+    from .gallery_matcher import GalleryMatcher
+
+    names = list(names)
+    reference = np.asarray(matrix, dtype=np.float64).reshape(-1, EMBEDDING_DIM)
+    if probes is None:
+        rng = np.random.default_rng(seed)
+        picked = rng.choice(len(reference), size=min(max_probes, len(reference)), replace=False)
+        probes = reference[picked] + rng.normal(0, noise, size=(len(picked), EMBEDDING_DIM))
+    probes = np.atleast_2d(np.asarray(probes, dtype=np.float64))
+
+    matchers = {p: GalleryMatcher(names, matrix, precision=p) for p in precisions}
+    agree = dict.fromkeys(matchers, 0)
+    max_error = dict.fromkeys(matchers, 0.0)
+    ref_sq = np.einsum("ij,ij->i", reference, reference)
+
+    # Par blocs de probes : jamais de matrice (M, N) complète en mémoire
+    block = max(1, _REPORT_BLOCK_DISTANCES // max(len(reference), 1))
+    for start in range(0, len(probes), block):
+        chunk = probes[start:start + block]
+        ref_dist = _reference_distances(chunk, reference, ref_sq)
+        best = np.argmin(ref_dist, axis=1)
+        best_dist = ref_dist[np.arange(len(chunk)), best]
+        ref_names = [names[j] if d < threshold else None for j, d in zip(best, best_dist)]
+        for precision, matcher in matchers.items():
+            results = matcher.best(chunk, threshold)
+            agree[precision] += sum(r[0] == n for r, n in zip(results, ref_names))
+            error = float(np.max(np.abs(matcher.distances(chunk) - ref_dist)))
+            max_error[precision] = max(max_error[precision], error)
+
+    return {
+        precision: {
+            "agreement": agree[precision] / len(probes),
+            "max_distance_error": max_error[precision],
+            "bytes_per_face": matcher.gallery.nbytes / max(len(matcher), 1),
+        }
+        for precision, matcher in matchers.items()
+    }
+
+
+def _reference_distances(probes: np.ndarray, reference: np.ndarray, ref_sq: np.ndarray) -> np.ndarray:
+    """Distances float64 (M, N) d'un bloc de probes ; ref_sq : normes² de reference."""
+    d2 = np.einsum("ij,ij->i", probes, probes)[:, None] + ref_sq[None, :] - 2.0 * (probes @ reference.T)
+    return np.sqrt(np.maximum(d2, 0.0))
+
+
+def main(argv=None) -> None:
+    from ..storage.config import FACE_RECOGNITION_THRESHOLD
+    from ..storage.encodings_store import load_embedding_matrix
+
+    parser = argparse.ArgumentParser(description="Précision des décisions selon le stockage de la galerie")
+    parser.add_argument("--threshold", type=float, default=FACE_RECOGNITION_THRESHOLD)
+    parser.add_argument("--noise", type=float, default=0.03)
+    parser.add_argument("--probes", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    names, matrix = load_embedding_matrix()
+    if not names:
+        print("Galerie vide : rien à comparer.")
+        return
+    report = accuracy_report(
+        names, np.array(matrix), args.threshold, noise=args.noise, max_probes=args.probes,
+    )
+    print(f"Galerie : {len(names)} visage(s), seuil {args.threshold}")
+    for precision, stats in report.items():
+        print(
+            f"  {precision:<8} décisions identiques à float64 : {stats['agreement']:.2%}"
+            f"   |Δd| max : {stats['max_distance_error']:.5f}"
+            f"   {stats['bytes_per_face']:.0f} o/visage"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""
+gallery_matcher.py
+Appariement vectorisé d'encodages contre la galerie des visages connus.
+
+Toutes les voies de reconnaissance (moteur de surveillance, webcam, importeurs,
+détection de doublons) passent par GalleryMatcher : la galerie est empilée une
+seule fois en matrice float32 (N×128) avec ses normes au carré précalculées,
+puis un lot de M encodages est comparé en un seul produit matriciel (BLAS) :
+
+    d²(p, g) = ‖p‖² + ‖g‖² − 2·p·g
+
+Les distances sont identiques (à l'arrondi float32 près) à face_recognition.face_distance.
+
+Une personne peut avoir plusieurs échantillons. En mode "compact" (GALLERY_MODE),
+chaque personne est représentée par son centroïde et quelques exemplaires
+diversifiés (médoïdes d'un k-means) : le coût reste O(identités) tout en
+profitant des enrôlements multiples.
+
+La galerie peut être gardée en mémoire en float32 (défaut), float16 ou int8
+(EMBEDDING_PRECISION, voir embedding_precision.py) ; les probes restent en float32.
+
+Pour les très grandes galeries, un index IVF (voir ann_index.py) restreint les
+candidats ; leurs distances restent calculées exactement sur la matrice.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..storage import encodings_store
+from ..storage.config import (
+    ANN_BOUNDED_SEARCH,
+    ANN_MIN_GALLERY_SIZE,
+    ANN_NPROBE,
+    EMBEDDING_PRECISION,
+    GALLERY_MODE,
+    MAX_EXEMPLARS_PER_IDENTITY,
+)
+from ..storage.matrix_store import EMBEDDING_DIM
+from .ann_index import IVFIndex, kmeans
+from .embedding_precision import QuantizedMatrix
+
+EXEMPLAR_KMEANS_ITERATIONS = 5
+
+
+@dataclass(frozen=True)
+class Match:
+    name: str
+    distance: float
+    index: int      # ligne dans la galerie
+
+
+def compact_identity(samples, max_exemplars: int = MAX_EXEMPLARS_PER_IDENTITY) -> np.ndarray:
+    """
+    Représentation compacte d'une personne : centroïde + au plus max_exemplars
+    exemplaires (l'échantillon réel le plus proche de chaque centre k-means).
+    Avec peu d'échantillons (≤ max_exemplars), ils sont tous conservés tels quels.
+    """
+    samples = np.atleast_2d(np.asarray(samples, dtype=np.float32))
+    if len(samples) <= max_exemplars:
+        return samples
+    centers = kmeans(samples, max_exemplars, iterations=EXEMPLAR_KMEANS_ITERATIONS)
+    d2 = (
+        np.einsum("ij,ij->i", centers, centers)[:, None]
+        - 2.0 * (centers @ samples.T)
+        + np.einsum("ij,ij->i", samples, samples)[None, :]
+    )
+    medoids = np.unique(np.argmin(d2, axis=1))
+    centroid = samples.mean(axis=0, keepdims=True)
+    return np.concatenate([centroid, samples[medoids]])
+
+
+class GalleryMatcher:
+    """
+    Galerie immuable : pour prendre en compte de nouveaux encodages, construire
+    une nouvelle instance et remplacer la référence (lecture sans verrou).
+
+    Usage :
+        matcher = GalleryMatcher.from_store()
+        for name, dist in matcher.best(encodings, threshold=0.5):
+            ...
+    """
+
+    def __init__(
+        self,
+        names: Sequence[str],
+        matrix,
+        keys: Optional[Sequence[str]] = None,
+        index: Optional[IVFIndex] = None,
+        nprobe: int = ANN_NPROBE,
+        bounded: bool = ANN_BOUNDED_SEARCH,
+        precision: str = EMBEDDING_PRECISION,
+    ) -> None:
+        self._names = list(names)
+        self._keys = list(keys) if keys is not None else None
+        if isinstance(matrix, QuantizedMatrix):
+            self._gallery = matrix
+        else:
+            if not self._names:
+                matrix = np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+            # Une memmap est quantifiée par blocs, sans copie float32 intermédiaire
+            self._gallery = QuantizedMatrix.from_float(
+                np.asarray(matrix).reshape(len(self._names), EMBEDDING_DIM), precision,
+            )
+        self._precision = self._gallery.precision
+        self._sq_norms = self._gallery.sq_norms()
+        # Index ANN optionnel : ignoré s'il ne couvre pas exactement la galerie
+        self._index = index if index is not None and len(index) == len(self._names) else None
+        self._nprobe = nprobe
+        self._bounded = bounded
+
+    # ── Construction ──────────────────────────────────────────────────────────
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[dict]) -> "GalleryMatcher":
+        """Construit depuis une liste [{"name": ..., "encoding": ...}] (load_existing_encodings)."""
+        entries = list(entries)
+        if not entries:
+            return cls([], None)
+        return cls([e["name"] for e in entries], np.stack([e["encoding"] for e in entries]))
+
+    @classmethod
+    def from_samples(
+        cls,
+        samples_by_name: Dict[str, np.ndarray],
+        max_exemplars: int = MAX_EXEMPLARS_PER_IDENTITY,
+    ) -> "GalleryMatcher":
+        """
+        Galerie compacte : lignes = compact_identity() de chaque personne,
+        clés = nom (with_changes remplace alors toutes les lignes d'une personne).
+        """
+        names: List[str] = []
+        parts = []
+        for name, samples in samples_by_name.items():
+            rows = compact_identity(samples, max_exemplars)
+            names.extend([name] * len(rows))
+            parts.append(rows)
+        matrix = np.concatenate(parts) if parts else None
+        index = None
+        if len(names) >= ANN_MIN_GALLERY_SIZE:
+            index = IVFIndex.build(matrix)
+        return cls(names, matrix, keys=names, index=index)
+
+    @classmethod
+    def from_store(cls, mode: str = GALLERY_MODE, shard: Optional[str] = None) -> "GalleryMatcher":
+        """
+        Galerie d'un shard du store (None = shard par défaut).
+        mode "compact" : voir from_samples.
+        mode "samples" : un échantillon par ligne (clés = uids) + index ANN
+        persisté s'il est à jour.
+        """
+        if mode == "compact":
+            return cls.from_samples(encodings_store.load_samples_by_name(shard=shard))
+
+        uids, names, matrix = encodings_store.load_embedding_snapshot(shard)
+        index = None
+        if len(uids) >= ANN_MIN_GALLERY_SIZE:
+            index = encodings_store.load_ann_index(expected_size=len(uids), shard=shard)
+        return cls(names, matrix, keys=uids, index=index)
+
+    def with_identities(
+        self,
+        samples_by_name: Dict[str, np.ndarray],
+        names: Iterable[str],
+        max_exemplars: int = MAX_EXEMPLARS_PER_IDENTITY,
+    ) -> "GalleryMatcher":
+        """
+        Galerie compacte : recalcule les lignes des personnes names à partir de
+        samples_by_name (une personne absente de samples_by_name est retirée).
+        """
+        added = [
+            (name, name, row)
+            for name in names if name in samples_by_name
+            for row in compact_identity(samples_by_name[name], max_exemplars)
+        ]
+        return self.with_changes(removed_keys=names, added=added)
+
+    def with_changes(
+        self,
+        removed_keys: Iterable[str] = (),
+        added: Iterable[Tuple[str, str, np.ndarray]] = (),
+    ) -> "GalleryMatcher":
+        """
+        Nouvelle galerie sans removed_keys puis avec added [(key, name, encoding)]
+        en fin de matrice — même ordre que le store, l'index ANN suit.
+        Une clé déjà présente et ré-ajoutée est remplacée (deltas rejoués).
+        """
+        if self._keys is None:
+            raise ValueError("with_changes() nécessite une galerie construite avec des clés")
+        added = list(added)
+        removed = set(removed_keys) | {a[0] for a in added}
+        rows = [i for i, key in enumerate(self._keys) if key in removed]
+        keep = np.setdiff1d(np.arange(len(self._keys)), rows)
+
+        keys = [self._keys[i] for i in keep] + [a[0] for a in added]
+        names = [self._names[i] for i in keep] + [a[1] for a in added]
+        parts = [self._gallery.take(keep)]
+        if added:
+            new_rows = np.asarray([a[2] for a in added], dtype=np.float32)
+            parts.append(QuantizedMatrix.from_float(new_rows, self._precision))
+        gallery = QuantizedMatrix.concatenate(parts, self._precision)
+
+        index = self._index
+        if index is not None:
+            if rows:
+                index = index.deleted(rows)
+            if added:
+                index = index.appended(new_rows)
+            # Centroïdes dérivés : réentraînement (ou abandon sous le seuil ANN)
+            if index.needs_retrain():
+                index = None
+                if len(gallery) >= ANN_MIN_GALLERY_SIZE:
+                    matrix = gallery.data if self._precision == "float32" else gallery.dequantize()
+                    index = IVFIndex.build(matrix)
+        return GalleryMatcher(names, gallery, keys=keys, index=index,
+                              nprobe=self._nprobe, bounded=self._bounded)
+
+    # ── Propriétés ────────────────────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._names)
+
+    @property
+    def keys(self) -> Optional[List[str]]:
+        return list(self._keys) if self._keys is not None else None
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Galerie déquantifiée en float32 (copie si précision réduite)."""
+        return self._gallery.data if self._precision == "float32" else self._gallery.dequantize()
+
+    @property
+    def gallery(self) -> QuantizedMatrix:
+        return self._gallery
+
+    @property
+    def precision(self) -> str:
+        return self._precision
+
+    @property
+    def index(self) -> Optional[IVFIndex]:
+        return self._index
+
+    # ── Appariement ───────────────────────────────────────────────────────────
+
+    def distances(self, probes) -> np.ndarray:
+        """Matrice (M, N) des distances euclidiennes entre les probes et la galerie."""
+        probes = np.atleast_2d(np.asarray(probes, dtype=np.float32))
+        if not self._names or probes.size == 0:
+            return np.empty((probes.shape[0], len(self._names)), dtype=np.float32)
+        p_sq = np.einsum("ij,ij->i", probes, probes)
+        d2 = self._gallery.dot(probes)
+        d2 *= -2.0
+        d2 += p_sq[:, None]
+        d2 += self._sq_norms[None, :]
+        np.maximum(d2, 0.0, out=d2)
+        return np.sqrt(d2, out=d2)
+
+    def match(self, probes, k: int = 1, max_distance: float = float("inf")) -> List[List[Match]]:
+        """
+        Retourne, pour chaque probe, les k plus proches entrées triées par distance.
+        max_distance ne sert qu'à élaguer la recherche ANN (voir IVFIndex.search).
+        """
+        probes = np.atleast_2d(np.asarray(probes, dtype=np.float32))
+        if self._index is not None and k > 0 and probes.size:
+            found = self._index.search(
+                self._gallery, probes, k=k, nprobe=self._nprobe,
+                max_distance=max_distance, bounded=self._bounded, sq_norms=self._sq_norms,
+            )
+            return [
+                [Match(self._names[j], float(d), int(j)) for j, d in zip(rows, dists)]
+                for rows, dists in found
+            ]
+
+        dist = self.distances(probes)
+        n = dist.shape[1]
+        if n == 0 or k <= 0:
+            return [[] for _ in range(dist.shape[0])]
+        k = min(k, n)
+        if k < n:
+            idx = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        else:
+            idx = np.broadcast_to(np.arange(n), dist.shape)
+        order = np.argsort(np.take_along_axis(dist, idx, axis=1), axis=1)
+        idx = np.take_along_axis(idx, order, axis=1)
+        return [
+            [Match(self._names[j], float(dist[i, j]), int(j)) for j in row]
+            for i, row in enumerate(idx)
+        ]
+
+    def best(self, probes, threshold: float) -> List[Tuple[Optional[str], float]]:
+        """
+        Pour chaque probe : (nom, distance) de la meilleure entrée, nom = None si
+        distance ≥ threshold. Distance = inf si la galerie est vide.
+        """
+        results = []
+        for matches in self.match(probes, k=1, max_distance=threshold):
+            if not matches:
+                results.append((None, float("inf")))
+                continue
+            best = matches[0]
+            results.append((best.name if best.distance < threshold else None, best.distance))
+        return results
+
+
+def best_across(
+    matchers: Sequence[GalleryMatcher], probes, threshold: float,
+) -> List[Tuple[Optional[str], float]]:
+    """best() sur plusieurs galeries (shards) : la plus petite distance l'emporte."""
+    probes = np.atleast_2d(np.asarray(probes, dtype=np.float32))
+    results: List[Tuple[Optional[str], float]] = [(None, float("inf"))] * len(probes)
+    for matcher in matchers:
+        for i, (name, dist) in enumerate(matcher.best(probes, threshold)):
+            if dist < results[i][1]:
+                results[i] = (name, dist)
+    return results
+
+
+# ── Galerie partagée (UI, importeurs) ─────────────────────────────────────────
+
+_shared_matchers: Dict[str, Tuple[tuple, GalleryMatcher]] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_gallery_matcher(shard: Optional[str] = None) -> GalleryMatcher:
+    """
+    Retourne un GalleryMatcher sur un shard du store courant, reconstruit
+    uniquement quand la génération du shard a changé (voir encodings_generation).
+    """
+    directory = str(encodings_store.shard_directory(shard))
+    key = (directory, encodings_store.encodings_generation(shard))
+    with _shared_lock:
+        cached = _shared_matchers.get(directory)
+        if cached is None or cached[0] != key:
+            cached = (key, GalleryMatcher.from_store(shard=shard))
+            _shared_matchers[directory] = cached
+        return cached[1]
@@ -1,11 +1,12 @@
 from datetime import datetime
-from face_recognition import compare_faces, face_distance
 
+from face_recognition_app.core.gallery_matcher import GalleryMatcher
 from face_recognition_app.storage.config import DUPLICATE_TOLERANCE, FACE_RECOGNITION_THRESHOLD
 from face_recognition_app.storage.encodings_store import (
     delete_encoding as _delete_encoding,
     load_existing_encodings as _load_existing_encodings,
     save_face_encoding as _save_face_encoding,
+    save_face_encodings_bulk as _save_face_encodings_bulk,
     update_metadata_entry as _update_metadata_entry,
     validate_encoding as _validate_encoding,
 )
@@ -19,16 +20,21 @@ def save_face_encoding(name, encoding, image):
     _save_face_encoding(name, encoding, image)
 
 
+def save_face_encodings_bulk(items):
+    return _save_face_encodings_bulk(items)
+
+
 def is_duplicate(encoding, existing_encodings, tolerance=DUPLICATE_TOLERANCE):
-    encodings_list = [e["encoding"] for e in existing_encodings]
-    matches = compare_faces(encodings_list, encoding, tolerance + 0.1)
-
-    for i, match in enumerate(matches):
-        if match:
-            distance = face_distance([existing_encodings[i]["encoding"]], encoding)[0]
-            if distance < tolerance:
-                return existing_encodings[i]["name"]
-    return None
+    """
+    Retourne le nom du visage existant le plus proche si sa distance est < tolerance.
+    existing_encodings : liste [{"name", "encoding"}] ou GalleryMatcher déjà construit.
+    """
+    if isinstance(existing_encodings, GalleryMatcher):
+        matcher = existing_encodings
+    else:
+        matcher = GalleryMatcher.from_entries(existing_encodings)
+    name, _ = matcher.best(encoding, tolerance)[0]
+    return name
 
 
 def validate_encoding(data):
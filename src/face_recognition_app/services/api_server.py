@@ -8,10 +8,12 @@ Endpoints :
   GET  /api/events          → événements récents (query: limit, camera, person)
   GET  /api/events/<id>     → détail d'un événement + snapshot base64
   GET  /api/faces           → personnes enregistrées dans la base
+  GET  /api/faces/<uid>/thumbnail → miniature d'un encodage (JPEG, lue à la demande)
   GET  /api/clips           → liste des clips vidéo disponibles
   POST /api/surveillance/start  → démarrer la surveillance
   POST /api/surveillance/stop   → arrêter la surveillance
   GET  /api/snapshot/<uid>  → dernière frame d'une caméra (JPEG)
+  GET  /api/metrics         → latences par étape et compteurs par caméra (Prometheus)
 
 Le serveur tourne dans un thread daemon et s'arrête avec l'application.
 """
@@ -84,6 +86,10 @@ class ApiServer:
                 "cameras_running": len(self._mgr.get_all_sources()),
             })
 
+        @app.route("/api/metrics")
+        def metrics():
+            return Response(self._engine.prometheus_metrics(), mimetype="text/plain; version=0.0.4")
+
         # ── Caméras ───────────────────────────────────────────────────────────
 
         @app.route("/api/cameras")
@@ -95,10 +101,13 @@ class ApiServer:
 
         @app.route("/api/snapshot/<uid>")
         def snapshot(uid: str):
-            frame = self._mgr.get_frame(uid)
+            frame = self._mgr.get_display_frame(uid)
             if frame is None:
                 return jsonify({"error": "Caméra indisponible"}), 404
-            ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
+            try:
+                ok, buf = cv2.imencode(".jpg", frame.image, [cv2.IMWRITE_JPEG_QUALITY, 70])
+            finally:
+                frame.release()
             if not ok:
                 return jsonify({"error": "Encodage échoué"}), 500
             return Response(buf.tobytes(), mimetype="image/jpeg")
@@ -149,12 +158,25 @@ class ApiServer:
 
         @app.route("/api/faces")
         def faces():
-            from ..storage.encodings_store import load_metadata
-            meta = load_metadata()
+            from ..storage.encodings_store import load_face_entries
             return jsonify([
-                {"uid": uid, **info} for uid, info in meta.items()
+                {
+                    "uid": e["uid"],
+                    "name": e["name"],
+                    "date_creation": e["date_creation"],
+                    "thumbnail": f"/api/faces/{e['uid']}/thumbnail" if e["has_thumbnail"] else None,
+                }
+                for e in load_face_entries()
             ])
 
+        @app.route("/api/faces/<uid>/thumbnail")
+        def face_thumbnail(uid: str):
+            from ..storage.encodings_store import load_thumbnail_bytes
+            jpeg = load_thumbnail_bytes(uid)
+            if jpeg is None:
+                return jsonify({"error": "Miniature introuvable"}), 404
+            return Response(jpeg, mimetype="image/jpeg")
+
         # ── Clips ─────────────────────────────────────────────────────────────
 
         @app.route("/api/clips")
@@ -38,6 +38,9 @@ class CameraManager:
         self._sources: Dict[str, CameraSource] = {}
         # Callbacks invoqués quand une caméra est ajoutée / supprimée
         self._on_change_callbacks: List[Callable[[], None]] = []
+        # Frames gardées par chaque source pour l'historique de l'enregistreur
+        self._history_frames = 0
+        self._history_fps = 0.0
         self._load()
 
     # ── Persistence ──────────────────────────────────────────────────────────
@@ -90,6 +93,12 @@ class CameraManager:
             self.start_camera(uid)
         self._notify()
 
+    def save_config(self, config: CameraConfig) -> None:
+        """Persiste des réglages d'analyse modifiés sans redémarrer la source."""
+        if config.uid in self._configs:
+            self._configs[config.uid] = config
+            self._save()
+
     def list_configs(self) -> List[CameraConfig]:
         return list(self._configs.values())
 
@@ -110,6 +119,7 @@ class CameraManager:
             return True   # déjà active
 
         source = create_camera_source(config)
+        source.reserve_history(self._history_frames, self._history_fps)
         ok = source.start()
         if ok:
             self._sources[uid] = source
@@ -139,6 +149,36 @@ class CameraManager:
         source = self._sources.get(uid)
         return source.get_frame() if source else None
 
+    def get_display_frame(self, uid: str):
+        """Dernière Frame d'affichage de la caméra uid, référence acquise (None si indisponible)."""
+        source = self._sources.get(uid)
+        return source.get_display_frame() if source else None
+
+    def get_latest(self, uid: str):
+        """Dernière Frame de la caméra uid, référence acquise (None si indisponible)."""
+        source = self._sources.get(uid)
+        return source.get_latest() if source else None
+
+    def wait_frame(self, uid: str, after_seq: int = 0, timeout: Optional[float] = None):
+        """Prochaine Frame de la caméra uid (voir CameraSource.wait_frame), ou None."""
+        source = self._sources.get(uid)
+        return source.wait_frame(after_seq, timeout) if source else None
+
+    def get_history(self, uid: str, count: int, after_seq: int = 0) -> list:
+        """Dernières Frame de la caméra uid (seq > after_seq), références acquises."""
+        source = self._sources.get(uid)
+        return source.get_history(count, after_seq) if source else []
+
+    def reserve_history(self, frames: int, fps: float = 0.0) -> None:
+        """
+        Chaque source (actuelle ou future) garde au moins frames images
+        d'historique, à fps images/s au moins (0 = toutes).
+        """
+        self._history_frames = max(self._history_frames, frames)
+        self._history_fps = fps
+        for source in list(self._sources.values()):
+            source.reserve_history(frames, fps)
+
     def get_source(self, uid: str) -> Optional[CameraSource]:
         return self._sources.get(uid)
 
@@ -7,23 +7,79 @@ Supporte :
   - IPCameraSource : flux RTSP ou HTTP-MJPEG (caméras IP, smartphones)
                      → Android : application "IP Webcam"  → http://<ip>:8080/video
                      → iOS     : application "EpoCam"     → rtsp://<ip>/live
+
+Chaque image lue devient une Frame (frame.py) numérotée, partagée sans copie :
+get_latest() et get_display_frame() en prennent une référence, get_frame()
+en renvoie une copie.
+Une caméra peut fournir deux flux (VideoStream) : un sous-flux basse
+résolution pour l'analyse et le flux principal pour l'enregistrement.
+Les images sont lues dans les slots réutilisés d'un FrameRing (frame_ring.py),
+qui garde aussi l'historique demandé par l'enregistreur (get_history).
+wait_frame() bloque jusqu'à la publication d'une frame plus récente.
+
+Décodage à la demande (CameraConfig.decode_on_demand) : le flux avance par
+grab() et n'est décodé (retrieve()) que si une frame est attendue — appel en
+cours de wait_frame(), lecture par get_latest()/get_frame() depuis le dernier
+décodage, ou historique réservé par l'enregistreur, à la cadence de ses clips
+seulement. Les numéros de séquence comptent les images du flux, décodées ou non.
+
+Options de décodage par caméra (CameraConfig) : backend OpenCV, transport
+RTSP (TCP/UDP), taille du tampon de capture, décodage des seules images clés,
+décodage matériel et nombre de threads du décodeur. Les options FFmpeg passent
+par OPENCV_FFMPEG_CAPTURE_OPTIONS, lue à l'ouverture : elle est positionnée
+sous verrou le temps d'ouvrir la capture.
 """
 
 from __future__ import annotations
 
 import logging
+import os
 import threading
 import time
 import uuid
 from abc import ABC
 from dataclasses import dataclass, field
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 
 import cv2
 import numpy as np
 
+from .frame import Frame
+from .frame_ring import FrameRing
+
 logger = logging.getLogger(__name__)
 
+# Backends de capture OpenCV (CameraConfig.capture_backend)
+CAPTURE_BACKENDS = {
+    "": cv2.CAP_ANY,
+    "ffmpeg": cv2.CAP_FFMPEG,
+    "gstreamer": cv2.CAP_GSTREAMER,
+    "v4l2": cv2.CAP_V4L2,
+    "dshow": cv2.CAP_DSHOW,
+    "msmf": cv2.CAP_MSMF,
+}
+# Décodage matériel (CameraConfig.hw_acceleration)
+HW_ACCELERATIONS = {
+    "": cv2.VIDEO_ACCELERATION_NONE,
+    "any": cv2.VIDEO_ACCELERATION_ANY,
+    "vaapi": cv2.VIDEO_ACCELERATION_VAAPI,
+    "d3d11": cv2.VIDEO_ACCELERATION_D3D11,
+    "mfx": cv2.VIDEO_ACCELERATION_MFX,
+}
+RTSP_TRANSPORTS = ("", "tcp", "udp")
+# Décodage à la demande : une frame d'historique est décodée dès que 75 % de
+# l'intervalle de l'enregistreur est écoulé (gigue de la capture)
+HISTORY_PACE_TOLERANCE = 0.25
+
+# Version du format de CameraConfig.to_dict. Les fichiers sans version (v1)
+# enregistraient detection_model="hog" par défaut, champ alors ignoré par le
+# moteur : relu comme "" (détecteur du profil actif).
+CONFIG_VERSION = 2
+
+_FFMPEG_OPTIONS_ENV = "OPENCV_FFMPEG_CAPTURE_OPTIONS"
+# OPENCV_FFMPEG_CAPTURE_OPTIONS est globale au processus
+_open_lock = threading.Lock()
+
 
 # ── Configuration ────────────────────────────────────────────────────────────
 
@@ -44,11 +100,64 @@ class CameraConfig:
     # Zone d'intérêt ROI (x, y, w, h) en pixels, None = toute l'image
     roi: Optional[Tuple[int, int, int, int]] = None
 
-    # Modèle de détection : "hog" (CPU) | "cnn" (GPU/plus précis)
-    detection_model: str = "hog"
+    # Détecteur : "" (celui du profil actif) | "hog" | "cnn" | "haar" | "yunet"
+    # | cascade "haar+hog", "yunet+hog" (voir face_detectors.py)
+    detection_model: str = ""
+
+    # Shards de la galerie comparés pour cette caméra ([] = ceux du profil actif)
+    encoding_shards: List[str] = field(default_factory=list)
+
+    # Réduction de la frame avant détection et suréchantillonnage du détecteur.
+    # auto_calibrate : les apprendre d'après la taille des visages observés
+    # (voir detection_calibrator.py) ; désactivé une fois la calibration finie.
+    detection_scale: float = 0.5
+    detection_upsample: int = 1
+    auto_calibrate: bool = False
+
+    # Décodage : backend OpenCV ("" = auto, voir CAPTURE_BACKENDS), transport
+    # RTSP ("" | "tcp" | "udp"), tampon de capture en frames (0 = défaut),
+    # images clés seulement (FFmpeg), décodage matériel ("" | "any" | "vaapi"…),
+    # threads du décodeur (0 = défaut)
+    capture_backend: str = ""
+    rtsp_transport: str = ""
+    buffer_size: int = 0
+    keyframes_only: bool = False
+    hw_acceleration: str = ""
+    decode_threads: int = 0
+    # grab() en continu, décodage seulement quand un consommateur attend
+    decode_on_demand: bool = False
+
+    # Double flux : sous-flux basse résolution pour l'analyse, flux principal
+    # pour l'enregistrement ("" = source). ROI et positions des visages sont
+    # exprimées dans la résolution du flux d'analyse.
+    analysis_source: str = ""
+    recording_source: str = ""
+
+    def stream_sources(self) -> Tuple[str | int, str | int]:
+        """(flux d'analyse, flux d'enregistrement)."""
+        return self.analysis_source or self.source, self.recording_source or self.source
+
+    def ffmpeg_options(self, keyframes: bool = True) -> str:
+        """Options FFmpeg ("clé;valeur|…") correspondant aux réglages de décodage."""
+        options = []
+        if self.rtsp_transport:
+            options.append(f"rtsp_transport;{self.rtsp_transport}")
+        if self.keyframes_only and keyframes:
+            options.append("avdiscard;nonkey")
+        return "|".join(options)
+
+    def capture_params(self) -> List[int]:
+        """Paramètres d'ouverture de cv2.VideoCapture (paires propriété, valeur)."""
+        params: List[int] = []
+        if self.hw_acceleration:
+            params += [cv2.CAP_PROP_HW_ACCELERATION, HW_ACCELERATIONS[self.hw_acceleration]]
+        if self.decode_threads > 0:
+            params += [cv2.CAP_PROP_N_THREADS, self.decode_threads]
+        return params
 
     def to_dict(self) -> dict:
         return {
+            "version": CONFIG_VERSION,
             "uid": self.uid,
             "name": self.name,
             "source_type": self.source_type,
@@ -58,11 +167,27 @@ class CameraConfig:
             "height": self.height,
             "roi": list(self.roi) if self.roi else None,
             "detection_model": self.detection_model,
+            "encoding_shards": list(self.encoding_shards),
+            "detection_scale": self.detection_scale,
+            "detection_upsample": self.detection_upsample,
+            "auto_calibrate": self.auto_calibrate,
+            "capture_backend": self.capture_backend,
+            "rtsp_transport": self.rtsp_transport,
+            "buffer_size": self.buffer_size,
+            "keyframes_only": self.keyframes_only,
+            "hw_acceleration": self.hw_acceleration,
+            "decode_threads": self.decode_threads,
+            "decode_on_demand": self.decode_on_demand,
+            "analysis_source": self.analysis_source,
+            "recording_source": self.recording_source,
         }
 
     @classmethod
     def from_dict(cls, data: dict) -> "CameraConfig":
         roi_raw = data.get("roi")
+        detection_model = data.get("detection_model", "")
+        if data.get("version", 1) < 2 and detection_model == "hog":
+            detection_model = ""
         return cls(
             uid=data.get("uid", uuid.uuid4().hex[:8]),
             name=data["name"],
@@ -72,48 +197,77 @@ class CameraConfig:
             width=data.get("width", 640),
             height=data.get("height", 480),
             roi=tuple(roi_raw) if roi_raw else None,
-            detection_model=data.get("detection_model", "hog"),
+            detection_model=detection_model,
+            encoding_shards=list(data.get("encoding_shards", [])),
+            detection_scale=data.get("detection_scale", 0.5),
+            detection_upsample=data.get("detection_upsample", 1),
+            auto_calibrate=data.get("auto_calibrate", False),
+            capture_backend=data.get("capture_backend", ""),
+            rtsp_transport=data.get("rtsp_transport", ""),
+            buffer_size=data.get("buffer_size", 0),
+            keyframes_only=data.get("keyframes_only", False),
+            hw_acceleration=data.get("hw_acceleration", ""),
+            decode_threads=data.get("decode_threads", 0),
+            decode_on_demand=data.get("decode_on_demand", False),
+            analysis_source=data.get("analysis_source", ""),
+            recording_source=data.get("recording_source", ""),
         )
 
 
-# ── Classe de base ────────────────────────────────────────────────────────────
+# ── Ouverture de la capture ──────────────────────────────────────────────────
 
-class CameraSource(ABC):
+def open_video_capture(source, config: CameraConfig, recording: bool = False) -> cv2.VideoCapture:
     """
-    Source vidéo générique avec boucle de lecture en arrière-plan.
-
-    Usage :
-        src = WebcamSource(config)
-        src.start()
-        frame = src.get_frame()   # None si pas encore de frame
-        src.stop()
+    cv2.VideoCapture avec le backend et les options de décodage de config.
+    recording : flux d'enregistrement (toutes les images, même en keyframes_only).
     """
+    backend = CAPTURE_BACKENDS.get(config.capture_backend, cv2.CAP_ANY)
+    params = config.capture_params()
+    options = config.ffmpeg_options(keyframes=not recording)
+    # Toujours sous verrou, même sans options : une ouverture concurrente ne
+    # doit pas hériter des options d'une autre caméra
+    with _open_lock:
+        previous = os.environ.get(_FFMPEG_OPTIONS_ENV)
+        if options:
+            os.environ[_FFMPEG_OPTIONS_ENV] = f"{previous}|{options}" if previous else options
+        try:
+            return cv2.VideoCapture(source, backend, params)
+        finally:
+            if previous is None:
+                os.environ.pop(_FFMPEG_OPTIONS_ENV, None)
+            else:
+                os.environ[_FFMPEG_OPTIONS_ENV] = previous
 
-    # Paramètres du backoff exponentiel de reconnexion
-    RECONNECT_DELAY_MIN = 2.0
-    RECONNECT_DELAY_MAX = 60.0
-    RECONNECT_BACKOFF_FACTOR = 2.0
 
-    def __init__(self, config: CameraConfig) -> None:
-        self.config = config
+# ── Flux vidéo ────────────────────────────────────────────────────────────────
+
+class VideoStream:
+    """
+    Une capture lue en continu dans un FrameRing. Une caméra a un flux, ou
+    deux (analyse / enregistrement) si sa configuration le demande.
+    """
+
+    def __init__(self, owner: "CameraSource", source, recording: bool = False) -> None:
+        self.source = source
+        self.recording = recording
+        self._owner = owner
         self._cap: Optional[cv2.VideoCapture] = None
-        self._lock = threading.Lock()
         self._running = False
-        self._latest_frame: Optional[np.ndarray] = None
+        self._ring = FrameRing()
+        self._seq = 0
+        self._new_frame = threading.Condition()
         self._thread: Optional[threading.Thread] = None
         self._connected = False
-        self._reconnect_delay = self.RECONNECT_DELAY_MIN
+        self._reconnect_delay = owner.RECONNECT_DELAY_MIN
         self._reconnect_count = 0
-
-    # ── Propriétés ────────────────────────────────────────────────────────────
-
-    @property
-    def name(self) -> str:
-        return self.config.name
-
-    @property
-    def uid(self) -> str:
-        return self.config.uid
+        # Demande de frames (décodage à la demande)
+        self._waiters = 0
+        self._wanted = False
+        self._history_frames = 0
+        self._history_interval = float("inf")   # 0 = chaque frame
+        self._last_decode = 0.0
+        self.frames_grabbed = 0
+        self.frames_decoded = 0
 
     @property
     def is_running(self) -> bool:
@@ -126,48 +280,66 @@ class CameraSource(ABC):
     # ── Cycle de vie ──────────────────────────────────────────────────────────
 
     def start(self) -> bool:
-        """Ouvre la capture et démarre la boucle de lecture. Retourne True si OK."""
         if self._running:
             return True
-
-        ok = self._open_capture()
-        if not ok:
-            logger.error("[%s] Impossible d'ouvrir la source : %s", self.name, self.config.source)
+        if not self._open_capture():
             return False
-
         self._running = True
+        suffix = "-rec" if self.recording else ""
         self._thread = threading.Thread(
             target=self._read_loop,
             daemon=True,
-            name=f"cam-{self.uid}",
+            name=f"cam-{self._owner.uid}{suffix}",
         )
         self._thread.start()
-        logger.info("[%s] Démarré (source=%s)", self.name, self.config.source)
         return True
 
     def stop(self) -> None:
-        """Arrête la capture proprement."""
         self._running = False
+        with self._new_frame:
+            self._new_frame.notify_all()
         if self._thread:
             self._thread.join(timeout=3.0)
+            self._thread = None
         self._release()
-        logger.info("[%s] Arrêté", self.name)
+        self._ring.clear()
 
     # ── Lecture de frame ──────────────────────────────────────────────────────
 
-    def get_frame(self) -> Optional[np.ndarray]:
-        """Retourne la dernière frame disponible (thread-safe), ou None."""
-        with self._lock:
-            return self._latest_frame.copy() if self._latest_frame is not None else None
+    def latest(self) -> Optional[Frame]:
+        self._wanted = True
+        return self._ring.latest()
+
+    def wait_frame(self, after_seq: int = 0, timeout: Optional[float] = None) -> Optional[Frame]:
+        with self._new_frame:
+            self._waiters += 1
+            try:
+                if not self._new_frame.wait_for(
+                    lambda: self._seq != after_seq or not self._running, timeout,
+                ):
+                    return None
+            finally:
+                self._waiters -= 1
+        if self._seq == after_seq:
+            return None
+        return self._ring.latest()
+
+    def history(self, count: int, after_seq: int = 0) -> List[Frame]:
+        return self._ring.history(count, after_seq)
+
+    def reserve(self, frames: int, fps: float = 0.0) -> None:
+        """Historique de frames images, alimenté à fps images/s au moins (0 = toutes)."""
+        self._history_frames = max(self._history_frames, frames)
+        if frames > 0:
+            self._history_interval = min(self._history_interval, 1.0 / fps if fps > 0 else 0.0)
+        self._ring.reserve(frames)
 
     # ── Implémentation interne ────────────────────────────────────────────────
 
     def _open_capture(self) -> bool:
-        cap = cv2.VideoCapture(self.config.source)
-        if not cap.isOpened():
+        cap = self._owner._open_capture(self.source, self.recording)
+        if cap is None:
             return False
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.config.width)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.config.height)
         self._cap = cap
         self._connected = True
         return True
@@ -179,15 +351,14 @@ class CameraSource(ABC):
         self._connected = False
 
     def _read_loop(self) -> None:
+        owner = self._owner
         while self._running:
             if self._cap and self._cap.isOpened():
-                ret, frame = self._cap.read()
+                ret = self._next_frame()
                 if ret:
-                    with self._lock:
-                        self._latest_frame = frame
                     self._connected = True
                     # Réinitialiser le backoff après une lecture réussie
-                    self._reconnect_delay = self.RECONNECT_DELAY_MIN
+                    self._reconnect_delay = owner.RECONNECT_DELAY_MIN
                     self._reconnect_count = 0
                 else:
                     self._connected = False
@@ -195,18 +366,221 @@ class CameraSource(ABC):
                     self._reconnect_count += 1
                     logger.warning(
                         "[%s] Perte de flux (tentative %d), nouvelle connexion dans %.0fs…",
-                        self.name, self._reconnect_count, self._reconnect_delay,
+                        owner.name, self._reconnect_count, self._reconnect_delay,
                     )
                     time.sleep(self._reconnect_delay)
                     # Backoff exponentiel plafonné
                     self._reconnect_delay = min(
-                        self._reconnect_delay * self.RECONNECT_BACKOFF_FACTOR,
-                        self.RECONNECT_DELAY_MAX,
+                        self._reconnect_delay * owner.RECONNECT_BACKOFF_FACTOR,
+                        owner.RECONNECT_DELAY_MAX,
                     )
                     self._open_capture()
             else:
                 time.sleep(0.1)
 
+    def _demanded(self) -> bool:
+        """Une frame est-elle attendue ? Toujours vrai hors décodage à la demande."""
+        if not self._owner.config.decode_on_demand or self._waiters:
+            return True
+        wanted, self._wanted = self._wanted, False
+        if wanted:
+            return True
+        # Historique de l'enregistreur : à la cadence de ses clips
+        if self._history_frames > 0:
+            due = self._last_decode + self._history_interval * (1.0 - HISTORY_PACE_TOLERANCE)
+            return time.monotonic() >= due
+        return False
+
+    def _next_frame(self) -> bool:
+        """Avance d'une image, décodée et publiée si demandée. False si le flux est perdu."""
+        if not self._owner.config.decode_on_demand:
+            slot, buffer = self._ring.next_slot()
+            ret, image = self._cap.read(buffer) if buffer is not None else self._cap.read()
+        else:
+            if not self._cap.grab():
+                return False
+            self.frames_grabbed += 1
+            if not self._demanded():
+                return True
+            slot, buffer = self._ring.next_slot()
+            ret, image = self._cap.retrieve(buffer) if buffer is not None else self._cap.retrieve()
+        if not ret:
+            self._ring.cancel(slot)
+            return False
+        self._publish(image, slot)
+        return True
+
+    def _publish(self, image: np.ndarray, slot: Optional[int] = None) -> Frame:
+        """Publie l'image lue (dans le slot réservé, s'il y en a un)."""
+        self.frames_decoded += 1
+        self._last_decode = time.monotonic()
+        seq = max(self._seq + 1, self.frames_grabbed)
+        frame = self._ring.publish(image, seq, slot)
+        with self._new_frame:
+            self._seq = frame.seq
+            self._new_frame.notify_all()
+        return frame
+
+
+# ── Classe de base ────────────────────────────────────────────────────────────
+
+class CameraSource(ABC):
+    """
+    Source vidéo générique avec boucle de lecture en arrière-plan.
+
+    Avec analysis_source / recording_source distincts, deux flux sont lus :
+    le moteur (get_latest, wait_frame) reçoit le flux d'analyse, l'enregistreur
+    (get_history) et l'affichage (get_frame) le flux d'enregistrement. Ce
+    dernier n'est ouvert qu'une fois un historique réservé (enregistreur actif).
+
+    Usage :
+        src = WebcamSource(config)
+        src.start()
+        frame = src.get_frame()   # None si pas encore de frame
+        with src.get_latest() as frame:   # Frame (séquence, horodatage)
+            ...
+        src.stop()
+    """
+
+    # Paramètres du backoff exponentiel de reconnexion
+    RECONNECT_DELAY_MIN = 2.0
+    RECONNECT_DELAY_MAX = 60.0
+    RECONNECT_BACKOFF_FACTOR = 2.0
+
+    def __init__(self, config: CameraConfig) -> None:
+        self.config = config
+        self._running = False
+        analysis, recording = config.stream_sources()
+        self._analysis = VideoStream(self, analysis)
+        self._recording = VideoStream(self, recording, recording=True) if recording != analysis else self._analysis
+        self._history_frames = 0
+        self._history_fps = 0.0
+
+    # ── Propriétés ────────────────────────────────────────────────────────────
+
+    @property
+    def name(self) -> str:
+        return self.config.name
+
+    @property
+    def uid(self) -> str:
+        return self.config.uid
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    @property
+    def is_connected(self) -> bool:
+        return self._analysis.is_connected
+
+    @property
+    def dual_stream(self) -> bool:
+        return self._recording is not self._analysis
+
+    # ── Cycle de vie ──────────────────────────────────────────────────────────
+
+    def start(self) -> bool:
+        """Ouvre la capture et démarre la boucle de lecture. Retourne True si OK."""
+        if self._running:
+            return True
+
+        if not self._analysis.start():
+            logger.error("[%s] Impossible d'ouvrir la source : %s", self.name, self._analysis.source)
+            return False
+        self._running = True
+        if self.dual_stream and self._history_frames > 0:
+            self._start_recording_stream()
+        logger.info("[%s] Démarré (source=%s)", self.name, self._analysis.source)
+        return True
+
+    def stop(self) -> None:
+        """Arrête la capture proprement."""
+        self._running = False
+        self._analysis.stop()
+        if self.dual_stream:
+            self._recording.stop()
+        logger.info("[%s] Arrêté", self.name)
+
+    # ── Lecture de frame ──────────────────────────────────────────────────────
+
+    def get_latest(self) -> Optional[Frame]:
+        """Dernière Frame du flux d'analyse, référence acquise (à rendre par release()), ou None."""
+        return self._analysis.latest()
+
+    def get_display_frame(self) -> Optional[Frame]:
+        """
+        Dernière Frame pour l'affichage et les snapshots (flux d'enregistrement
+        s'il est lu), référence acquise : lire frame.image puis release().
+        """
+        return self._history_stream().latest()
+
+    def get_frame(self) -> Optional[np.ndarray]:
+        """
+        Copie privée de la dernière image d'affichage, pour les appelants qui
+        la gardent ou la modifient. Sinon : get_display_frame() sans copie.
+        """
+        frame = self.get_display_frame()
+        if frame is None:
+            return None
+        with frame:
+            return frame.copy()
+
+    def wait_frame(self, after_seq: int = 0, timeout: Optional[float] = None) -> Optional[Frame]:
+        """
+        Attend une frame du flux d'analyse de séquence différente de after_seq
+        (la dernière vue par l'appelant ; toute autre valeur compte, la source
+        pouvant avoir redémarré). Retourne la plus récente, référence acquise,
+        ou None (délai écoulé, source arrêtée).
+        """
+        return self._analysis.wait_frame(after_seq, timeout)
+
+    def get_history(self, count: int, after_seq: int = 0) -> List[Frame]:
+        """
+        Dernières frames du flux d'enregistrement (seq > after_seq), plus
+        ancienne d'abord, références acquises.
+        """
+        return self._history_stream().history(count, after_seq)
+
+    def reserve_history(self, frames: int, fps: float = 0.0) -> None:
+        """
+        Conserve au moins frames images pour get_history (enregistreur), à
+        fps images/s en décodage à la demande (0 = toutes les images).
+        """
+        self._history_frames = max(self._history_frames, frames)
+        self._history_fps = fps
+        self._recording.reserve(frames, fps)
+        if self.dual_stream and self._running and frames > 0:
+            self._start_recording_stream()
+
+    # ── Implémentation interne ────────────────────────────────────────────────
+
+    def _history_stream(self) -> VideoStream:
+        """Flux d'enregistrement s'il est lu, sinon celui d'analyse."""
+        return self._recording if self._recording.is_running else self._analysis
+
+    def _start_recording_stream(self) -> None:
+        if not self._recording.start():
+            logger.warning(
+                "[%s] Flux d'enregistrement indisponible (%s) : enregistrement depuis le flux d'analyse",
+                self.name, self._recording.source,
+            )
+            self._analysis.reserve(self._history_frames, self._history_fps)
+
+    def _open_capture(self, source, recording: bool = False) -> Optional[cv2.VideoCapture]:
+        """Capture ouverte avec les options de la caméra, ou None."""
+        cap = open_video_capture(source, self.config, recording)
+        if not cap.isOpened():
+            return None
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.config.width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.config.height)
+        if self.config.buffer_size > 0:
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, self.config.buffer_size)
+        return cap
+
+    def _publish(self, image: np.ndarray, slot: Optional[int] = None) -> Frame:
+        return self._analysis._publish(image, slot)
+
 
 # ── Implémentations concrètes ────────────────────────────────────────────────
 
@@ -217,11 +591,11 @@ class WebcamSource(CameraSource):
     config.source = index entier (0, 1, 2…)
     """
 
-    def _open_capture(self) -> bool:
+    def _open_capture(self, source, recording: bool = False) -> Optional[cv2.VideoCapture]:
         # Forcer l'index entier
-        source = int(self.config.source) if not isinstance(self.config.source, int) else self.config.source
+        source = int(source) if not isinstance(source, int) else source
         self.config.source = source
-        return super()._open_capture()
+        return super()._open_capture(source, recording)
 
 
 class IPCameraSource(CameraSource):
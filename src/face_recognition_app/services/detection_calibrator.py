@@ -0,0 +1,104 @@
+"""
+detection_calibrator.py
+Calibration automatique de la résolution de détection d'une caméra.
+
+Le moteur réduisait toutes les frames d'un facteur 0.5 et détectait avec un
+suréchantillonnage de 1, quelle que soit la résolution de la caméra ou la
+taille habituelle des visages. Le détecteur HOG de dlib ne trouve que les
+visages d'au moins HOG_MIN_FACE pixels dans l'image analysée ; chaque
+suréchantillonnage divise ce minimum par deux mais multiplie le coût par quatre.
+
+En mode calibration (CameraConfig.auto_calibrate), la caméra est analysée à un
+réglage large (CALIBRATION_SCALE, CALIBRATION_UPSAMPLE) et la hauteur des
+visages détectés est relevée. Un visage suivi (track_id) n'est relevé qu'une
+fois, à la détection qui crée sa piste : une personne immobile devant la
+caméra ne remplit pas l'échantillon. Après CALIBRATION_SAMPLES visages, on retient
+le réglage (échelle, suréchantillonnage) le moins coûteux qui détecte encore
+le FACE_SIZE_PERCENTILE-ième percentile des tailles observées, avec une marge.
+Le résultat est enregistré dans CameraConfig (detection_scale, detection_upsample).
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Fenêtre minimale du détecteur HOG de dlib (pixels de l'image analysée)
+HOG_MIN_FACE = 80
+SAFETY_MARGIN = 1.25
+
+# Réglage large utilisé pendant la calibration : visages dès ~40 px
+CALIBRATION_SCALE = 1.0
+CALIBRATION_UPSAMPLE = 1
+CALIBRATION_SAMPLES = 50
+FACE_SIZE_PERCENTILE = 5
+
+SCALES = (1.0, 0.75, 0.5, 0.375, 0.25)
+UPSAMPLES = (0, 1, 2)
+
+
+def detection_cost(scale: float, upsample: int) -> float:
+    """Coût relatif : pixels analysés (chaque suréchantillonnage ×4)."""
+    return scale * scale * 4 ** upsample
+
+
+def choose_detection_settings(face_sizes: Iterable[float]) -> Tuple[float, int]:
+    """
+    Réglage (échelle, suréchantillonnage) le moins coûteux qui détecte les
+    visages de la taille (pleine résolution) du FACE_SIZE_PERCENTILE-ième percentile.
+    À coût égal, on préfère moins de suréchantillonnage (encodages plus nets).
+    """
+    sizes = np.asarray(list(face_sizes), dtype=np.float64)
+    if sizes.size == 0:
+        return CALIBRATION_SCALE, CALIBRATION_UPSAMPLE
+    smallest = float(np.percentile(sizes, FACE_SIZE_PERCENTILE))
+    candidates = [
+        (detection_cost(scale, up), up, scale)
+        for scale in SCALES for up in UPSAMPLES
+        if smallest * scale * 2 ** up >= HOG_MIN_FACE * SAFETY_MARGIN
+    ]
+    if not candidates:
+        return CALIBRATION_SCALE, CALIBRATION_UPSAMPLE
+    _, upsample, scale = min(candidates)
+    return scale, upsample
+
+
+class DetectionCalibrator:
+    """Relève les tailles de visages d'une caméra jusqu'à avoir assez d'échantillons."""
+
+    def __init__(self, samples: int = CALIBRATION_SAMPLES) -> None:
+        self._samples = samples
+        self._sizes: List[float] = []
+        self._tracks: Set[int] = set()   # pistes déjà relevées
+
+    @property
+    def settings(self) -> Tuple[float, int]:
+        """Réglage de détection à utiliser pendant la calibration."""
+        return CALIBRATION_SCALE, CALIBRATION_UPSAMPLE
+
+    @property
+    def done(self) -> bool:
+        return len(self._sizes) >= self._samples
+
+    def add(
+        self,
+        locations: Iterable[Tuple[int, int, int, int]],
+        track_ids: Optional[Iterable[Optional[int]]] = None,
+    ) -> None:
+        """
+        locations : boîtes (top, right, bottom, left) en pleine résolution.
+        track_ids : piste de chaque boîte (None = détection sans suivi) ; une
+        piste déjà relevée est ignorée.
+        """
+        locations = list(locations)
+        track_ids = list(track_ids) if track_ids is not None else [None] * len(locations)
+        for (top, right, bottom, left), track_id in zip(locations, track_ids):
+            if track_id is not None:
+                if track_id in self._tracks:
+                    continue
+                self._tracks.add(track_id)
+            self._sizes.append(float(max(bottom - top, right - left)))
+
+    def result(self) -> Optional[Tuple[float, int]]:
+        return choose_detection_settings(self._sizes) if self.done else None
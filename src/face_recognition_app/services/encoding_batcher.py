@@ -0,0 +1,229 @@
+"""
+encoding_batcher.py
+Micro-batching inter-caméras de l'encodage et de l'appariement des visages.
+
+Quand plusieurs caméras détectent du mouvement dans le même intervalle, chaque
+thread d'analyse payait séparément le coût fixe d'un appel d'encodage dlib et
+d'un appariement. Les threads déposent désormais les découpes de leurs visages
+ici ; un thread unique les regroupe pendant au plus `max_latency` secondes (ou
+jusqu'à `max_batch` visages), encode tout le lot en un seul appel, apparie tous
+les encodages d'une même galerie en un seul produit matriciel, puis rend à
+chaque caméra ses propres résultats.
+
+Usage :
+    batcher = EncodingBatcher(pool)
+    batcher.start()
+    matches = batcher.submit(crops, matchers, threshold).result()
+    batcher.stop()
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..core.gallery_matcher import GalleryMatcher, best_across
+from ..storage.config import ENCODING_BATCH_MAX_LATENCY, ENCODING_BATCH_MAX_SIZE
+from .inference_pool import InferencePool, encode_faces_batch
+
+logger = logging.getLogger(__name__)
+
+Location = Tuple[int, int, int, int]
+# (image RGB, [locations dans cette image])
+FaceCrops = Tuple[np.ndarray, List[Location]]
+MatchResult = Tuple[Optional[str], float]   # comme best_across
+
+# Marge ajoutée autour de chaque visage (en fraction de sa taille) : les repères
+# et l'alignement dlib n'ont besoin que d'un voisinage du visage
+CROP_MARGIN = 0.5
+
+
+def crop_faces(rgb: np.ndarray, locations: Sequence[Location], margin: float = CROP_MARGIN) -> List[FaceCrops]:
+    """Découpe chaque visage avec une marge ; les locations sont ramenées dans la découpe."""
+    h, w = rgb.shape[:2]
+    crops = []
+    for top, right, bottom, left in locations:
+        mh, mw = int((bottom - top) * margin), int((right - left) * margin)
+        y0, x0 = max(0, top - mh), max(0, left - mw)
+        y1, x1 = min(h, bottom + mh), min(w, right + mw)
+        crop = np.ascontiguousarray(rgb[y0:y1, x0:x1])
+        crops.append((crop, [(top - y0, right - x0, bottom - y0, left - x0)]))
+    return crops
+
+
+@dataclass
+class _Request:
+    crops: List[FaceCrops]
+    matchers: Sequence[GalleryMatcher]
+    threshold: float
+    future: Future
+    submitted: float
+    timings: Optional[Dict[str, float]] = None
+
+
+class EncodingBatcher:
+    """
+    Étape de regroupement partagée par toutes les caméras du moteur.
+    Sans pool, l'encodage est fait dans le thread du batcher.
+    """
+
+    def __init__(
+        self,
+        pool: Optional[InferencePool] = None,
+        max_batch: int = ENCODING_BATCH_MAX_SIZE,
+        max_latency: float = ENCODING_BATCH_MAX_LATENCY,
+    ) -> None:
+        self._pool = pool
+        self._max_batch = max(1, max_batch)
+        self._max_latency = max(0.0, max_latency)
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        # submit/stop : aucune requête ne peut être déposée après la sentinelle
+        self._state_lock = threading.Lock()
+
+        # Statistiques
+        self.batches = 0
+        self.faces = 0
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.faces / self.batches if self.batches else 0.0
+
+    # ── Cycle de vie ──────────────────────────────────────────────────────────
+
+    def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="encoding-batcher")
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._state_lock:
+            if not self._running:
+                return
+            self._running = False
+            self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout=3.0)
+            self._thread = None
+        # Requêtes restées en file : les appelants ne doivent pas attendre indéfiniment
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None and not request.future.done():
+                request.future.set_exception(RuntimeError("EncodingBatcher arrêté"))
+
+    # ── Soumission ────────────────────────────────────────────────────────────
+
+    def submit(
+        self,
+        crops: List[FaceCrops],
+        matchers: Sequence[GalleryMatcher],
+        threshold: float,
+        timings: Optional[Dict[str, float]] = None,
+    ) -> "Future[List[MatchResult]]":
+        """
+        Dépose les visages d'une frame. Le Future donne, pour chaque découpe,
+        (nom ou None, distance) dans l'ordre de crops. timings, si fourni, reçoit
+        les durées du lot ("encode", "match", en secondes) avant le résultat.
+        """
+        future: Future = Future()
+        if not crops:
+            future.set_result([])
+            return future
+        request = _Request(list(crops), list(matchers), threshold, future, time.monotonic(), timings)
+        with self._state_lock:
+            queued = self._running
+            if queued:
+                self._queue.put(request)
+        if not queued:
+            self._run_batch([request])   # pas de thread : traitement immédiat
+        return future
+
+    # ── Boucle de regroupement ────────────────────────────────────────────────
+
+    def _loop(self) -> None:
+        while self._running:
+            request = self._queue.get()
+            if request is None:
+                break
+            batch = [request]
+            size = len(request.crops)
+            deadline = request.submitted + self._max_latency
+            while size < self._max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    nxt = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    self._running = False
+                    break
+                batch.append(nxt)
+                size += len(nxt.crops)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List[_Request]) -> None:
+        """Traite un lot ; une erreur est rendue à chaque Future non résolu."""
+        try:
+            self._process_batch(batch)
+        except Exception as exc:
+            logger.error("Erreur encodage par lot : %s", exc)
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(exc)
+
+    def _process_batch(self, batch: List[_Request]) -> None:
+        items = [crop for request in batch for crop in request.crops]
+        start = time.perf_counter()
+        if self._pool is not None:
+            encoded = self._pool.submit_encode(items).result()
+        else:
+            encoded = encode_faces_batch(items)
+        encode_time = time.perf_counter() - start
+        self.batches += 1
+        self.faces += len(items)
+
+        # Un encodage par découpe (une découpe = un visage)
+        encodings = [faces[0] if faces else None for faces in encoded]
+        offset = 0
+        per_request: List[List[Optional[np.ndarray]]] = []
+        for request in batch:
+            per_request.append(encodings[offset:offset + len(request.crops)])
+            offset += len(request.crops)
+
+        # Appariement : un seul produit matriciel par (galeries, seuil)
+        groups: Dict[tuple, List[int]] = {}
+        for i, request in enumerate(batch):
+            key = (tuple(id(m) for m in request.matchers), request.threshold)
+            groups.setdefault(key, []).append(i)
+
+        for indices in groups.values():
+            first = batch[indices[0]]
+            start = time.perf_counter()
+            probes = [e for i in indices for e in per_request[i] if e is not None]
+            matches = iter(best_across(first.matchers, np.asarray(probes), first.threshold)) if probes else iter(())
+            match_time = time.perf_counter() - start
+            for i in indices:
+                results: List[MatchResult] = []
+                for encoding in per_request[i]:
+                    if encoding is None:
+                        results.append((None, float("inf")))
+                    else:
+                        results.append(next(matches))
+                if batch[i].timings is not None:
+                    batch[i].timings.update(encode=encode_time, match=match_time)
+                batch[i].future.set_result(results)
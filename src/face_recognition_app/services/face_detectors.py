@@ -0,0 +1,345 @@
+"""
+face_detectors.py
+Détecteurs de visages interchangeables.
+
+Backends (nom utilisé dans detection_model, profil ou caméra) :
+  "hog"    → dlib HOG (face_recognition, CPU)
+  "cnn"    → dlib CNN MMOD (précis, très lent sans GPU)
+  "haar"   → cascade de Haar OpenCV (très rapide, plus de faux positifs)
+  "yunet"  → OpenCV DNN YuNet (rapide et précis ; modèle ONNX à télécharger
+             dans YUNET_MODEL_PATH)
+
+Mode cascade "<rapide>+<précis>" (ex. "haar+hog", "yunet+hog") : le détecteur
+rapide parcourt toute l'image, le précis ne vérifie que des découpes autour
+de ses candidats. Pas de candidat → pas d'appel au détecteur coûteux.
+
+Tous les détecteurs prennent une image RGB et retournent des boîtes
+(top, right, bottom, left), comme face_recognition.face_locations. Les modèles
+sont chargés par thread (les instances OpenCV / dlib ne supportent pas les
+appels concurrents).
+
+Mesures sur la machine courante (temps par frame, visages trouvés et rappel
+par rapport au détecteur de référence, CNN par défaut) :
+    python -m face_recognition_app.services.face_detectors [images…]
+
+Relevé (1 vCPU Xeon, suréchantillonnage 1, 10 passages) :
+    image 181×142, un visage   : hog 21.4 ms (rappel 1.00), cnn 221.1 ms (référence)
+    frame 640×480 synthétique : hog 288.6 ms, cnn 3379.8 ms (aucun visage, rappel non défini)
+Haar et YuNet n'y figurent pas : la machine de mesure n'avait ni le fichier
+haarcascade_frontalface_default.xml (absent de son build OpenCV, sans
+cv2.data.haarcascades) ni le modèle YuNet, ni d'accès réseau pour les
+télécharger. Pour les mesurer :
+    - Haar  : fichier de opencv/data/haarcascades (dépôt OpenCV), chemin dans
+              HAAR_CASCADE_PATH si cv2.data ne le fournit pas ;
+    - YuNet : face_detection_yunet_2023mar.onnx (opencv_zoo,
+              models/face_detection_yunet) copié dans YUNET_MODEL_PATH ;
+puis relancer la commande ci-dessus avec des images contenant des visages
+(le rappel n'a de sens que si la référence en trouve).
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from ..storage.config import HAAR_CASCADE_PATH, YUNET_MODEL_PATH, YUNET_SCORE_THRESHOLD
+from .face_tracker import iou
+
+logger = logging.getLogger(__name__)
+
+Location = Tuple[int, int, int, int]
+
+BACKENDS = ("hog", "cnn", "haar", "yunet")
+# Marge des découpes vérifiées en mode cascade (fraction de la taille du candidat)
+CASCADE_MARGIN = 0.5
+# Deux détections se recouvrant au-delà de cet IoU sont fusionnées
+CASCADE_DEDUP_IOU = 0.5
+# Mesures : une boîte de référence est retrouvée au-delà de cet IoU (les
+# backends cadrent différemment le même visage)
+RECALL_IOU = 0.3
+
+
+class FaceDetector(ABC):
+    """Détecteur de visages sur image RGB."""
+
+    name: str = ""
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+
+    @abstractmethod
+    def detect(self, rgb: np.ndarray, upsample: int = 1) -> List[Location]:
+        """Boîtes (top, right, bottom, left) dans rgb."""
+
+    def available(self) -> bool:
+        return True
+
+    def _model(self):
+        model = getattr(self._local, "model", None)
+        if model is None:
+            model = self._local.model = self._load()
+        return model
+
+    def _load(self):
+        raise NotImplementedError
+
+
+def _trim(loc: Location, shape) -> Location:
+    top, right, bottom, left = loc
+    return max(top, 0), min(right, shape[1]), min(bottom, shape[0]), max(left, 0)
+
+
+# ── dlib ──────────────────────────────────────────────────────────────────────
+
+class DlibHogDetector(FaceDetector):
+    name = "hog"
+
+    def _load(self):
+        import dlib
+        return dlib.get_frontal_face_detector()
+
+    def detect(self, rgb: np.ndarray, upsample: int = 1) -> List[Location]:
+        rects = self._model()(rgb, upsample)
+        return [_trim((r.top(), r.right(), r.bottom(), r.left()), rgb.shape) for r in rects]
+
+
+class DlibCnnDetector(FaceDetector):
+    name = "cnn"
+
+    def _load(self):
+        import dlib
+        import face_recognition_models as frm
+        return dlib.cnn_face_detection_model_v1(frm.cnn_face_detector_model_location())
+
+    def detect(self, rgb: np.ndarray, upsample: int = 1) -> List[Location]:
+        rects = [d.rect for d in self._model()(rgb, upsample)]
+        return [_trim((r.top(), r.right(), r.bottom(), r.left()), rgb.shape) for r in rects]
+
+
+# ── OpenCV ────────────────────────────────────────────────────────────────────
+
+class HaarCascadeDetector(FaceDetector):
+    """
+    Cascade de Haar frontale. upsample abaisse la taille minimale détectée
+    (comme pour dlib) au lieu d'agrandir l'image.
+    """
+
+    name = "haar"
+    MIN_SIZE = 48
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        super().__init__()
+        self._path = path or HAAR_CASCADE_PATH or str(
+            Path(cv2.data.haarcascades) / "haarcascade_frontalface_default.xml"
+        )
+
+    def available(self) -> bool:
+        return Path(self._path).exists()
+
+    def _load(self):
+        cascade = cv2.CascadeClassifier(self._path)
+        if cascade.empty():
+            raise FileNotFoundError(f"Cascade de Haar introuvable : {self._path}")
+        return cascade
+
+    def detect(self, rgb: np.ndarray, upsample: int = 1) -> List[Location]:
+        gray = cv2.equalizeHist(cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY))
+        min_size = max(12, self.MIN_SIZE >> max(0, upsample))
+        boxes = self._model().detectMultiScale(
+            gray, scaleFactor=1.1, minNeighbors=5, minSize=(min_size, min_size),
+        )
+        return [_trim((y, x + w, y + h, x), rgb.shape) for x, y, w, h in boxes]
+
+
+class YuNetDetector(FaceDetector):
+    """OpenCV DNN YuNet (cv2.FaceDetectorYN, OpenCV ≥ 4.5.4)."""
+
+    name = "yunet"
+
+    def __init__(self, model_path: Optional[str] = None, score_threshold: float = YUNET_SCORE_THRESHOLD) -> None:
+        super().__init__()
+        self._path = str(model_path or YUNET_MODEL_PATH)
+        self._score_threshold = score_threshold
+
+    def available(self) -> bool:
+        return hasattr(cv2, "FaceDetectorYN") and Path(self._path).exists()
+
+    def _load(self):
+        if not self.available():
+            raise FileNotFoundError(f"Modèle YuNet introuvable : {self._path}")
+        return cv2.FaceDetectorYN.create(self._path, "", (320, 320), self._score_threshold)
+
+    def detect(self, rgb: np.ndarray, upsample: int = 1) -> List[Location]:
+        # Réseau entraîné à plusieurs échelles : pas de suréchantillonnage
+        model = self._model()
+        h, w = rgb.shape[:2]
+        model.setInputSize((w, h))
+        _, faces = model.detect(cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR))
+        if faces is None:
+            return []
+        return [
+            _trim((int(y), int(x + bw), int(y + bh), int(x)), rgb.shape)
+            for x, y, bw, bh in faces[:, :4]
+        ]
+
+
+# ── Cascade ───────────────────────────────────────────────────────────────────
+
+class CascadeDetector(FaceDetector):
+    """Le détecteur rapide propose, le précis confirme sur des découpes."""
+
+    def __init__(self, gate: FaceDetector, verifier: FaceDetector, margin: float = CASCADE_MARGIN) -> None:
+        super().__init__()
+        self._gate = gate
+        self._verifier = verifier
+        self._margin = margin
+        self.name = f"{gate.name}+{verifier.name}"
+
+    def available(self) -> bool:
+        return self._gate.available() and self._verifier.available()
+
+    def detect(self, rgb: np.ndarray, upsample: int = 1) -> List[Location]:
+        candidates = self._gate.detect(rgb, upsample)
+        if not candidates:
+            return []
+        h, w = rgb.shape[:2]
+        found: List[Location] = []
+        for top, right, bottom, left in candidates:
+            mh, mw = int((bottom - top) * self._margin), int((right - left) * self._margin)
+            y0, x0 = max(0, top - mh), max(0, left - mw)
+            y1, x1 = min(h, bottom + mh), min(w, right + mw)
+            for t, r, b, l in self._verifier.detect(np.ascontiguousarray(rgb[y0:y1, x0:x1]), upsample):
+                loc = (t + y0, r + x0, b + y0, l + x0)
+                if all(iou(loc, other) < CASCADE_DEDUP_IOU for other in found):
+                    found.append(loc)
+        return found
+
+
+# ── Registre ──────────────────────────────────────────────────────────────────
+
+_FACTORIES = {
+    "hog": DlibHogDetector,
+    "cnn": DlibCnnDetector,
+    "haar": HaarCascadeDetector,
+    "yunet": YuNetDetector,
+}
+_detectors: Dict[str, FaceDetector] = {}
+_detectors_lock = threading.Lock()
+
+
+def create_detector(name: str) -> FaceDetector:
+    """Nouveau détecteur : un backend ("hog"…) ou une cascade ("haar+hog")."""
+    parts = name.split("+")
+    unknown = [p for p in parts if p not in _FACTORIES]
+    if unknown or len(parts) > 2:
+        raise ValueError(f"Détecteur inconnu : {name!r} (backends : {', '.join(BACKENDS)})")
+    if len(parts) == 2:
+        return CascadeDetector(_FACTORIES[parts[0]](), _FACTORIES[parts[1]]())
+    return _FACTORIES[name]()
+
+
+def get_detector(name: str) -> FaceDetector:
+    """
+    Détecteur partagé du processus. Un détecteur dont le modèle est absent est
+    remplacé par HOG (avertissement journalisé une fois).
+    """
+    name = name or "hog"
+    with _detectors_lock:
+        detector = _detectors.get(name)
+        if detector is None:
+            detector = create_detector(name)
+            if not detector.available():
+                logger.warning("Détecteur %s indisponible (modèle absent) : HOG utilisé", name)
+                detector = _detectors.get("hog") or DlibHogDetector()
+            _detectors[name] = detector
+    return detector
+
+
+def available_detectors() -> List[str]:
+    """Backends utilisables ici, puis les cascades rapides → HOG."""
+    names = [n for n in BACKENDS if create_detector(n).available()]
+    names += [f"{n}+hog" for n in ("haar", "yunet") if n in names]
+    return names
+
+
+# ── Mesures ───────────────────────────────────────────────────────────────────
+
+def recall(found: Sequence[Location], truth: Sequence[Location]) -> Tuple[int, int]:
+    """(boîtes de truth retrouvées dans found, total de truth)."""
+    hits = sum(1 for box in truth if any(iou(box, loc) >= RECALL_IOU for loc in found))
+    return hits, len(truth)
+
+
+def benchmark(
+    images: Sequence[np.ndarray],
+    names: Optional[Sequence[str]] = None,
+    repeat: int = 5,
+    upsample: int = 1,
+    reference: Optional[str] = "cnn",
+) -> Dict[str, Dict[str, float]]:
+    """
+    Temps moyen par image (ms), nombre moyen de visages trouvés et rappel par
+    rapport aux boîtes du détecteur reference (nan si la référence est
+    indisponible ou ne trouve aucun visage), par détecteur.
+    Le premier passage (chargement des modèles) n'est pas compté.
+    """
+    truth = None
+    if reference:
+        ref = create_detector(reference)
+        if ref.available():
+            truth = [ref.detect(rgb, upsample) for rgb in images]
+
+    report = {}
+    for name in names or available_detectors():
+        detector = create_detector(name)
+        detector.detect(images[0], upsample)
+        faces = 0
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for rgb in images:
+                faces += len(detector.detect(rgb, upsample))
+        runs = repeat * len(images)
+        report[name] = {
+            "ms_per_frame": (time.perf_counter() - start) * 1000 / runs,
+            "faces_per_frame": faces / runs,
+            "recall": float("nan"),
+        }
+        if truth is not None:
+            hits, total = map(sum, zip(*(
+                recall(detector.detect(rgb, upsample), boxes) for rgb, boxes in zip(images, truth)
+            )))
+            if total:
+                report[name]["recall"] = hits / total
+    return report
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Temps de détection de chaque backend")
+    parser.add_argument("images", nargs="*", help="Images de test (défaut : frame 640×480 synthétique)")
+    parser.add_argument("--detectors", nargs="*", help="Détecteurs à mesurer (défaut : tous les disponibles)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--upsample", type=int, default=1)
+    parser.add_argument("--reference", default="cnn", help="Détecteur de référence du rappel (\"\" : aucun)")
+    args = parser.parse_args(argv)
+
+    images = [cv2.cvtColor(cv2.imread(p), cv2.COLOR_BGR2RGB) for p in args.images]
+    if not images:
+        images = [np.random.default_rng(0).integers(0, 255, size=(480, 640, 3), dtype=np.uint8)]
+    report = benchmark(images, args.detectors, args.repeat, args.upsample, args.reference)
+    print(f"{len(images)} image(s), {args.repeat} passage(s), suréchantillonnage {args.upsample}, "
+          f"référence {args.reference or '—'}")
+    for name, stats in report.items():
+        print(f"  {name:<10} {stats['ms_per_frame']:8.1f} ms/frame   "
+              f"{stats['faces_per_frame']:.2f} visage(s)/frame   rappel {stats['recall']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+face_tracker.py
+Suivi léger des visages entre deux détections, par caméra.
+
+La détection HOG et l'encodage 128-d sont les étapes coûteuses d'une analyse ;
+une personne immobile devant une caméra était pourtant ré-identifiée à chaque
+frame. Le tracker conserve des pistes (track_id stable) :
+
+  - détection complète toutes les `redetect_every` frames, ou dès qu'une piste
+    est perdue ; les détections sont associées aux pistes par IoU (à défaut,
+    par distance des centres)
+  - entre deux détections, chaque piste est suivie par corrélation
+    (cv2.matchTemplate) de son patch en niveaux de gris dans une fenêtre
+    autour de sa dernière position, sur la frame réduite
+  - une piste n'est ré-encodée que si elle est nouvelle, si sa boîte a
+    beaucoup bougé depuis le dernier encodage, ou si elle est encore inconnue
+    lors d'une détection complète
+
+Toutes les coordonnées sont celles de la frame réduite analysée.
+"""
+
+from __future__ import annotations
+
+import itertools
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from ..storage.config import TRACKER_REDETECT_EVERY
+
+Location = Tuple[int, int, int, int]   # (top, right, bottom, left)
+
+# Association détection ↔ piste
+MATCH_IOU = 0.3
+# Repli : centres distants de moins de MATCH_CENTER_RATIO × taille de la boîte
+MATCH_CENTER_RATIO = 0.5
+# Ré-encodage si l'IoU avec la boîte du dernier encodage passe sous ce seuil
+REENCODE_IOU = 0.5
+# Corrélation minimale pour considérer la piste suivie
+MIN_CORRELATION = 0.5
+# Fenêtre de recherche : marge autour de la boîte (fraction de sa taille)
+SEARCH_MARGIN = 0.5
+# Détections complètes consécutives sans correspondance avant suppression
+MAX_MISSES = 2
+
+
+@dataclass
+class Track:
+    track_id: int
+    location: Location
+    name: Optional[str] = None
+    distance: float = float("inf")
+    encoded_location: Optional[Location] = None
+    misses: int = 0
+    template: Optional[np.ndarray] = None
+
+    @property
+    def is_known(self) -> bool:
+        return self.name is not None
+
+    @property
+    def confidence(self) -> float:
+        return 0.0 if self.distance == float("inf") else round(1.0 - self.distance, 3)
+
+
+def iou(a: Location, b: Location) -> float:
+    top, right = max(a[0], b[0]), min(a[1], b[1])
+    bottom, left = min(a[2], b[2]), max(a[3], b[3])
+    inter = max(0, right - left) * max(0, bottom - top)
+    union = _area(a) + _area(b) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _area(loc: Location) -> int:
+    return max(0, loc[1] - loc[3]) * max(0, loc[2] - loc[0])
+
+
+def _center_distance(a: Location, b: Location) -> float:
+    ay, ax = (a[0] + a[2]) / 2, (a[1] + a[3]) / 2
+    by, bx = (b[0] + b[2]) / 2, (b[1] + b[3]) / 2
+    return float(np.hypot(ay - by, ax - bx))
+
+
+class FaceTracker:
+    """
+    Pistes d'une caméra. Non thread-safe : utilisé par le seul thread
+    d'analyse de la caméra.
+    """
+
+    _ids = itertools.count(1)   # identifiants uniques tous trackers confondus
+
+    def __init__(self, redetect_every: int = TRACKER_REDETECT_EVERY) -> None:
+        self._redetect_every = max(1, redetect_every)
+        self._tracks: List[Track] = []
+        self._since_detection = 0
+        self._lost = False
+
+    @property
+    def tracks(self) -> List[Track]:
+        return list(self._tracks)
+
+    def needs_detection(self) -> bool:
+        """Détection complète requise pour cette frame ?"""
+        return (
+            self._lost
+            or not self.visible()
+            or self._since_detection + 1 >= self._redetect_every
+        )
+
+    def invalidate_identities(self) -> None:
+        """La galerie a changé : toutes les pistes seront ré-encodées."""
+        for track in self._tracks:
+            track.encoded_location = None
+
+    def reset(self) -> None:
+        self._tracks = []
+        self._since_detection = 0
+        self._lost = False
+
+    # ── Mise à jour ───────────────────────────────────────────────────────────
+
+    def update_detections(self, gray: np.ndarray, detections: Sequence[Location]) -> List[Track]:
+        """
+        Associe les détections aux pistes existantes, crée les nouvelles pistes
+        et retire celles absentes depuis MAX_MISSES détections.
+        Retourne les pistes à (ré-)encoder.
+        """
+        self._since_detection = 0
+        self._lost = False
+        unmatched = list(range(len(detections)))
+        pending: List[Track] = []
+
+        # Association gloutonne : meilleure IoU d'abord, puis centres proches
+        pairs = sorted(
+            ((iou(t.location, d), ti, di)
+             for ti, t in enumerate(self._tracks) for di, d in enumerate(detections)),
+            reverse=True,
+        )
+        matched_tracks = set()
+        for score, ti, di in pairs:
+            if score < MATCH_IOU:
+                break
+            if ti in matched_tracks or di not in unmatched:
+                continue
+            matched_tracks.add(ti)
+            unmatched.remove(di)
+            self._assign(self._tracks[ti], detections[di], gray, pending, redetected=True)
+
+        for ti, track in enumerate(self._tracks):
+            if ti in matched_tracks or not unmatched:
+                continue
+            size = max(track.location[1] - track.location[3], track.location[2] - track.location[0])
+            di = min(unmatched, key=lambda i: _center_distance(track.location, detections[i]))
+            if _center_distance(track.location, detections[di]) <= MATCH_CENTER_RATIO * size:
+                matched_tracks.add(ti)
+                unmatched.remove(di)
+                self._assign(track, detections[di], gray, pending, redetected=True)
+
+        # Pistes non revues : conservées quelques détections (occultation brève),
+        # sans être affichées ni suivies
+        survivors = []
+        for ti, track in enumerate(self._tracks):
+            if ti not in matched_tracks:
+                track.misses += 1
+                if track.misses > MAX_MISSES:
+                    continue
+            survivors.append(track)
+        for di in unmatched:
+            track = Track(next(self._ids), tuple(detections[di]))
+            track.template = self._patch(gray, track.location)
+            survivors.append(track)
+            pending.append(track)
+        self._tracks = survivors
+        return pending
+
+    def follow(self, gray: np.ndarray) -> Optional[List[Track]]:
+        """
+        Suit les pistes par corrélation, sans détection.
+        Retourne les pistes à ré-encoder, ou None si une piste est perdue
+        (l'appelant lance alors une détection complète).
+        """
+        self._since_detection += 1
+        pending: List[Track] = []
+        for track in self._tracks:
+            if track.misses:
+                continue
+            location = self._correlate(gray, track)
+            if location is None:
+                self._lost = True
+                return None
+            self._assign(track, location, gray, pending, redetected=False)
+        return pending
+
+    def identify(self, track: Track, name: Optional[str], distance: float) -> None:
+        track.name, track.distance = name, distance
+        track.encoded_location = track.location
+
+    def visible(self) -> List[Track]:
+        """Pistes vues à la dernière mise à jour."""
+        return [t for t in self._tracks if not t.misses]
+
+    # ── Interne ───────────────────────────────────────────────────────────────
+
+    def _assign(self, track: Track, location: Location, gray: np.ndarray, pending: List[Track], redetected: bool) -> None:
+        track.location = tuple(int(v) for v in location)
+        track.misses = 0
+        track.template = self._patch(gray, track.location)
+        if (
+            track.encoded_location is None
+            or iou(track.location, track.encoded_location) < REENCODE_IOU
+            or (redetected and not track.is_known)
+        ):
+            pending.append(track)
+
+    @staticmethod
+    def _patch(gray: np.ndarray, loc: Location) -> Optional[np.ndarray]:
+        top, right, bottom, left = loc
+        h, w = gray.shape[:2]
+        top, left = max(0, top), max(0, left)
+        bottom, right = min(h, bottom), min(w, right)
+        if bottom - top < 4 or right - left < 4:
+            return None
+        return gray[top:bottom, left:right].copy()
+
+    @staticmethod
+    def _correlate(gray: np.ndarray, track: Track) -> Optional[Location]:
+        template = track.template
+        if template is None:
+            return None
+        th, tw = template.shape[:2]
+        top, right, bottom, left = track.location
+        my, mx = int(th * SEARCH_MARGIN), int(tw * SEARCH_MARGIN)
+        h, w = gray.shape[:2]
+        y0, x0 = max(0, top - my), max(0, left - mx)
+        y1, x1 = min(h, top + th + my), min(w, left + tw + mx)
+        window = gray[y0:y1, x0:x1]
+        if window.shape[0] < th or window.shape[1] < tw:
+            return None
+        scores = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+        _, best, _, (dx, dy) = cv2.minMaxLoc(scores)
+        if best < MIN_CORRELATION:
+            return None
+        new_top, new_left = y0 + dy, x0 + dx
+        return (new_top, new_left + tw, new_top + th, new_left)
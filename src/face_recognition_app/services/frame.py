@@ -0,0 +1,89 @@
+"""
+frame.py
+Frame capturée, partagée sans copie entre moteur, enregistreur, API et UI.
+
+Une frame est allouée une fois par la source caméra puis transmise par
+référence : l'image est en lecture seule (numpy lève une erreur sur toute
+écriture), les consommateurs qui dessinent dessus travaillent sur copy().
+
+Chaque détenteur prend une référence (acquire) et la rend (release) ; quand
+le compteur retombe à zéro, on_release est appelé (la source peut alors
+réutiliser la mémoire de la frame). Une frame non rendue n'est jamais
+réutilisée : l'oubli d'un release coûte une allocation, pas une corruption.
+
+    frame = source.get_latest()      # référence acquise
+    with frame:                      # release() en sortie de bloc
+        gray = cv2.cvtColor(frame.image, cv2.COLOR_BGR2GRAY)
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Optional
+
+import numpy as np
+
+
+class Frame:
+    """Image immuable + numéro de séquence et instant de capture."""
+
+    __slots__ = ("image", "seq", "timestamp", "monotonic", "_refs", "_lock", "_on_release")
+
+    def __init__(
+        self,
+        image: np.ndarray,
+        seq: int = 0,
+        timestamp: Optional[float] = None,
+        monotonic: Optional[float] = None,
+        on_release: Optional[Callable[["Frame"], None]] = None,
+    ) -> None:
+        # Vue en lecture seule : le tableau d'origine reste modifiable par son
+        # propriétaire (la source), personne d'autre ne peut l'altérer.
+        self.image = image.view()
+        self.image.flags.writeable = False
+        self.seq = seq
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.monotonic = time.monotonic() if monotonic is None else monotonic
+        self._refs = 1
+        self._lock = threading.Lock()
+        self._on_release = on_release
+
+    # ── Compteur de références ────────────────────────────────────────────────
+
+    @property
+    def refs(self) -> int:
+        return self._refs
+
+    def acquire(self) -> "Frame":
+        with self._lock:
+            self._refs += 1
+        return self
+
+    def release(self) -> None:
+        with self._lock:
+            if self._refs <= 0:
+                return
+            self._refs -= 1
+            last = self._refs == 0
+        if last and self._on_release is not None:
+            self._on_release(self)
+
+    def __enter__(self) -> "Frame":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+    # ── Accès à l'image ───────────────────────────────────────────────────────
+
+    @property
+    def shape(self):
+        return self.image.shape
+
+    def copy(self) -> np.ndarray:
+        """Copie modifiable de l'image (pour l'annoter)."""
+        return self.image.copy()
+
+    def __repr__(self) -> str:
+        return f"Frame(seq={self.seq}, shape={self.image.shape}, refs={self._refs})"
@@ -0,0 +1,84 @@
+"""
+frame_queue.py
+File d'analyse d'une caméra, entre le producteur et le thread d'analyse.
+
+Une file pleine ne rejette plus la frame la plus récente (ce qui faisait
+analyser des frames vieilles de plusieurs intervalles) ; la politique choisit
+quoi sacrifier :
+  "drop-oldest"  → file bornée, la plus ancienne frame cède sa place
+  "latest-only"  → une seule frame en attente, remplacée par chaque nouvelle
+  "bounded-age"  → comme drop-oldest, et à la sortie les frames capturées
+                   depuis plus de max_age sont écartées (sauf la plus récente,
+                   pour que l'analyse ne s'arrête jamais)
+
+Les frames écartées sont rendues (release) et comptées.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+from ..storage.config import QUEUE_MAX_AGE, QUEUE_POLICY
+from .frame import Frame
+
+POLICIES = ("drop-oldest", "latest-only", "bounded-age")
+
+
+class FrameQueue:
+    """File thread-safe de (instant de mise en file, Frame)."""
+
+    def __init__(self, maxsize: int = 4, policy: str = QUEUE_POLICY, max_age: float = QUEUE_MAX_AGE) -> None:
+        if policy not in POLICIES:
+            raise ValueError(f"Politique de file inconnue : {policy!r} ({', '.join(POLICIES)})")
+        self.policy = policy
+        self.maxsize = 1 if policy == "latest-only" else max(1, maxsize)
+        self.max_age = max_age
+        self._items: Deque[Tuple[float, Frame]] = deque()
+        self._cond = threading.Condition()
+
+        # Statistiques
+        self.dropped = 0   # frames remplacées par une plus récente (file pleine)
+        self.stale = 0     # frames écartées car trop vieilles (bounded-age)
+
+    def qsize(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+    def put(self, frame: Frame) -> None:
+        """Ajoute frame (la file en prend possession), en évinçant si besoin."""
+        evicted = []
+        with self._cond:
+            while len(self._items) >= self.maxsize:
+                evicted.append(self._items.popleft()[1])
+            self._items.append((time.monotonic(), frame))
+            self.dropped += len(evicted)
+            self._cond.notify()
+        for old in evicted:
+            old.release()
+
+    def get(self, timeout: Optional[float] = None) -> Tuple[float, Frame]:
+        """(instant de mise en file, Frame) ; queue.Empty si rien dans le délai."""
+        stale = []
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items, timeout):
+                raise queue.Empty
+            if self.policy == "bounded-age":
+                now = time.monotonic()
+                while len(self._items) > 1 and now - self._items[0][1].monotonic > self.max_age:
+                    stale.append(self._items.popleft()[1])
+                self.stale += len(stale)
+            item = self._items.popleft()
+        for old in stale:
+            old.release()
+        return item
+
+    def clear(self) -> None:
+        """Rend les références des frames en attente."""
+        with self._cond:
+            items, self._items = list(self._items), deque()
+        for _, frame in items:
+            frame.release()
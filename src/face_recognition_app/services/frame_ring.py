@@ -0,0 +1,136 @@
+"""
+frame_ring.py
+Anneau de frames pré-allouées d'une caméra.
+
+La source lit chaque image dans un slot réutilisé (cap.read(image=slot)) au
+lieu d'allouer un nouveau tableau par frame. L'anneau garde aussi les
+dernières frames publiées : la plus récente pour get_latest(), les
+précédentes pour l'historique pré-événement de l'enregistreur.
+
+Un slot n'est réécrit que lorsque sa Frame n'est plus référencée (sortie de
+l'historique et rendue par tous ses détenteurs). Si aucun slot n'est libre,
+la frame est lue dans un tableau neuf hors anneau (compté dans overflows).
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+import numpy as np
+
+from ..storage.config import FRAME_RING_SLOTS
+from .frame import Frame
+
+
+class FrameRing:
+    """
+    slots   : slots de travail (file d'analyse, traitements en cours)
+    history : frames conservées pour l'enregistreur (reserve() l'agrandit)
+    Les slots sont alloués au premier besoin, jusqu'à slots + history.
+    """
+
+    def __init__(self, slots: int = FRAME_RING_SLOTS, history: int = 0) -> None:
+        self._slots = max(2, slots)
+        self._history = max(0, history)
+        self._buffers: List[Optional[np.ndarray]] = []
+        self._busy: List[bool] = []
+        self._frames: Deque[Frame] = deque()   # frames publiées, la plus récente à droite
+        self._next = 0
+        self._lock = threading.Lock()
+
+        # Statistiques
+        self.allocations = 0   # tableaux alloués pour les slots
+        self.overflows = 0     # frames lues hors anneau faute de slot libre
+
+    @property
+    def capacity(self) -> int:
+        return self._slots + self._history
+
+    def reserve(self, history: int) -> None:
+        """Garde au moins history frames (en plus de la plus récente)."""
+        with self._lock:
+            self._history = max(self._history, history)
+
+    # ── Écriture (thread de lecture de la source) ─────────────────────────────
+
+    def next_slot(self) -> Tuple[Optional[int], Optional[np.ndarray]]:
+        """
+        Réserve un slot libre : (indice, tableau à remplir). Le tableau est None
+        pour un slot jamais alloué ; l'indice est None si l'anneau est plein.
+        """
+        with self._lock:
+            count = len(self._buffers)
+            for step in range(count):
+                index = (self._next + step) % count
+                if not self._busy[index]:
+                    break
+            else:
+                if count >= self.capacity:
+                    return None, None
+                self._buffers.append(None)
+                self._busy.append(False)
+                index = count
+            self._busy[index] = True
+            self._next = (index + 1) % max(1, len(self._buffers))
+            return index, self._buffers[index]
+
+    def cancel(self, index: Optional[int]) -> None:
+        """Lecture échouée : le slot réservé redevient libre."""
+        if index is not None:
+            self._free(index)
+
+    def publish(self, image: np.ndarray, seq: int, index: Optional[int] = None) -> Frame:
+        """
+        Publie l'image lue dans le slot index (None = hors anneau). Si la capture
+        a dû allouer un autre tableau (taille différente), il devient le slot.
+        """
+        if index is None:
+            with self._lock:
+                self.overflows += 1
+            frame = Frame(image, seq)
+        else:
+            with self._lock:
+                if self._buffers[index] is not image:
+                    self._buffers[index] = image
+                    self.allocations += 1
+            frame = Frame(image, seq, on_release=lambda _frame: self._free(index))
+
+        evicted = []
+        with self._lock:
+            self._frames.append(frame)   # référence de l'anneau
+            while len(self._frames) > self._history + 1:
+                evicted.append(self._frames.popleft())
+        for old in evicted:
+            old.release()
+        return frame
+
+    def _free(self, index: int) -> None:
+        with self._lock:
+            self._busy[index] = False
+
+    # ── Lecture ───────────────────────────────────────────────────────────────
+
+    def latest(self) -> Optional[Frame]:
+        """Frame la plus récente, référence acquise."""
+        with self._lock:
+            return self._frames[-1].acquire() if self._frames else None
+
+    def history(self, count: int, after_seq: int = 0) -> List[Frame]:
+        """
+        Au plus count frames de séquence > after_seq, de la plus ancienne à la
+        plus récente ; références acquises, à rendre par l'appelant.
+        """
+        if count <= 0:
+            return []
+        with self._lock:
+            frames = [f for f in self._frames if f.seq > after_seq]
+            return [f.acquire() for f in frames[-count:]]
+
+    def clear(self) -> None:
+        """Rend les références de l'anneau (arrêt de la source)."""
+        with self._lock:
+            frames, self._frames = list(self._frames), deque()
+        for frame in frames:
+            frame.release()
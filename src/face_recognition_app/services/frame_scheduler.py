@@ -0,0 +1,155 @@
+"""
+frame_scheduler.py
+Ordonnanceur global des analyses : répartit un budget de calcul entre caméras.
+
+Chaque caméra avait un intervalle fixe (analysis_interval) quelle que soit la
+charge : une scène statique coûtait autant qu'une entrée fréquentée. Le budget
+est désormais global :
+
+    budget = target_cpu × nombre de cœurs   (secondes de calcul par seconde)
+
+et partagé au prorata d'un poids par caméra :
+
+    poids = IDLE_WEIGHT + activité de mouvement récente + DETECTION_WEIGHT × détections récentes
+
+Une caméra reçoit budget × poids / Σpoids secondes de calcul par seconde ;
+divisé par le coût mesuré d'une analyse (moyenne glissante), cela donne son
+intervalle, borné par [SCHEDULER_MIN_INTERVAL, SCHEDULER_MAX_INTERVAL].
+Le coût mesuré inclut l'attente dans le pool d'inférence : un pool saturé
+ralentit mécaniquement toutes les caméras.
+
+target_cpu = 0 désactive l'ordonnanceur (intervalle fixe analysis_interval).
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from ..storage.config import (
+    SCHEDULER_MAX_INTERVAL,
+    SCHEDULER_MIN_INTERVAL,
+    SCHEDULER_POLL_ACTIVE,
+    SCHEDULER_POLL_IDLE,
+)
+
+# Poids plancher : une caméra calme reste analysée de temps en temps
+IDLE_WEIGHT = 0.2
+DETECTION_WEIGHT = 2.0
+# Lissage du mouvement (par frame) et du coût (par analyse)
+MOTION_ALPHA = 0.2
+COST_ALPHA = 0.3
+# Une détection compte pleinement puis s'efface (constante de temps, secondes)
+DETECTION_DECAY = 10.0
+# Coût supposé avant la première mesure
+DEFAULT_COST = 0.1
+# Au-delà de cette activité, le producteur lit à pleine cadence
+ACTIVE_THRESHOLD = 0.05
+
+
+@dataclass
+class _CameraLoad:
+    motion: float = 0.0
+    cost: float = DEFAULT_COST
+    last_detection: float = -math.inf
+    interval: float = 0.0
+
+
+class FrameScheduler:
+    """
+    Thread-safe : les threads d'analyse rapportent mouvement et coût, puis
+    demandent leur prochain intervalle.
+    """
+
+    def __init__(self, target_cpu: float = 0.0, base_interval: float = 0.5, cores: Optional[int] = None) -> None:
+        self._cores = cores or os.cpu_count() or 1
+        self._target_cpu = target_cpu
+        self._base_interval = base_interval
+        self._cameras: Dict[str, _CameraLoad] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, target_cpu: float, base_interval: float) -> None:
+        with self._lock:
+            self._target_cpu = target_cpu
+            self._base_interval = base_interval
+
+    @property
+    def adaptive(self) -> bool:
+        return self._target_cpu > 0
+
+    # ── Caméras ───────────────────────────────────────────────────────────────
+
+    def register(self, uid: str) -> None:
+        with self._lock:
+            self._cameras.setdefault(uid, _CameraLoad())
+
+    def unregister(self, uid: str) -> None:
+        with self._lock:
+            self._cameras.pop(uid, None)
+
+    # ── Mesures ───────────────────────────────────────────────────────────────
+
+    def record_motion(self, uid: str, moved: bool) -> None:
+        with self._lock:
+            load = self._cameras.get(uid)
+            if load is not None:
+                load.motion += MOTION_ALPHA * (float(moved) - load.motion)
+
+    def record_analysis(self, uid: str, cost: float, detections: int = 0, now: Optional[float] = None) -> None:
+        with self._lock:
+            load = self._cameras.get(uid)
+            if load is None:
+                return
+            load.cost += COST_ALPHA * (max(cost, 0.0) - load.cost)
+            if detections:
+                load.last_detection = time.monotonic() if now is None else now
+
+    # ── Décisions ─────────────────────────────────────────────────────────────
+
+    def next_interval(self, uid: str, now: Optional[float] = None) -> float:
+        """Délai avant la prochaine analyse de la caméra."""
+        if not self.adaptive:
+            return self._base_interval
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            load = self._cameras.get(uid)
+            if load is None:
+                return self._base_interval
+            weights = {u: self._weight(l, now) for u, l in self._cameras.items()}
+            budget = self._target_cpu * self._cores
+            share = budget * weights[uid] / sum(weights.values())
+            interval = load.cost / share if share > 0 else SCHEDULER_MAX_INTERVAL
+            load.interval = min(max(interval, SCHEDULER_MIN_INTERVAL), SCHEDULER_MAX_INTERVAL)
+            return load.interval
+
+    def poll_interval(self, uid: str, recording: bool = False) -> float:
+        """
+        Période de lecture du producteur : réduite pour les caméras calmes,
+        sauf si les frames alimentent aussi l'enregistreur.
+        """
+        if recording or not self.adaptive:
+            return SCHEDULER_POLL_ACTIVE
+        with self._lock:
+            load = self._cameras.get(uid)
+            if load is None or self._activity(load, time.monotonic()) > ACTIVE_THRESHOLD:
+                return SCHEDULER_POLL_ACTIVE
+        return SCHEDULER_POLL_IDLE
+
+    def weight(self, uid: str, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            load = self._cameras.get(uid)
+            return self._weight(load, now) if load is not None else 0.0
+
+    @staticmethod
+    def _activity(load: _CameraLoad, now: float) -> float:
+        recency = math.exp(-(now - load.last_detection) / DETECTION_DECAY)
+        return load.motion + DETECTION_WEIGHT * recency
+
+    @classmethod
+    def _weight(cls, load: _CameraLoad, now: float) -> float:
+        return IDLE_WEIGHT + cls._activity(load, now)
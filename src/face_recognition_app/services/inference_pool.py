@@ -0,0 +1,314 @@
+"""
+inference_pool.py
+Pool partagé de détection / encodage des visages pour toutes les caméras.
+
+Auparavant chaque thread d'analyse appelait dlib directement : avec plus de
+caméras que de cœurs, les threads se disputaient le GIL et le nombre de cœurs
+utilisés n'était pas maîtrisé. Les consommateurs soumettent désormais leurs
+frames à un pool unique dont la taille est fixée par INFERENCE_WORKERS.
+
+Backends :
+  "process" → ProcessPoolExecutor ; la frame est copiée dans un bloc de mémoire
+              partagée réutilisable (seuls son nom, sa forme et son dtype sont
+              sérialisés), le worker la lit sans copie
+  "thread"  → ThreadPoolExecutor (dlib relâche le GIL pendant le calcul)
+
+Tâches :
+  detect()          → détection + encodage d'une frame
+  locate()          → détection seule, sur une frame ou une découpe (les
+                      encodages sont calculés par lot, voir encoding_batcher.py)
+  submit_encode()   → encodage d'un lot de découpes de visages de plusieurs
+                      caméras en un seul appel dlib (petites images : sérialisées)
+
+Usage :
+    pool = InferencePool(workers=4)
+    pool.start()
+    result = pool.detect(rgb_frame, model="hog")   # InferenceResult
+    pool.shutdown()
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from ..storage.config import INFERENCE_BACKEND, INFERENCE_WORKERS
+from .face_detectors import get_detector
+
+logger = logging.getLogger(__name__)
+
+# Blocs de mémoire partagée par worker (un en calcul, un en attente)
+SLOTS_PER_WORKER = 2
+
+
+@dataclass
+class InferenceResult:
+    locations: List[Tuple[int, int, int, int]] = field(default_factory=list)
+    encodings: List[np.ndarray] = field(default_factory=list)
+
+
+def default_worker_count() -> int:
+    """INFERENCE_WORKERS, ou (cœurs − 1) si 0 : un cœur reste pour la capture."""
+    if INFERENCE_WORKERS > 0:
+        return INFERENCE_WORKERS
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+_thread_models = threading.local()
+
+
+def _models():
+    """
+    Modèles d'encodage dlib propres au thread courant : les instances globales
+    de face_recognition ne supportent pas les appels concurrents (plantage du
+    backend "thread" quand deux workers encodent en même temps).
+    """
+    models = getattr(_thread_models, "models", None)
+    if models is None:
+        import dlib
+        import face_recognition_models as frm
+
+        models = SimpleNamespace(
+            pose=dlib.shape_predictor(frm.pose_predictor_five_point_model_location()),
+            encoder=dlib.face_recognition_model_v1(frm.face_recognition_model_location()),
+        )
+        _thread_models.models = models
+    return models
+
+
+def locate_faces(rgb: np.ndarray, model: str = "hog", upsample: int = 1) -> List[Tuple[int, int, int, int]]:
+    """
+    Détection seule dans le thread courant. model : backend ou cascade de
+    face_detectors ("hog" donne le même résultat que face_recognition.face_locations).
+    """
+    return get_detector(model).detect(rgb, upsample)
+
+
+def detect_and_encode(rgb: np.ndarray, model: str = "hog", upsample: int = 1) -> InferenceResult:
+    """Détection + encodage dans le thread courant."""
+    locations = locate_faces(rgb, model, upsample)
+    if not locations:
+        return InferenceResult()
+    return InferenceResult(locations, encode_faces_batch([(rgb, locations)])[0])
+
+
+def encode_faces_batch(items: List[Tuple[np.ndarray, List[Tuple[int, int, int, int]]]]) -> List[List[np.ndarray]]:
+    """
+    Encode en un seul appel dlib les visages de plusieurs images :
+    items = [(image RGB, [locations])]. Mêmes réglages que face_recognition.face_encodings
+    (repères 5 points, 1 jitter) : les encodages sont identiques.
+    """
+    import dlib
+    from face_recognition import api as fr
+
+    models = _models()
+    images, shapes = [], []
+    for rgb, locations in items:
+        detections = dlib.full_object_detections()
+        for location in locations:
+            detections.append(models.pose(rgb, fr._css_to_rect(location)))
+        images.append(np.ascontiguousarray(rgb, dtype=np.uint8))
+        shapes.append(detections)
+    if not images:
+        return []
+    descriptors = models.encoder.compute_face_descriptor(images, shapes, 1)
+    return [[np.array(d) for d in per_image] for per_image in descriptors]
+
+
+def _run_shared(shm_name: str, shape, dtype: str, model: str, upsample: int, task: str = "detect"):
+    """Point d'entrée du worker : lit la frame dans la mémoire partagée."""
+    # Les workers "spawn" partagent le resource_tracker du parent : l'ouverture
+    # ré-enregistre le même nom (sans effet), le parent reste seul à le détruire
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        rgb = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        if task == "locate":
+            result = locate_faces(rgb, model, upsample)
+        else:
+            detected = detect_and_encode(rgb, model, upsample)
+            result = (detected.locations, detected.encodings)
+        del rgb   # libère la vue avant close()
+    finally:
+        shm.close()
+    return result
+
+
+class _SharedFrameSlots:
+    """Blocs de mémoire partagée réutilisés (agrandis si une frame dépasse)."""
+
+    def __init__(self, count: int) -> None:
+        self._free: "queue.Queue[Optional[shared_memory.SharedMemory]]" = queue.Queue()
+        self._all: List[shared_memory.SharedMemory] = []
+        self._lock = threading.Lock()
+        for _ in range(count):
+            self._free.put(None)   # alloué à la première utilisation
+
+    def acquire(self, nbytes: int) -> shared_memory.SharedMemory:
+        """Bloque si tous les blocs sont en cours d'utilisation (contre-pression)."""
+        shm = self._free.get()
+        if shm is None or shm.size < nbytes:
+            if shm is not None:
+                self._discard(shm)
+            shm = shared_memory.SharedMemory(create=True, size=nbytes)
+            with self._lock:
+                self._all.append(shm)
+        return shm
+
+    def release(self, shm: shared_memory.SharedMemory) -> None:
+        self._free.put(shm)
+
+    def _discard(self, shm: shared_memory.SharedMemory) -> None:
+        with self._lock:
+            if shm in self._all:
+                self._all.remove(shm)
+        shm.close()
+        shm.unlink()
+
+    def close(self) -> None:
+        with self._lock:
+            blocks, self._all = self._all, []
+        for shm in blocks:
+            try:
+                shm.close()
+                shm.unlink()
+            except (OSError, BufferError):
+                pass
+
+
+class InferencePool:
+    """
+    Exécuteur partagé de détection / encodage. Thread-safe : tous les threads
+    d'analyse soumettent leurs frames au même pool.
+    """
+
+    def __init__(self, workers: Optional[int] = None, backend: str = INFERENCE_BACKEND) -> None:
+        if backend not in ("process", "thread"):
+            raise ValueError(f"Backend d'inférence inconnu : {backend!r}")
+        self._workers = workers or default_worker_count()
+        self._backend = backend
+        self._executor = None
+        self._slots: Optional[_SharedFrameSlots] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    # ── Propriétés ────────────────────────────────────────────────────────────
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    @property
+    def backend(self) -> str:
+        return self._backend
+
+    @property
+    def pending(self) -> int:
+        """Frames soumises dont le résultat n'est pas encore disponible."""
+        return self._pending
+
+    # ── Cycle de vie ──────────────────────────────────────────────────────────
+
+    def start(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                return
+            if self._backend == "process":
+                # spawn : pas de fork d'un processus multi-threadé (caméras, Tk…)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._workers, mp_context=multiprocessing.get_context("spawn"),
+                )
+                self._slots = _SharedFrameSlots(self._workers * SLOTS_PER_WORKER)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._workers, thread_name_prefix="inference",
+                )
+        logger.info("Pool d'inférence démarré (%s, %d worker(s))", self._backend, self._workers)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+            slots, self._slots = self._slots, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        if slots is not None:
+            slots.close()
+
+    # ── Soumission ────────────────────────────────────────────────────────────
+
+    def submit(self, rgb: np.ndarray, model: str = "hog", upsample: int = 1) -> "Future[InferenceResult]":
+        return self._submit_frame(rgb, model, upsample, "detect")
+
+    def detect(self, rgb: np.ndarray, model: str = "hog", upsample: int = 1) -> InferenceResult:
+        """Soumet la frame et attend le résultat."""
+        return self.submit(rgb, model, upsample).result()
+
+    def submit_locate(self, rgb: np.ndarray, model: str = "hog", upsample: int = 1) -> "Future[List[Tuple[int, int, int, int]]]":
+        """Détection seule (les découpes d'une même frame sont traitées en parallèle)."""
+        return self._submit_frame(rgb, model, upsample, "locate")
+
+    def locate(self, rgb: np.ndarray, model: str = "hog", upsample: int = 1) -> List[Tuple[int, int, int, int]]:
+        """Détection seule (bloquant)."""
+        return self.submit_locate(rgb, model, upsample).result()
+
+    def submit_encode(self, items) -> "Future[List[List[np.ndarray]]]":
+        """Encodage par lot : items = [(image RGB, [locations])] (voir encode_faces_batch)."""
+        if self._executor is None:
+            self.start()
+        out: Future = Future()
+        with self._lock:
+            self._pending += 1
+        inner = self._executor.submit(encode_faces_batch, list(items))
+        inner.add_done_callback(lambda f: self._complete(out, f, None))
+        return out
+
+    def _submit_frame(self, rgb: np.ndarray, model: str, upsample: int, task: str) -> Future:
+        if self._executor is None:
+            self.start()
+        rgb = np.ascontiguousarray(rgb)
+        out: Future = Future()
+        with self._lock:
+            self._pending += 1
+
+        if self._backend == "thread":
+            fn = locate_faces if task == "locate" else detect_and_encode
+            inner = self._executor.submit(fn, rgb, model, upsample)
+            inner.add_done_callback(lambda f: self._complete(out, f, None))
+            return out
+
+        shm = self._slots.acquire(rgb.nbytes)
+        try:
+            np.ndarray(rgb.shape, dtype=rgb.dtype, buffer=shm.buf)[...] = rgb
+            inner = self._executor.submit(
+                _run_shared, shm.name, rgb.shape, rgb.dtype.str, model, upsample, task,
+            )
+        except Exception:
+            self._slots.release(shm)
+            with self._lock:
+                self._pending -= 1
+            raise
+        inner.add_done_callback(lambda f: self._complete(out, f, shm))
+        return out
+
+    def _complete(self, out: Future, inner: Future, shm) -> None:
+        if shm is not None and self._slots is not None:
+            self._slots.release(shm)
+        with self._lock:
+            self._pending -= 1
+        exc = inner.exception()
+        if exc is not None:
+            out.set_exception(exc)
+            return
+        result = inner.result()
+        if isinstance(result, tuple):   # tâche "detect" via un processus
+            result = InferenceResult(list(result[0]), list(result[1]))
+        out.set_result(result)
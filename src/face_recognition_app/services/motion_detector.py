@@ -6,6 +6,8 @@ Principe :
   - Maintient un fond adaptatif via MOG2 (Gaussian Mixture)
   - Retourne True si le score de mouvement dépasse un seuil configurable
   - Fournit un masque de mouvement pour délimiter les zones actives
+  - Retourne les boîtes englobantes (fusionnées) des zones actives, pour ne
+    chercher les visages que dans ces zones
 
 Utilisé par SurveillanceEngine pour n'activer la reconnaissance faciale
 que lorsqu'un mouvement est détecté → économie CPU significative.
@@ -14,13 +16,41 @@ que lorsqu'un mouvement est détecté → économie CPU significative.
 from __future__ import annotations
 
 import logging
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 
 import cv2
 import numpy as np
 
 logger = logging.getLogger(__name__)
 
+Box = Tuple[int, int, int, int]   # (x, y, w, h)
+
+# Deux zones plus proches que cet écart (pixels) sont fusionnées
+MERGE_GAP = 16
+
+
+def merge_boxes(boxes: List[Box], gap: int = MERGE_GAP) -> List[Box]:
+    """Fusionne les boîtes (x, y, w, h) qui se chevauchent ou distantes de moins de gap."""
+    merged = [list(b) for b in boxes]
+    changed = True
+    while changed:
+        changed = False
+        out: List[List[int]] = []
+        for box in merged:
+            x, y, w, h = box
+            for other in out:
+                ox, oy, ow, oh = other
+                if x <= ox + ow + gap and ox <= x + w + gap and y <= oy + oh + gap and oy <= y + h + gap:
+                    x1, y1 = min(x, ox), min(y, oy)
+                    x2, y2 = max(x + w, ox + ow), max(y + h, oy + oh)
+                    other[:] = [x1, y1, x2 - x1, y2 - y1]
+                    changed = True
+                    break
+            else:
+                out.append(box)
+        merged = out
+    return [tuple(b) for b in merged]
+
 
 class MotionDetector:
     """
@@ -57,6 +87,14 @@ class MotionDetector:
 
         score : fraction de l'image en mouvement (0.0 → 1.0)
         """
+        detected, score, _ = self.update_regions(frame)
+        return detected, score
+
+    def update_regions(self, frame: np.ndarray) -> Tuple[bool, float, List[Box]]:
+        """
+        Comme update(), avec en plus les boîtes (x, y, w, h) fusionnées des zones
+        en mouvement significatives, en coordonnées de la frame complète.
+        """
         region = self._apply_roi(frame)
         gray = cv2.GaussianBlur(cv2.cvtColor(region, cv2.COLOR_BGR2GRAY), (21, 21), 0)
         mask = self._subtractor.apply(gray)
@@ -74,11 +112,19 @@ class MotionDetector:
 
         # Vérification par contours (filtre les faux-positifs ponctuels)
         contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        significant = any(cv2.contourArea(c) > self._sensitivity for c in contours)
+        significant = [c for c in contours if cv2.contourArea(c) > self._sensitivity]
 
-        detected = significant and score >= self._min_area_ratio
+        detected = bool(significant) and score >= self._min_area_ratio
         self._frame_count += 1
-        return detected, round(score, 4)
+
+        boxes: List[Box] = []
+        if detected:
+            off_x, off_y = self._roi_offset(frame)
+            boxes = [
+                (x + off_x, y + off_y, w, h)
+                for x, y, w, h in merge_boxes([cv2.boundingRect(c) for c in significant])
+            ]
+        return detected, round(score, 4), boxes
 
     def get_motion_mask(self, frame: np.ndarray) -> np.ndarray:
         """Retourne le masque binaire de mouvement sur la frame complète."""
@@ -101,6 +147,12 @@ class MotionDetector:
 
     # ── Utilitaire ROI ────────────────────────────────────────────────────────
 
+    def _roi_offset(self, frame: np.ndarray) -> Tuple[int, int]:
+        """Origine de la zone analysée dans la frame complète."""
+        if self._roi is None or self._apply_roi(frame) is frame:
+            return 0, 0
+        return max(0, self._roi[0]), max(0, self._roi[1])
+
     def _apply_roi(self, frame: np.ndarray) -> np.ndarray:
         if self._roi is None:
             return frame
@@ -0,0 +1,229 @@
+"""
+pipeline_metrics.py
+Histogrammes de latence par caméra et par étape du pipeline d'analyse.
+
+Étapes mesurées par SurveillanceEngine :
+  age       → âge de la frame au début de l'analyse (depuis sa capture)
+  queue     → attente de la frame dans la file d'analyse
+  motion    → détection de mouvement
+  resize    → réduction + conversions de couleur
+  track     → suivi des visages entre deux détections (FaceTracker)
+  detect    → détection des visages (pool d'inférence)
+  encode    → encodage des visages (lot partagé entre caméras, attente comprise)
+  match     → appariement avec la galerie
+  annotate  → dessin des boîtes sur la frame de l'événement
+  emit      → enregistrement vidéo, alertes, listeners
+  total     → frame analysée complète (hors attente en file)
+
+Chaque histogramme est log-linéaire (style HDR) : seaux de largeur relative
+constante (PRECISION), de MIN_VALUE à MAX_VALUE, soit une erreur relative
+bornée sur les percentiles quel que soit l'ordre de grandeur. Les percentiles
+portent sur une fenêtre glissante (deux fenêtres de WINDOW_SECONDS alternées) ;
+la somme et le nombre d'observations sont cumulés depuis le démarrage.
+
+prometheus_text() produit le format texte Prometheus (summary par étape).
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+STAGES = ("age", "queue", "motion", "resize", "track", "detect", "encode", "match", "annotate", "emit", "total")
+QUANTILES = (0.5, 0.95, 0.99)
+
+MIN_VALUE = 1e-6     # 1 µs
+MAX_VALUE = 100.0    # 100 s
+PRECISION = 0.02     # largeur relative d'un seau (≈ 2 % d'erreur)
+WINDOW_SECONDS = 60.0
+
+_LOG_BASE = math.log1p(PRECISION)
+_BUCKETS = int(math.ceil(math.log(MAX_VALUE / MIN_VALUE) / _LOG_BASE)) + 1
+
+
+def _bucket(value: float) -> int:
+    if value <= MIN_VALUE:
+        return 0
+    return min(_BUCKETS - 1, int(math.log(value / MIN_VALUE) / _LOG_BASE) + 1)
+
+
+def _bucket_value(index: int) -> float:
+    """Valeur représentative d'un seau (milieu géométrique)."""
+    if index == 0:
+        return MIN_VALUE
+    return MIN_VALUE * (1 + PRECISION) ** (index - 0.5)
+
+
+class LatencyHistogram:
+    """Histogramme glissant d'une étape. Thread-safe."""
+
+    def __init__(self, window: float = WINDOW_SECONDS) -> None:
+        self._window = window
+        self._current = np.zeros(_BUCKETS, dtype=np.int64)
+        self._previous = np.zeros(_BUCKETS, dtype=np.int64)
+        self._window_start: Optional[float] = None   # fixé à la première mesure
+        self._lock = threading.Lock()
+        self.count = 0
+        self.sum = 0.0
+
+    def record(self, seconds: float, now: Optional[float] = None) -> None:
+        with self._lock:
+            self._rotate(time.monotonic() if now is None else now)
+            self._current[_bucket(seconds)] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def percentiles(self, quantiles: Iterable[float] = QUANTILES, now: Optional[float] = None) -> Dict[float, float]:
+        """Percentiles (secondes) sur la fenêtre glissante ; vide si aucune mesure récente."""
+        with self._lock:
+            self._rotate(time.monotonic() if now is None else now)
+            counts = self._current + self._previous
+        total = int(counts.sum())
+        if total == 0:
+            return {}
+        cumulative = np.cumsum(counts)
+        return {
+            q: _bucket_value(int(np.searchsorted(cumulative, max(1, math.ceil(q * total)))))
+            for q in quantiles
+        }
+
+    def _rotate(self, now: float) -> None:
+        if self._window_start is None:
+            self._window_start = now
+            return
+        elapsed = now - self._window_start
+        if elapsed < self._window:
+            return
+        if elapsed < 2 * self._window:
+            self._previous = self._current
+        else:
+            self._previous = np.zeros(_BUCKETS, dtype=np.int64)
+        self._current = np.zeros(_BUCKETS, dtype=np.int64)
+        self._window_start = now
+
+
+class PipelineMetrics:
+    """
+    Histogrammes {caméra: {étape: LatencyHistogram}}. Conservés tant que le
+    moteur vit (un redémarrage de caméra ne les remet pas à zéro).
+    """
+
+    def __init__(self, window: float = WINDOW_SECONDS) -> None:
+        self._window = window
+        self._histograms: Dict[str, Dict[str, LatencyHistogram]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def histogram(self, uid: str, stage: str) -> LatencyHistogram:
+        with self._lock:
+            stages = self._histograms.setdefault(uid, {})
+            hist = stages.get(stage)
+            if hist is None:
+                hist = stages[stage] = LatencyHistogram(self._window)
+            return hist
+
+    def record(self, uid: str, stage: str, seconds: float) -> None:
+        self.histogram(uid, stage).record(seconds)
+
+    # ── Traçage par thread ────────────────────────────────────────────────────
+
+    def begin(self, uid: str) -> None:
+        """Les étapes mesurées ensuite dans ce thread sont attribuées à uid."""
+        self._local.uid = uid
+
+    def end(self) -> None:
+        self._local.uid = None
+
+    def add(self, stage: str, seconds: float) -> None:
+        """Durée mesurée ailleurs, attribuée à la caméra du thread courant."""
+        uid = getattr(self._local, "uid", None)
+        if uid is not None:
+            self.record(uid, stage, seconds)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Mesure un bloc ; sans trace active (tests, appels directs), ne fait rien."""
+        if getattr(self._local, "uid", None) is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    # ── Lecture ───────────────────────────────────────────────────────────────
+
+    def snapshot(self, uid: str) -> Dict[str, Dict[str, float]]:
+        """{étape: {"p50", "p95", "p99", "count", "sum"}} (secondes) pour une caméra."""
+        with self._lock:
+            stages = dict(self._histograms.get(uid, {}))
+        order = {name: i for i, name in enumerate(STAGES)}
+        out = {}
+        for stage, hist in sorted(stages.items(), key=lambda item: order.get(item[0], len(order))):
+            entry = {f"p{int(q * 100)}": round(v, 6) for q, v in hist.percentiles().items()}
+            entry["count"] = hist.count
+            entry["sum"] = round(hist.sum, 6)
+            out[stage] = entry
+        return out
+
+    def cameras(self) -> Tuple[str, ...]:
+        with self._lock:
+            return tuple(self._histograms)
+
+
+# ── Format Prometheus ─────────────────────────────────────────────────────────
+
+def _label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def prometheus_text(metrics: PipelineMetrics, stats: Dict[str, object], names: Dict[str, str]) -> str:
+    """
+    metrics : histogrammes ; stats : {uid: CameraStats} ; names : {uid: nom affiché}.
+    """
+    lines = [
+        "# HELP face_recognition_stage_latency_seconds Latence par étape du pipeline d'analyse",
+        "# TYPE face_recognition_stage_latency_seconds summary",
+    ]
+    for uid in metrics.cameras():
+        labels = f'camera="{_label(uid)}",name="{_label(names.get(uid, uid))}"'
+        for stage, entry in metrics.snapshot(uid).items():
+            base = f'{labels},stage="{stage}"'
+            for q in QUANTILES:
+                key = f"p{int(q * 100)}"
+                if key in entry:
+                    lines.append(f'face_recognition_stage_latency_seconds{{{base},quantile="{q}"}} {entry[key]}')
+            lines.append(f"face_recognition_stage_latency_seconds_sum{{{base}}} {entry['sum']}")
+            lines.append(f"face_recognition_stage_latency_seconds_count{{{base}}} {entry['count']}")
+
+    counters = (
+        ("frames_analysed", "counter", "Frames analysées (reconnaissance lancée)"),
+        ("detections", "counter", "Frames avec au moins un visage"),
+        ("motion_triggers", "counter", "Frames ayant déclenché la reconnaissance"),
+        ("frames_dropped", "counter", "Frames de la caméra jamais transmises à l'analyse"),
+        ("frames_duplicate", "counter", "Frames déjà transmises, relues et écartées"),
+        ("queue_dropped", "counter", "Frames évincées de la file d'analyse par une plus récente"),
+        ("queue_stale", "counter", "Frames écartées de la file car trop vieilles"),
+        ("fps", "gauge", "Cadence d'analyse (frames/s)"),
+        ("queue_depth", "gauge", "Frames en attente d'analyse"),
+        ("frame_age", "gauge", "Âge de la dernière frame analysée (s)"),
+        ("analysis_interval", "gauge", "Intervalle d'analyse attribué par l'ordonnanceur (s)"),
+    )
+    for field, kind, help_text in counters:
+        metric = f"face_recognition_{field}" + ("_total" if kind == "counter" else "")
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for uid, camera_stats in stats.items():
+            value = getattr(camera_stats, field, None)
+            if value is None:
+                continue
+            lines.append(
+                f'{metric}{{camera="{_label(uid)}",name="{_label(names.get(uid, uid))}"}} {value}'
+            )
+    return "\n".join(lines) + "\n"
@@ -4,13 +4,33 @@ Moteur de reconnaissance faciale multi-caméras — version améliorée.
 
 Améliorations v2 :
   - Détection de mouvement (MOG2) avant la reconnaissance → économie CPU
-  - File d'attente (Queue) pour découpler lecture caméra et analyse
+  - File d'attente (Queue) pour découpler lecture caméra et analyse ; les
+    frames (Frame) y circulent par référence, sans copie
+  - File d'analyse "latest-frame-wins" configurable (drop-oldest, latest-only,
+    bounded-age) ; profondeur, âge des frames et évictions dans CameraStats
+  - Producteur réveillé par la source à chaque nouvelle frame (numéro de
+    séquence) : ni doublons ni attente fixe ; frames perdues / doublons comptés
   - Suivi FPS d'analyse par caméra
   - ROI (zone d'intérêt) configurable par caméra
-  - Modèle de détection configurable (hog / cnn) via SurveillanceProfile
+  - Modèle de détection configurable (hog / cnn) via SurveillanceProfile,
+    ou par caméra parmi les détecteurs de face_detectors (Haar, YuNet, cascades)
   - Intégration VideoRecorder (buffer + clip sur événement)
   - Intégration AlertManager
   - Application du SurveillanceProfile actif
+  - Détection / encodage dans un pool partagé (InferencePool) : le nombre de
+    cœurs utilisés ne dépend plus du nombre de caméras
+  - Encodage + appariement regroupés entre caméras (EncodingBatcher)
+  - Ordonnanceur global (FrameScheduler) : le budget d'analyse est réparti
+    entre caméras selon mouvement, détections et coût mesuré
+  - Suivi des visages entre détections (FaceTracker) : détection complète
+    toutes les K frames, ré-encodage seulement si la boîte a changé ;
+    chaque visage porte un track_id stable
+  - Détection limitée aux zones en mouvement (découpes avec marge), frame
+    entière si ces zones couvrent l'essentiel de l'image
+  - Réduction / suréchantillonnage de la détection par caméra, calibrés
+    d'après la taille des visages observés (DetectionCalibrator)
+  - Durée de chaque étape du pipeline par caméra (PipelineMetrics) :
+    p50/p95/p99 glissants dans get_stats, format Prometheus pour l'API
 """
 
 from __future__ import annotations
@@ -23,13 +43,42 @@ from dataclasses import dataclass, field
 from typing import Callable, Dict, List, Optional, Tuple
 
 import cv2
-import face_recognition
 import numpy as np
 
-from ..storage.config import FACE_RECOGNITION_THRESHOLD
-from ..storage.encodings_store import load_encodings_map
+from ..core.gallery_matcher import GalleryMatcher, best_across
+from ..storage.config import (
+    ANN_MIN_GALLERY_SIZE,
+    ENCODING_BATCH_RESULT_TIMEOUT,
+    FACE_RECOGNITION_THRESHOLD,
+    GALLERY_MODE,
+    MOTION_FULL_FRAME_COVERAGE,
+    MOTION_REGION_PADDING,
+    QUEUE_MAX_AGE,
+    QUEUE_POLICY,
+    SCHEDULER_POLL_ACTIVE,
+    SCHEDULER_POLL_IDLE,
+    TRACKING_ENABLED,
+)
+from ..storage.encodings_store import (
+    DEFAULT_SHARD,
+    add_change_listener,
+    encodings_generation,
+    list_shards,
+    load_encoding_changes,
+    load_samples_by_name,
+    remove_change_listener,
+    shards_for_names,
+)
 from .camera_manager import CameraManager
-from .motion_detector import MotionDetector
+from .detection_calibrator import DetectionCalibrator
+from .encoding_batcher import EncodingBatcher, crop_faces
+from .face_tracker import FaceTracker, Track
+from .frame import Frame
+from .frame_queue import FrameQueue
+from .frame_scheduler import FrameScheduler
+from .inference_pool import InferencePool, encode_faces_batch, locate_faces
+from .motion_detector import MotionDetector, merge_boxes
+from .pipeline_metrics import PipelineMetrics, prometheus_text
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +91,7 @@ class DetectedFace:
     name: str
     confidence: float
     is_known: bool
+    track_id: Optional[int] = None   # stable tant que le visage reste suivi
 
 
 @dataclass
@@ -61,10 +111,35 @@ class SurveillanceEvent:
     def has_unknown(self) -> bool:
         return any(not f.is_known for f in self.faces)
 
+    @property
+    def track_ids(self) -> List[int]:
+        return [f.track_id for f in self.faces if f.track_id is not None]
+
 
 EventCallback = Callable[[SurveillanceEvent], None]
 
 
+def detection_crops(shape, regions, scale: float = 0.5) -> Optional[List[Tuple[int, int, int, int]]]:
+    """
+    Découpes (y0, x0, y1, x1) de la frame réduite (forme shape) couvrant les
+    zones en mouvement (x, y, w, h, pleine résolution) avec marge.
+    None si elles couvrent plus de MOTION_FULL_FRAME_COVERAGE de la frame.
+    """
+    h, w = shape[:2]
+    padded = []
+    for x, y, bw, bh in regions:
+        x, y, bw, bh = x * scale, y * scale, bw * scale, bh * scale
+        pad = MOTION_REGION_PADDING * max(bw, bh)
+        x0, y0 = max(0, int(x - pad)), max(0, int(y - pad))
+        x1, y1 = min(w, int(x + bw + pad)), min(h, int(y + bh + pad))
+        if x1 > x0 and y1 > y0:
+            padded.append((x0, y0, x1 - x0, y1 - y0))
+    boxes = merge_boxes(padded, gap=0)
+    if sum(bw * bh for _, _, bw, bh in boxes) > MOTION_FULL_FRAME_COVERAGE * w * h:
+        return None
+    return [(y, x, y + bh, x + bw) for x, y, bw, bh in boxes]
+
+
 # ── Stats par caméra ──────────────────────────────────────────────────────────
 
 @dataclass
@@ -74,6 +149,15 @@ class CameraStats:
     detections: int = 0
     motion_triggers: int = 0
     last_detection_ts: float = 0.0
+    analysis_interval: float = 0.0   # intervalle actuel fixé par l'ordonnanceur
+    frames_dropped: int = 0          # frames de la caméra jamais transmises à l'analyse
+    frames_duplicate: int = 0        # frames déjà transmises, relues et écartées
+    queue_depth: int = 0             # frames en attente à la dernière analyse
+    frame_age: float = 0.0           # capture → début d'analyse de la dernière frame (s)
+    queue_dropped: int = 0           # frames évincées de la file par une plus récente
+    queue_stale: int = 0             # frames écartées car trop vieilles (bounded-age)
+    # {étape: {"p50", "p95", "p99", "count", "sum"}} en secondes, rempli par get_stats
+    latency: Dict[str, Dict[str, float]] = field(default_factory=dict)
 
     def _fps_tick(self) -> None:
         pass   # calculé dans la boucle
@@ -88,12 +172,17 @@ class SurveillanceEngine:
     """
 
     QUEUE_MAXSIZE = 4           # frames en attente d'analyse par caméra
-    CACHE_REFRESH_INTERVAL = 30.0
+    # Vérification de la génération du store (modifs d'un autre processus).
+    # Les enrôlements in-process arrivent immédiatement via add_change_listener.
+    CACHE_REFRESH_INTERVAL = 5.0
 
     def __init__(
         self,
         camera_manager: CameraManager,
         threshold: float = FACE_RECOGNITION_THRESHOLD,
+        inference_pool: Optional[InferencePool] = None,
+        queue_policy: str = QUEUE_POLICY,
+        max_frame_age: float = QUEUE_MAX_AGE,
     ) -> None:
         self._mgr = camera_manager
         self._threshold = threshold
@@ -101,25 +190,46 @@ class SurveillanceEngine:
 
         self._threads: Dict[str, threading.Thread] = {}
         self._stop_events: Dict[str, threading.Event] = {}
-        self._queues: Dict[str, queue.Queue] = {}
+        # File d'analyse par caméra (voir frame_queue.py pour les politiques)
+        self._queues: Dict[str, FrameQueue] = {}
+        self._queue_policy = queue_policy
+        self._max_frame_age = max_frame_age
         self._running = False
 
         # Stats publiques
         self.stats: Dict[str, CameraStats] = {}
         self._stats_lock = threading.Lock()
-
-        # Cache encodages
-        self._encodings_cache: Dict[str, np.ndarray] = {}
-        self._cache_lock = threading.Lock()
-        self._last_cache_refresh = 0.0
+        # Histogrammes de latence par étape (conservés au redémarrage d'une caméra)
+        self._metrics = PipelineMetrics()
+
+        # Une galerie par shard chargé, synchronisée par génération.
+        # Remplacée atomiquement à chaque modification, jamais reconstruite par frame.
+        self._matchers: Dict[str, GalleryMatcher] = {}
+        self._cache_generations: Dict[str, int] = {}
+        self._profile_shards: Optional[List[str]] = None   # None = tous les shards
+        self._sync_lock = threading.RLock()
+        self._encodings_stop = threading.Event()
+        self._encodings_changed = threading.Event()   # réveille surv-encodings
+        self._encodings_thread: Optional[threading.Thread] = None
+
+        # Pool d'inférence partagé par toutes les caméras (créé au démarrage)
+        self._inference = inference_pool
+        self._owns_inference = inference_pool is None
+        # Regroupement des encodages de toutes les caméras (créé au démarrage)
+        self._batcher: Optional[EncodingBatcher] = None
 
         # Motion detectors (un par caméra)
         self._motion_detectors: Dict[str, MotionDetector] = {}
+        # Suivi des visages (un tracker par caméra, si TRACKING_ENABLED)
+        self._trackers: Dict[str, FaceTracker] = {}
+        # Calibration de la résolution de détection (caméras en auto_calibrate)
+        self._calibrators: Dict[str, DetectionCalibrator] = {}
 
         # Paramètres du profil actif (mis à jour via apply_profile)
         self._motion_required = True
         self._detection_model = "hog"
-        self._analysis_interval = 0.5
+        # Intervalle entre analyses de chaque caméra (adaptatif si target_cpu > 0)
+        self._scheduler = FrameScheduler(target_cpu=0.0, base_interval=0.5)
 
         # Composants optionnels (injectés après construction)
         self._recorder = None    # VideoRecorder
@@ -129,6 +239,9 @@ class SurveillanceEngine:
 
     def set_recorder(self, recorder) -> None:
         self._recorder = recorder
+        # L'enregistreur lit l'historique des anneaux de frames des sources
+        recorder.set_frame_source(self._mgr.get_history)
+        self._mgr.reserve_history(recorder.pre_frames, recorder.fps)
 
     def set_alert_manager(self, alert_mgr) -> None:
         self._alert_mgr = alert_mgr
@@ -139,13 +252,32 @@ class SurveillanceEngine:
         """Applique un SurveillanceProfile. Peut être appelé même pendant l'analyse."""
         self._motion_required = profile.motion_required
         self._detection_model = profile.detection_model
-        self._analysis_interval = profile.analysis_interval
+        self._scheduler.configure(getattr(profile, "target_cpu", 0.0), profile.analysis_interval)
         self._threshold = profile.recognition_threshold
         # Mettre à jour les détecteurs de mouvement existants
         for det in self._motion_detectors.values():
             det._sensitivity = profile.motion_sensitivity
+        self._profile_shards = self._resolve_profile_shards(profile)
+        if self._running:
+            self._sync_encodings()
         logger.info("Profil appliqué : %s", profile.label)
 
+    @staticmethod
+    def _resolve_profile_shards(profile) -> Optional[List[str]]:
+        """
+        Shards chargés pour un profil :
+          encoding_shards explicites → ceux-là
+          sinon target_persons       → shard par défaut + shards contenant une cible
+          sinon                      → tous (None)
+        """
+        shards = list(getattr(profile, "encoding_shards", []) or [])
+        if shards:
+            return shards
+        targets = getattr(profile, "target_persons", []) or []
+        if targets:
+            return [DEFAULT_SHARD] + [s for s in shards_for_names(targets) if s != DEFAULT_SHARD]
+        return None
+
     # ── Listeners ─────────────────────────────────────────────────────────────
 
     def add_event_listener(self, callback: EventCallback) -> None:
@@ -165,7 +297,19 @@ class SurveillanceEngine:
 
     def start(self) -> None:
         self._running = True
+        if self._inference is None:
+            self._inference = InferencePool()
+        self._inference.start()
+        self._batcher = EncodingBatcher(self._inference)
+        self._batcher.start()
         self._refresh_encodings()
+        add_change_listener(self._on_encodings_changed)
+        self._encodings_stop.clear()
+        self._encodings_changed.clear()
+        self._encodings_thread = threading.Thread(
+            target=self._encodings_watch_loop, daemon=True, name="surv-encodings",
+        )
+        self._encodings_thread.start()
         for uid in self._mgr.get_all_sources():
             self._start_camera_thread(uid)
         self._mgr.on_change(self._sync_threads)
@@ -173,6 +317,9 @@ class SurveillanceEngine:
 
     def stop(self) -> None:
         self._running = False
+        remove_change_listener(self._on_encodings_changed)
+        self._encodings_stop.set()
+        self._encodings_changed.set()
         for evt in self._stop_events.values():
             evt.set()
         for t in self._threads.values():
@@ -180,6 +327,12 @@ class SurveillanceEngine:
         self._threads.clear()
         self._stop_events.clear()
         self._queues.clear()
+        if self._batcher is not None:
+            self._batcher.stop()
+            self._batcher = None
+        if self._inference is not None and self._owns_inference:
+            self._inference.shutdown()
+            self._inference = None
         logger.info("SurveillanceEngine arrêté")
 
     def _sync_threads(self) -> None:
@@ -194,10 +347,16 @@ class SurveillanceEngine:
         if uid in self._threads:
             return
         stop_evt = threading.Event()
-        q: queue.Queue = queue.Queue(maxsize=self.QUEUE_MAXSIZE)
+        q = FrameQueue(self.QUEUE_MAXSIZE, self._queue_policy, self._max_frame_age)
         self._stop_events[uid] = stop_evt
         self._queues[uid] = q
         self._motion_detectors[uid] = MotionDetector()
+        if TRACKING_ENABLED:
+            self._trackers[uid] = FaceTracker()
+        config = self._mgr.get_config(uid)
+        if config is not None and config.auto_calibrate:
+            self._calibrators[uid] = DetectionCalibrator()
+        self._scheduler.register(uid)
         with self._stats_lock:
             self.stats[uid] = CameraStats()
 
@@ -224,65 +383,85 @@ class SurveillanceEngine:
             t.join(timeout=3.0)
         self._queues.pop(uid, None)
         self._motion_detectors.pop(uid, None)
+        self._trackers.pop(uid, None)
+        self._calibrators.pop(uid, None)
+        self._scheduler.unregister(uid)
 
     # ── Thread producteur : pushes frames dans la Queue ───────────────────────
 
-    def _produce_loop(self, uid: str, q: queue.Queue, stop_evt: threading.Event) -> None:
+    def _produce_loop(self, uid: str, q: FrameQueue, stop_evt: threading.Event) -> None:
+        last_seq = 0
         while not stop_evt.is_set():
-            frame = self._mgr.get_frame(uid)
-            if frame is not None:
-                # Alimenter le recorder si actif
-                if self._recorder is not None:
-                    try:
-                        self._recorder.push_frame(uid, frame)
-                    except Exception:
-                        pass
-                try:
-                    q.put_nowait(frame)
-                except queue.Full:
-                    pass   # Dropper les frames si l'analyse est trop lente
-            stop_evt.wait(0.033)    # ~30 FPS producteur
+            # Réveillé par la source à chaque nouvelle frame
+            frame = self._mgr.wait_frame(uid, last_seq, timeout=0.5)
+            if frame is None:
+                stop_evt.wait(SCHEDULER_POLL_IDLE)   # source absente ou muette
+                continue
+            if not self._accept_frame(uid, frame, last_seq):
+                frame.release()
+                continue
+            last_seq = frame.seq
+            q.put(frame)   # la référence passe à la file (qui évince selon sa politique)
+            # Scène calme : toutes les frames ne sont pas examinées
+            poll = self._poll_interval(uid)
+            if poll > SCHEDULER_POLL_ACTIVE:
+                stop_evt.wait(poll)
+        q.clear()
+
+    def _poll_interval(self, uid: str) -> float:
+        """Pause du producteur : pas de ralentissement pendant un enregistrement."""
+        recording = self._recorder is not None and self._recorder.is_recording(uid)
+        return self._scheduler.poll_interval(uid, recording=recording)
+
+    def _accept_frame(self, uid: str, frame: Frame, last_seq: int) -> bool:
+        """
+        Compte les frames de la caméra jamais vues (écart de séquence) et
+        écarte une frame déjà transmise. Une séquence inférieure signale un
+        redémarrage de la source : on repart de cette frame.
+        """
+        duplicate = frame.seq == last_seq
+        dropped = frame.seq - last_seq - 1 if 0 < last_seq < frame.seq else 0
+        with self._stats_lock:
+            stats = self.stats.get(uid)
+            if stats is not None:
+                stats.frames_duplicate += int(duplicate)
+                stats.frames_dropped += dropped
+        return not duplicate
 
     # ── Thread consommateur : analyse ────────────────────────────────────────
 
-    def _analyse_loop(self, uid: str, q: queue.Queue, stop_evt: threading.Event) -> None:
+    def _analyse_loop(self, uid: str, q: FrameQueue, stop_evt: threading.Event) -> None:
         config = self._mgr.get_config(uid)
-        cam_name = config.name if config else uid
         motion_det = self._motion_detectors.get(uid)
+        tracker = self._trackers.get(uid)
 
         fps_frames = 0
         fps_start = time.monotonic()
+        metrics = self._metrics
+        metrics.begin(uid)
 
         while not stop_evt.is_set():
             t0 = time.monotonic()
 
             try:
-                frame = q.get(timeout=0.5)
+                queued_at, frame = q.get(timeout=0.5)
             except queue.Empty:
                 continue
-
-            # ── Détection de mouvement ────────────────────────────────────────
-            motion_detected = True
-            motion_score = 1.0
-            if self._motion_required and motion_det is not None:
-                motion_detected, motion_score = motion_det.update(frame)
-                if not motion_detected:
-                    fps_frames += 1
-                    continue   # Pas de mouvement → on saute la reconnaissance
-
+            now = time.monotonic()
+            metrics.add("queue", now - queued_at)
+            metrics.add("age", now - frame.monotonic)
             with self._stats_lock:
                 if uid in self.stats:
-                    self.stats[uid].motion_triggers += 1
+                    stats = self.stats[uid]
+                    stats.queue_depth = q.qsize()
+                    stats.frame_age = round(now - frame.monotonic, 3)
+                    stats.queue_dropped, stats.queue_stale = q.dropped, q.stale
 
-            # ── Mise à jour cache encodages ────────────────────────────────────
-            self._maybe_refresh_encodings()
-
-            # ── Appliquer le ROI sur la frame si configuré ─────────────────────
-            analysis_frame = self._apply_roi(frame, config)
-
-            # ── Reconnaissance ─────────────────────────────────────────────────
-            faces = self._process_frame(analysis_frame)
+            with frame:
+                analysed = self._analyse_frame(uid, frame, config, motion_det, tracker)
             fps_frames += 1
+            if not analysed:
+                continue   # Pas de mouvement → on saute la reconnaissance
 
             # ── FPS ─────────────────────────────────────────────────────────────
             elapsed_fps = time.monotonic() - fps_start
@@ -294,22 +473,76 @@ class SurveillanceEngine:
                 fps_frames = 0
                 fps_start = time.monotonic()
 
-            if faces:
+            # Intervalle attribué par l'ordonnanceur
+            interval = self._scheduler.next_interval(uid)
+            with self._stats_lock:
+                if uid in self.stats:
+                    self.stats[uid].analysis_interval = round(interval, 3)
+            elapsed = time.monotonic() - t0
+            wait = max(0.0, interval - elapsed)
+            if wait > 0:
+                stop_evt.wait(wait)
+        metrics.end()
+        q.clear()
+
+    def _analyse_frame(self, uid: str, frame: Frame, config, motion_det, tracker) -> bool:
+        """
+        Mouvement → reconnaissance → événement pour une frame (lecture seule).
+        Retourne False si la frame a été écartée faute de mouvement.
+        """
+        metrics = self._metrics
+        t_frame = time.monotonic()
+        image = frame.image
+
+        # ── Détection de mouvement ────────────────────────────────────────────
+        motion_detected = True
+        motion_score = 1.0
+        regions = None   # zones en mouvement (None = frame entière)
+        if self._motion_required and motion_det is not None:
+            with metrics.stage("motion"):
+                motion_detected, motion_score, regions = motion_det.update_regions(image)
+            self._scheduler.record_motion(uid, motion_detected)
+            if not motion_detected:
+                return False
+
+        with self._stats_lock:
+            if uid in self.stats:
+                self.stats[uid].motion_triggers += 1
+
+        # ── Appliquer le ROI sur la frame si configuré ─────────────────────────
+        analysis_frame = self._apply_roi(image, config)
+        if regions is not None:
+            regions = self._regions_in_roi(regions, image, config)
+
+        # ── Reconnaissance ─────────────────────────────────────────────────────
+        t_cost = time.monotonic()
+        if tracker is not None:
+            faces = self._process_tracked_frame(analysis_frame, tracker, config, regions)
+        else:
+            faces = self._process_frame(analysis_frame, config, regions)
+        self._scheduler.record_analysis(uid, time.monotonic() - t_cost, len(faces))
+        if faces and uid in self._calibrators:
+            self._calibrate(uid, config, faces)
+
+        if faces:
+            cam_name = config.name if config else uid
+            with metrics.stage("annotate"):
                 annotated = self._annotate_frame(frame.copy(), faces, config)
-                event = SurveillanceEvent(
-                    camera_uid=uid,
-                    camera_name=cam_name,
-                    timestamp=time.time(),
-                    faces=faces,
-                    motion_score=motion_score,
-                    frame=annotated,
-                )
-                with self._stats_lock:
-                    if uid in self.stats:
-                        self.stats[uid].detections += 1
-                        self.stats[uid].frames_analysed += 1
-                        self.stats[uid].last_detection_ts = event.timestamp
+            event = SurveillanceEvent(
+                camera_uid=uid,
+                camera_name=cam_name,
+                timestamp=time.time(),
+                faces=faces,
+                motion_score=motion_score,
+                frame=annotated,
+            )
+            with self._stats_lock:
+                if uid in self.stats:
+                    self.stats[uid].detections += 1
+                    self.stats[uid].frames_analysed += 1
+                    self.stats[uid].last_detection_ts = event.timestamp
 
+            with metrics.stage("emit"):
                 # Déclencher l'enregistrement vidéo
                 if self._recorder is not None:
                     try:
@@ -333,12 +566,8 @@ class SurveillanceEngine:
                         pass
 
                 self._emit(event)
-
-            # Respecter l'intervalle d'analyse
-            elapsed = time.monotonic() - t0
-            wait = max(0.0, self._analysis_interval - elapsed)
-            if wait > 0:
-                stop_evt.wait(wait)
+        metrics.add("total", time.monotonic() - t_frame)
+        return True
 
     # ── Traitement d'une frame ────────────────────────────────────────────────
 
@@ -353,42 +582,191 @@ class SurveillanceEngine:
             return frame[y1:y2, x1:x2]
         return frame
 
-    def _process_frame(self, frame: np.ndarray) -> List[DetectedFace]:
-        small = cv2.resize(frame, (0, 0), fx=0.5, fy=0.5)
-        rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+    def _regions_in_roi(self, regions, frame: np.ndarray, config) -> List[Tuple[int, int, int, int]]:
+        """Ramène les zones (x, y, w, h) de la frame complète dans la frame ROI."""
+        roi_frame = self._apply_roi(frame, config)
+        if roi_frame is frame:
+            return list(regions)
+        ox, oy = max(0, config.roi[0]), max(0, config.roi[1])
+        rh, rw = roi_frame.shape[:2]
+        out = []
+        for x, y, w, h in regions:
+            x1, y1 = max(0, x - ox), max(0, y - oy)
+            x2, y2 = min(rw, x - ox + w), min(rh, y - oy + h)
+            if x2 > x1 and y2 > y1:
+                out.append((x1, y1, x2 - x1, y2 - y1))
+        return out
+
+    def _process_frame(self, frame: np.ndarray, config=None, regions=None) -> List[DetectedFace]:
+        """
+        regions : zones en mouvement (x, y, w, h) de frame ; la détection se
+        limite à ces zones (avec marge). None = frame entière.
+        """
+        scale, upsample = self._detection_settings(config)
+        with self._metrics.stage("resize"):
+            small = self._downscale(frame, scale)
+            rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+
+        locations = self._locate(rgb, regions, scale, upsample, self._detector_for(config))
+        # Toutes les faces de la frame en un seul encodage / appariement
+        matches = self._identify(rgb, locations, config)
+        return [
+            self._detected_face(loc, name, dist, scale=scale)
+            for loc, (name, dist) in zip(locations, matches)
+        ]
+
+    def _process_tracked_frame(self, frame: np.ndarray, tracker: FaceTracker, config=None, regions=None) -> List[DetectedFace]:
+        """
+        Comme _process_frame, mais la détection ne tourne que lorsque le tracker
+        la demande et seules les pistes nouvelles ou déplacées sont ré-encodées.
+        """
+        scale, upsample = self._detection_settings(config)
+        with self._metrics.stage("resize"):
+            small = self._downscale(frame, scale)
+            gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+            rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+
+        pending: Optional[List[Track]] = None
+        if not tracker.needs_detection():
+            with self._metrics.stage("track"):
+                pending = tracker.follow(gray)
+        if pending is None:   # détection planifiée ou piste perdue
+            if regions is not None:
+                # Les visages suivis restent cherchés même immobiles
+                regions = list(regions) + [
+                    (int(left / scale), int(top / scale), int((right - left) / scale), int((bottom - top) / scale))
+                    for top, right, bottom, left in (t.location for t in tracker.tracks)
+                ]
+            pending = tracker.update_detections(
+                gray, self._locate(rgb, regions, scale, upsample, self._detector_for(config)),
+            )
+
+        if pending:
+            matches = self._identify(rgb, [t.location for t in pending], config)
+            for track, (name, dist) in zip(pending, matches):
+                tracker.identify(track, name, dist)
+
+        return [
+            self._detected_face(t.location, t.name, t.distance, t.track_id, scale)
+            for t in tracker.visible()
+        ]
+
+    def _calibrate(self, uid: str, config, faces: List[DetectedFace]) -> None:
+        """
+        Relève la taille des visages ; applique et persiste le réglage une fois prêt.
+        Sans tracker, faces sort du détecteur à chaque frame ; avec tracker,
+        chaque piste n'est relevée qu'une fois (boîte de la détection qui l'a créée).
+        """
+        calibrator = self._calibrators[uid]
+        calibrator.add([f.location for f in faces], [f.track_id for f in faces])
+        if not calibrator.done:
+            return
+        scale, upsample = calibrator.result()
+        config.detection_scale, config.detection_upsample = scale, upsample
+        config.auto_calibrate = False
+        del self._calibrators[uid]
+        tracker = self._trackers.get(uid)
+        if tracker is not None:
+            tracker.reset()   # coordonnées des pistes liées à l'ancienne échelle
+        save = getattr(self._mgr, "save_config", None)
+        if save is not None:
+            save(config)
+        logger.info(
+            "Calibration détection %s : échelle %.3g, suréchantillonnage %d", config.name, scale, upsample,
+        )
 
-        locations = face_recognition.face_locations(rgb, model=self._detection_model)
+    def _detector_for(self, config) -> str:
+        """Détecteur de la caméra (voir face_detectors.py), sinon celui du profil."""
+        return (getattr(config, "detection_model", "") if config is not None else "") or self._detection_model
+
+    def _detection_settings(self, config) -> Tuple[float, int]:
+        """(réduction, suréchantillonnage) de la caméra ; réglage large pendant sa calibration."""
+        if config is None:
+            return 0.5, 1
+        calibrator = self._calibrators.get(config.uid)
+        if calibrator is not None:
+            return calibrator.settings
+        return config.detection_scale, config.detection_upsample
+
+    @staticmethod
+    def _downscale(frame: np.ndarray, scale: float) -> np.ndarray:
+        if scale == 1.0:
+            return frame
+        return cv2.resize(frame, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    def _locate(
+        self, rgb: np.ndarray, regions=None, scale: float = 0.5, upsample: int = 1, model: Optional[str] = None,
+    ) -> List[Tuple[int, int, int, int]]:
+        """
+        Détection sur la frame réduite rgb (facteur scale). Avec des zones en
+        mouvement (en coordonnées pleine résolution), seules leurs découpes sont analysées.
+        """
+        crops = detection_crops(rgb.shape, regions, scale) if regions is not None else None
+        if crops is None:
+            crops = [(0, 0, rgb.shape[0], rgb.shape[1])]
+        model = model or self._detection_model
+        with self._metrics.stage("detect"):
+            if self._inference is not None:
+                futures = [
+                    self._inference.submit_locate(rgb[y0:y1, x0:x1], model=model, upsample=upsample)
+                    for y0, x0, y1, x1 in crops
+                ]
+                found = [f.result() for f in futures]
+            else:
+                found = [locate_faces(rgb[y0:y1, x0:x1], model=model, upsample=upsample) for y0, x0, y1, x1 in crops]
+
+        locations = []
+        for (y0, x0, _, _), locs in zip(crops, found):
+            locations.extend((top + y0, right + x0, bottom + y0, left + x0) for top, right, bottom, left in locs)
+        return locations
+
+    def _identify(self, rgb: np.ndarray, locations, config) -> List[Tuple[Optional[str], float]]:
+        """Encodage + appariement, regroupés avec les autres caméras si possible."""
         if not locations:
             return []
-
-        encodings = face_recognition.face_encodings(rgb, locations)
-
-        with self._cache_lock:
-            known_names = list(self._encodings_cache.keys())
-            known_encs = list(self._encodings_cache.values())
-
-        results: List[DetectedFace] = []
-        for loc, enc in zip(locations, encodings):
-            top, right, bottom, left = loc
-            loc_full = (top * 2, right * 2, bottom * 2, left * 2)
-
-            name, confidence, is_known = "Inconnu", 0.0, False
-            if known_encs:
-                distances = face_recognition.face_distance(known_encs, enc)
-                best_idx = int(np.argmin(distances))
-                best_dist = float(distances[best_idx])
-                if best_dist < self._threshold:
-                    name = known_names[best_idx]
-                    confidence = round(1.0 - best_dist, 3)
-                    is_known = True
-                else:
-                    confidence = round(1.0 - best_dist, 3)
-
-            results.append(DetectedFace(
-                location=loc_full, name=name, confidence=confidence, is_known=is_known,
-            ))
+        crops = crop_faces(rgb, locations)
+        matchers = self._matchers_for(config)
+        if self._batcher is not None:
+            timings: Dict[str, float] = {}
+            start = time.perf_counter()
+            future = self._batcher.submit(crops, matchers, self._threshold, timings)
+            try:
+                results = future.result(timeout=ENCODING_BATCH_RESULT_TIMEOUT)
+            except Exception as exc:
+                # Lot en échec ou bloqué : visages non identifiés, la caméra continue
+                logger.warning("Identification par lot impossible : %s", exc)
+                return [(None, float("inf"))] * len(crops)
+            # "encode" inclut l'attente de constitution du lot
+            match = timings.get("match", 0.0)
+            self._metrics.add("encode", time.perf_counter() - start - match)
+            self._metrics.add("match", match)
+            return results
+        with self._metrics.stage("encode"):
+            encoded = encode_faces_batch(crops)
+        results: List[Tuple[Optional[str], float]] = [(None, float("inf"))] * len(crops)
+        found = [i for i, faces in enumerate(encoded) if faces]
+        if found:
+            with self._metrics.stage("match"):
+                probes = np.asarray([encoded[i][0] for i in found])
+                for i, match in zip(found, best_across(matchers, probes, self._threshold)):
+                    results[i] = match
         return results
 
+    @staticmethod
+    def _detected_face(
+        loc, best_name: Optional[str], best_dist: float, track_id: Optional[int] = None, scale: float = 0.5,
+    ) -> DetectedFace:
+        loc_full = tuple(int(round(v / scale)) for v in loc)
+
+        name, confidence, is_known = "Inconnu", 0.0, False
+        if best_dist != float("inf"):
+            confidence = round(1.0 - best_dist, 3)
+        if best_name is not None:
+            name, is_known = best_name, True
+        return DetectedFace(
+            location=loc_full, name=name, confidence=confidence, is_known=is_known, track_id=track_id,
+        )
+
     def _annotate_frame(self, frame: np.ndarray, faces: List[DetectedFace], config) -> np.ndarray:
         # Décaler si ROI active
         off_x = off_y = 0
@@ -408,27 +786,144 @@ class SurveillanceEngine:
 
     # ── Cache encodages ───────────────────────────────────────────────────────
 
-    def _maybe_refresh_encodings(self) -> None:
-        if time.monotonic() - self._last_cache_refresh > self.CACHE_REFRESH_INTERVAL:
-            self._refresh_encodings()
+    def _active_shards(self) -> List[str]:
+        """Shards du profil actif + shards propres aux caméras configurées."""
+        shards = list(self._profile_shards) if self._profile_shards is not None else list_shards()
+        for config in self._mgr.list_configs():
+            for shard in getattr(config, "encoding_shards", []) or []:
+                if shard not in shards:
+                    shards.append(shard)
+        return shards
+
+    def _matchers_for(self, config) -> List[GalleryMatcher]:
+        """Galeries comparées pour une caméra (ses shards, sinon ceux du profil)."""
+        matchers = self._matchers
+        shards = getattr(config, "encoding_shards", None) if config is not None else None
+        if not shards:
+            shards = self._profile_shards if self._profile_shards is not None else list(matchers)
+        return [matchers[s] for s in shards if s in matchers]
+
+    def _encodings_watch_loop(self) -> None:
+        """
+        Thread dédié : applique les modifications signalées in-process et
+        détecte périodiquement celles faites par un autre processus.
+        """
+        while True:
+            self._encodings_changed.wait(self.CACHE_REFRESH_INTERVAL)
+            self._encodings_changed.clear()
+            if self._encodings_stop.is_set():
+                break
+            try:
+                self._sync_encodings()
+            except Exception as exc:
+                logger.error("Erreur vérification encodages : %s", exc)
+
+    def _on_encodings_changed(self, generation: int) -> None:
+        """
+        Listener in-process (enrôlement / suppression depuis l'UI) : appelé dans
+        le thread qui enregistre, il ne fait que réveiller surv-encodings.
+        """
+        self._encodings_changed.set()
+
+    def _sync_encodings(self) -> None:
+        """Charge / libère les shards actifs puis applique les deltas de chacun."""
+        with self._sync_lock:
+            active = self._active_shards()
+            matchers = {s: m for s, m in self._matchers.items() if s in active}
+            if len(matchers) != len(self._matchers):
+                self._matchers = matchers
+            for shard in list(self._cache_generations):
+                if shard not in active:
+                    del self._cache_generations[shard]
+            for shard in active:
+                try:
+                    if encodings_generation(shard) != self._cache_generations.get(shard, -1):
+                        self._sync_shard(shard)
+                except Exception as exc:
+                    logger.error("Erreur synchronisation shard %s : %s", shard, exc)
+
+    def _sync_shard(self, shard: str) -> None:
+        """Applique uniquement les deltas du journal depuis la dernière génération."""
+        with self._sync_lock:
+            matcher = self._matchers.get(shard)
+            if matcher is None:
+                self._refresh_shard(shard)
+                return
+            try:
+                generation, changes = load_encoding_changes(
+                    self._cache_generations.get(shard, -1), shard,
+                )
+            except Exception as exc:
+                logger.error("Erreur lecture journal encodages : %s", exc)
+                return
+            if changes is None:
+                self._refresh_shard(shard)
+                return
+            if changes and GALLERY_MODE == "compact":
+                # Galerie compacte : on recalcule les personnes touchées
+                affected = {change["name"] for change in changes}
+                matcher = matcher.with_identities(
+                    load_samples_by_name(affected, shard), affected,
+                )
+                logger.debug("Cache encodages : %d personne(s) recalculée(s)", len(affected))
+            elif changes:
+                added: Dict[str, Tuple[str, np.ndarray]] = {}
+                removed = set()
+                for change in changes:
+                    if change["op"] == "add":
+                        added[change["uid"]] = (change["name"], change["encoding"])
+                    elif added.pop(change["uid"], None) is None:
+                        removed.add(change["uid"])
+                matcher = matcher.with_changes(
+                    removed, [(uid, name, enc) for uid, (name, enc) in added.items()],
+                )
+                logger.debug("Cache encodages : %d modification(s) appliquée(s)", len(changes))
+            self._matchers = {**self._matchers, shard: matcher}
+            self._cache_generations[shard] = generation
+            self._invalidate_tracks()
+
+            # Seuil ANN franchi : recharger pour récupérer l'index construit par le store
+            if len(matcher) >= ANN_MIN_GALLERY_SIZE and matcher.index is None:
+                self._refresh_shard(shard)
+
+    def _refresh_shard(self, shard: str) -> None:
+        with self._sync_lock:
+            try:
+                generation = encodings_generation(shard)
+                matcher = GalleryMatcher.from_store(shard=shard)
+                self._matchers = {**self._matchers, shard: matcher}
+                self._cache_generations[shard] = generation
+                self._invalidate_tracks()
+                logger.debug("Cache encodages rechargé (shard %s : %d visage(s))", shard, len(matcher))
+            except Exception as exc:
+                logger.error("Erreur rechargement encodages : %s", exc)
+
+    def _invalidate_tracks(self) -> None:
+        """Galerie modifiée : les pistes suivies seront ré-identifiées."""
+        for tracker in list(self._trackers.values()):
+            tracker.invalidate_identities()
 
     def _refresh_encodings(self) -> None:
-        try:
-            new_map = load_encodings_map()
-            with self._cache_lock:
-                self._encodings_cache = {
-                    name: np.array(enc) for name, enc in new_map.items()
-                }
-            self._last_cache_refresh = time.monotonic()
-            logger.debug("Cache encodages rechargé (%d visage(s))", len(self._encodings_cache))
-        except Exception as exc:
-            logger.error("Erreur rechargement encodages : %s", exc)
+        with self._sync_lock:
+            self._matchers = {}
+            self._cache_generations = {}
+            self._sync_encodings()
 
     def force_refresh_encodings(self) -> None:
-        self._last_cache_refresh = 0.0
+        self._refresh_encodings()
 
     # ── Accès aux stats ───────────────────────────────────────────────────────
 
     def get_stats(self, uid: str) -> Optional[CameraStats]:
         with self._stats_lock:
-            return self.stats.get(uid)
+            stats = self.stats.get(uid)
+            if stats is not None:
+                stats.latency = self._metrics.snapshot(uid)
+            return stats
+
+    def prometheus_metrics(self) -> str:
+        """Latences par étape et compteurs de chaque caméra, format texte Prometheus."""
+        names = {c.uid: c.name for c in self._mgr.list_configs()}
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return prometheus_text(self._metrics, stats, names)
@@ -3,10 +3,13 @@ video_recorder.py
 Enregistrement vidéo déclenché par événement.
 
 Fonctionnement :
-  - Buffer circulaire en mémoire : conserve les N dernières secondes de chaque caméra
-  - Quand un événement de détection survient, le buffer est vidé dans un fichier .mp4
-    (incluant les frames AVANT la détection + les frames APRÈS)
+  - L'anneau de frames de chaque source (FrameRing) conserve les N dernières
+    secondes de la caméra
+  - Quand un événement de détection survient, cet historique est écrit dans un
+    fichier .mp4 (frames AVANT la détection), suivi des frames APRÈS
   - Les clips sont nommés avec la date, l'heure et le nom de la caméra
+  - Les frames sont des références sur la mémoire de la source (aucune copie),
+    rendues après écriture dans le clip
 
 Structure des clips :
   clips/
@@ -19,53 +22,34 @@ import logging
 import os
 import threading
 import time
-from collections import deque
 from datetime import datetime
 from pathlib import Path
-from typing import Deque, Dict, Optional, Tuple
+from typing import Callable, Dict, List, Optional
 
 import cv2
-import numpy as np
 
 from ..storage.config import PROJECT_ROOT
+from .camera_source import HISTORY_PACE_TOLERANCE
+from .frame import Frame
 
 logger = logging.getLogger(__name__)
 
 CLIPS_DIR = PROJECT_ROOT / "clips"
 
 
-class CameraBuffer:
-    """Buffer circulaire de frames pour une caméra."""
-
-    def __init__(self, pre_seconds: float, fps: float = 15.0) -> None:
-        self._fps = fps
-        capacity = int(pre_seconds * fps)
-        self._frames: Deque[np.ndarray] = deque(maxlen=max(1, capacity))
-        self._lock = threading.Lock()
-
-    def push(self, frame: np.ndarray) -> None:
-        with self._lock:
-            self._frames.append(frame.copy())
-
-    def drain(self) -> list:
-        """Vide et retourne toutes les frames du buffer."""
-        with self._lock:
-            frames = list(self._frames)
-            self._frames.clear()
-            return frames
-
-    @property
-    def fps(self) -> float:
-        return self._fps
+FrameHistory = Callable[[str, int, int], List[Frame]]
 
 
 class VideoRecorder:
     """
     Gestionnaire d'enregistrement de clips vidéo multi-caméras.
 
+    Les frames viennent de l'anneau de chaque source (FrameRing) via
+    set_frame_source(camera_manager.get_history) ; le moteur s'en charge.
+
     Usage :
         rec = VideoRecorder(clips_dir, pre_seconds=5, post_seconds=10)
-        rec.push_frame("cam1", frame)           # appelé à chaque frame
+        rec.set_frame_source(camera_manager.get_history)
         rec.trigger_recording("cam1", "Salon")  # déclenche un clip
     """
 
@@ -86,9 +70,8 @@ class VideoRecorder:
         self._fps = fps
         self._max_clips = max_clips
 
-        # Buffer par caméra
-        self._buffers: Dict[str, CameraBuffer] = {}
-        self._buf_lock = threading.Lock()
+        # Historique des frames par caméra : (uid, nombre, après seq) → frames
+        self._history: Optional[FrameHistory] = None
 
         # Threads d'enregistrement en cours
         self._rec_threads: Dict[str, threading.Thread] = {}
@@ -96,13 +79,18 @@ class VideoRecorder:
 
     # ── API principale ────────────────────────────────────────────────────────
 
-    def push_frame(self, camera_uid: str, frame: np.ndarray) -> None:
-        """Ajoute une frame au buffer de la caméra (appelé depuis le thread caméra)."""
-        with self._buf_lock:
-            if camera_uid not in self._buffers:
-                self._buffers[camera_uid] = CameraBuffer(self._pre, self._fps)
-            buf = self._buffers[camera_uid]
-        buf.push(frame)
+    @property
+    def pre_frames(self) -> int:
+        """Frames d'historique à conserver par caméra pour le pré-événement."""
+        return max(1, int(self._pre * self._fps))
+
+    @property
+    def fps(self) -> float:
+        """Cadence des clips : l'historique n'a pas besoin de plus d'images."""
+        return self._fps
+
+    def set_frame_source(self, history: Optional[FrameHistory]) -> None:
+        self._history = history
 
     def trigger_recording(self, camera_uid: str, camera_name: str) -> Optional[Path]:
         """
@@ -114,12 +102,12 @@ class VideoRecorder:
             if camera_uid in self._rec_threads and self._rec_threads[camera_uid].is_alive():
                 return None   # déjà en cours d'enregistrement
 
-        with self._buf_lock:
-            buf = self._buffers.get(camera_uid)
-        if buf is None:
+        if self._history is None:
+            return None
+        pre_frames = self._history(camera_uid, self.pre_frames, 0)
+        if not pre_frames:
             return None
 
-        pre_frames = buf.drain()
         clip_path = self._clip_path(camera_name)
         t = threading.Thread(
             target=self._write_clip,
@@ -138,10 +126,6 @@ class VideoRecorder:
             t = self._rec_threads.get(camera_uid)
         return t is not None and t.is_alive()
 
-    def remove_camera(self, camera_uid: str) -> None:
-        with self._buf_lock:
-            self._buffers.pop(camera_uid, None)
-
     # ── Écriture du clip ──────────────────────────────────────────────────────
 
     def _write_clip(
@@ -150,46 +134,48 @@ class VideoRecorder:
         pre_frames: list,
         clip_path: Path,
     ) -> None:
-        """Thread : écrit les frames pré-détection puis capture les frames post."""
+        """
+        Thread : écrit les frames pré-détection puis celles capturées ensuite.
+        Les frames sont écrites à la cadence du clip (fps en moyenne) ; une
+        frame en avance de moins de HISTORY_PACE_TOLERANCE × 1/fps est gardée
+        (gigue de la capture : une caméra à 30 i/s donne un clip à 15 i/s).
+        """
         writer: Optional[cv2.VideoWriter] = None
-        frame_size: Optional[Tuple[int, int]] = None
-        post_count = int(self._post * self._fps)
         written = 0
+        last_seq = 0
+        step = 1.0 / self._fps
+        next_ts: Optional[float] = None
+        pending: List[Frame] = list(pre_frames)
 
         try:
-            # Écrire les frames pré-détection
-            for frame in pre_frames:
-                if writer is None:
-                    h, w = frame.shape[:2]
-                    frame_size = (w, h)
-                    writer = cv2.VideoWriter(
-                        str(clip_path), self.FOURCC, self._fps, frame_size
-                    )
-                writer.write(frame)
-                written += 1
-
-            # Capturer les frames post-détection depuis le buffer
             deadline = time.monotonic() + self._post
-            while time.monotonic() < deadline:
-                with self._buf_lock:
-                    buf = self._buffers.get(camera_uid)
-                if buf is None:
-                    break
-                new_frames = buf.drain()
-                for frame in new_frames:
-                    if writer is None:
-                        h, w = frame.shape[:2]
-                        frame_size = (w, h)
-                        writer = cv2.VideoWriter(
-                            str(clip_path), self.FOURCC, self._fps, frame_size
-                        )
-                    writer.write(frame)
+            while True:
+                while pending:
+                    frame = pending.pop(0)
+                    with frame:
+                        last_seq = frame.seq
+                        if next_ts is not None and frame.timestamp < next_ts - HISTORY_PACE_TOLERANCE * step:
+                            continue
+                        if next_ts is None:
+                            next_ts = frame.timestamp + step
+                        else:
+                            next_ts = max(next_ts + step, frame.timestamp + (1.0 - HISTORY_PACE_TOLERANCE) * step)
+                        if writer is None:
+                            h, w = frame.shape[:2]
+                            writer = cv2.VideoWriter(str(clip_path), self.FOURCC, self._fps, (w, h))
+                        writer.write(frame.image)
                     written += 1
+                if time.monotonic() >= deadline:
+                    break
                 time.sleep(1.0 / self._fps)
+                # Frames capturées depuis la dernière écrite
+                pending = self._history(camera_uid, self.pre_frames, last_seq)
 
             logger.info("Clip enregistré : %s (%d frames)", clip_path.name, written)
         except Exception as exc:
             logger.error("Erreur enregistrement clip : %s", exc)
+            for frame in pending:
+                frame.release()
         finally:
             if writer:
                 writer.release()
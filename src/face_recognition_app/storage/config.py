@@ -12,6 +12,81 @@ DUPLICATE_TOLERANCE = 0.6
 # Tolérance pour le regroupement de visages issus d'une vidéo
 VIDEO_FACE_TOLERANCE = 0.5
 
+# --- Galerie multi-échantillons ---
+# "compact" : par personne, centroïde + exemplaires diversifiés (coût O(identités))
+# "samples" : tous les échantillons enregistrés (coût O(échantillons))
+GALLERY_MODE = "compact"
+# Nombre maximal d'exemplaires conservés par personne en mode compact
+MAX_EXEMPLARS_PER_IDENTITY = 4
+
+# Précision de la galerie en mémoire : "float32" (défaut), "float16" ou "int8"
+# (échelle par vecteur). Le stockage sur disque reste en float32.
+EMBEDDING_PRECISION = "float32"
+
+# Nombre de miniatures décodées gardées en mémoire (cache LRU)
+THUMBNAIL_CACHE_SIZE = 256
+
+# --- Index ANN (IVF) pour les très grandes galeries ---
+# En dessous de ce nombre d'encodages, la recherche exhaustive reste plus rapide
+ANN_MIN_GALLERY_SIZE = 20000
+# Cellules explorées par requête : plus = meilleur rappel, plus lent
+# (galerie de 100k : 16 → ~99,5 % de décisions identiques, ~5× plus rapide)
+ANN_NPROBE = 16
+# Explore aussi toute cellule pouvant contenir un visage sous le seuil
+# → décisions garanties identiques, mais élague peu en dimension 128 (lent)
+ANN_BOUNDED_SEARCH = False
+
+# --- Pool d'inférence partagé (détection + encodage) ---
+# Nombre de workers (0 = nombre de cœurs − 1), indépendant du nombre de caméras
+INFERENCE_WORKERS = 0
+# "process" (mémoire partagée, pas de GIL) | "thread"
+INFERENCE_BACKEND = "process"
+# Micro-batching inter-caméras de l'encodage : un lot part dès qu'il atteint
+# ENCODING_BATCH_MAX_SIZE visages ou que sa première requête a attendu
+# ENCODING_BATCH_MAX_LATENCY secondes
+ENCODING_BATCH_MAX_SIZE = 32
+ENCODING_BATCH_MAX_LATENCY = 0.02
+# Attente maximale d'un lot par une caméra (s) ; au-delà, visages non identifiés
+ENCODING_BATCH_RESULT_TIMEOUT = 10.0
+
+# --- Ordonnanceur des analyses (SurveillanceProfile.target_cpu > 0) ---
+# Bornes de l'intervalle entre deux analyses d'une même caméra (secondes)
+SCHEDULER_MIN_INTERVAL = 0.1
+SCHEDULER_MAX_INTERVAL = 5.0
+# Période de lecture des frames : caméra active / caméra calme
+SCHEDULER_POLL_ACTIVE = 0.033
+SCHEDULER_POLL_IDLE = 0.1
+
+# --- Suivi des visages entre détections ---
+TRACKING_ENABLED = True
+# Détection complète toutes les K frames analysées (ou dès qu'une piste est perdue)
+TRACKER_REDETECT_EVERY = 5
+
+# --- Détection restreinte aux zones en mouvement ---
+# Marge autour de chaque zone en mouvement (fraction de sa plus grande dimension)
+MOTION_REGION_PADDING = 0.25
+# Au-delà de cette fraction de la frame couverte par les zones, détection sur
+# la frame entière (plusieurs découpes coûteraient plus qu'une seule passe)
+MOTION_FULL_FRAME_COVERAGE = 0.5
+
+# --- Détecteurs de visages (voir services/face_detectors.py) ---
+# Cascade de Haar ("" = haarcascade_frontalface_default.xml fourni avec OpenCV)
+HAAR_CASCADE_PATH = ""
+# Modèle ONNX YuNet (opencv_zoo : face_detection_yunet_2023mar.onnx)
+YUNET_MODEL_PATH = PROJECT_ROOT / "models" / "face_detection_yunet_2023mar.onnx"
+YUNET_SCORE_THRESHOLD = 0.7
+
+# --- Frames des caméras (voir services/frame_ring.py) ---
+# Slots pré-alloués par caméra en plus de l'historique de l'enregistreur :
+# dernière frame, file d'analyse et frames en cours de traitement
+FRAME_RING_SLOTS = 8
+
+# --- File d'analyse par caméra (voir services/frame_queue.py) ---
+# "drop-oldest" | "latest-only" | "bounded-age"
+QUEUE_POLICY = "latest-only"
+# bounded-age : âge maximal (s) d'une frame à l'analyse, la plus récente exceptée
+QUEUE_MAX_AGE = 1.0
+
 DEFAULT_ENCODED_DIR = PROJECT_ROOT / "encodings"
 LEGACY_ENCODED_DIR = Path.cwd() / "encodings"
 
@@ -1,36 +1,213 @@
-import base64
+"""
+encodings_store.py
+Accès aux encodages de visages (voir matrix_store.py pour le format disque).
+
+Shards : la galerie peut être découpée en sous-galeries nommées (par site, par
+liste de surveillance…), chacune étant un MatrixEncodingStore indépendant :
+
+  ENCODED_DIR/                 → shard "default" (galerie historique)
+  ENCODED_DIR/shards/<nom>/    → shards nommés
+
+Toutes les fonctions acceptent shard=None (= "default"). Un nœud ne projette en
+mémoire que les shards qu'il utilise (voir SurveillanceProfile.encoding_shards
+et CameraConfig.encoding_shards).
+"""
+
 import json
+import logging
 import os
+import re
+import threading
 import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 
 import cv2
 import numpy as np
 
-from .config import ENCODED_DIR, META_FILE
+from ..core.ann_index import IVFIndex
+from .config import ANN_MIN_GALLERY_SIZE, ENCODED_DIR, GALLERY_MODE, META_FILE, THUMBNAIL_CACHE_SIZE
+from .matrix_store import MatrixEncodingStore, atomic_write_json, validate_legacy_encoding
+
+logger = logging.getLogger(__name__)
+
+ANN_INDEX_FILENAME = "ann_ivf.npz"
+DEFAULT_SHARD = "default"
+SHARDS_DIRNAME = "shards"
+_SHARD_NAME_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+# Callbacks in-process appelés après chaque ajout / suppression : callback(generation)
+# (génération du shard modifié)
+_change_listeners = []
+
+# Miniatures décodées (LRU) : (dossier, uid) → image BGR en lecture seule.
+# Les miniatures ne sont lues dans le blob qu'à la demande (UI, /api/faces).
+_thumbnail_cache = OrderedDict()
+_thumbnail_cache_lock = threading.Lock()
+
+
+def shard_directory(shard=None):
+    """Dossier d'un shard (ENCODED_DIR lui-même pour le shard par défaut)."""
+    if shard is None or shard == DEFAULT_SHARD:
+        return Path(ENCODED_DIR)
+    if not _SHARD_NAME_RE.match(shard):
+        raise ValueError(f"Nom de shard invalide : {shard!r}")
+    return Path(ENCODED_DIR) / SHARDS_DIRNAME / shard
 
 
-def _iter_encoding_files():
-    meta_name = Path(META_FILE).name
-    for filename in os.listdir(ENCODED_DIR):
-        if not filename.endswith(".json"):
-            continue
-        if filename == meta_name:
-            continue
-        if "temp" in filename:
-            continue
-        yield os.path.join(ENCODED_DIR, filename)
+def list_shards():
+    """Shards existants : "default" puis les shards nommés (ordre alphabétique)."""
+    shards_dir = Path(ENCODED_DIR) / SHARDS_DIRNAME
+    named = sorted(p.name for p in shards_dir.iterdir() if p.is_dir()) if shards_dir.is_dir() else []
+    return [DEFAULT_SHARD] + [name for name in named if _SHARD_NAME_RE.match(name)]
+
+
+def _get_store(shard=None):
+    """Retourne le MatrixEncodingStore du shard (dans le ENCODED_DIR courant)."""
+    key = os.path.abspath(shard_directory(shard))
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = MatrixEncodingStore(Path(key))
+            _stores[key] = store
+        return store
+
+
+def add_change_listener(callback):
+    """Enregistre un callback(generation) appelé après chaque modification du store."""
+    if callback not in _change_listeners:
+        _change_listeners.append(callback)
+
+
+def remove_change_listener(callback):
+    if callback in _change_listeners:
+        _change_listeners.remove(callback)
+
+
+def _notify_change(shard=None):
+    generation = _get_store(shard).generation
+    for callback in list(_change_listeners):
+        try:
+            callback(generation)
+        except Exception as exc:
+            logger.error("Erreur listener encodages : %s", exc)
+
+
+def encodings_generation(shard=None):
+    """Génération courante du shard (incrémentée à chaque ajout / suppression)."""
+    return _get_store(shard).generation
+
+
+def load_encoding_changes(since, shard=None):
+    """
+    Retourne (generation, changes) depuis la génération since.
+
+    changes est une liste ordonnée de dicts :
+      {"op": "add", "uid": ..., "name": ..., "encoding": np.ndarray}
+      {"op": "remove", "uid": ..., "name": ...}
+    ou None si le journal ne couvre pas l'intervalle (rechargement complet requis).
+    """
+    store = _get_store(shard)
+    with store.lock:
+        generation = store.generation
+        entries = store.changes_since(since)
+        if entries is None:
+            return generation, None
+
+        added = [uid for e in entries if e["op"] == "add" for uid in e["uids"]]
+        rows = store.rows_for_uids(added)
+        matrix = store.matrix()
+
+    changes = []
+    for entry in entries:
+        for uid, name in zip(entry["uids"], entry["names"]):
+            if entry["op"] == "remove":
+                changes.append({"op": "remove", "uid": uid, "name": name})
+            elif uid in rows:   # sinon supprimé depuis : le "remove" suit
+                changes.append({
+                    "op": "add", "uid": uid, "name": name,
+                    "encoding": np.array(matrix[rows[uid]]),
+                })
+    return generation, changes
+
+
+def _ann_index_path(shard=None):
+    return shard_directory(shard) / ANN_INDEX_FILENAME
+
+
+def load_ann_index(expected_size=None, shard=None):
+    """
+    Retourne l'index IVF persisté s'il correspond à la génération courante
+    du shard (et à expected_size si fourni), sinon None.
+    """
+    loaded = IVFIndex.load(_ann_index_path(shard))
+    if loaded is None:
+        return None
+    index, generation = loaded
+    if generation != encodings_generation(shard):
+        return None
+    if expected_size is not None and len(index) != expected_size:
+        return None
+    return index
+
+
+def build_ann_index(shard=None):
+    """(Re)construit et persiste l'index IVF sur toute la galerie du shard."""
+    store = _get_store(shard)
+    with store.lock:
+        index = IVFIndex.build(np.array(store.matrix()))
+        index.save(store.directory / ANN_INDEX_FILENAME, store.generation)
+    return index
+
+
+def _update_ann_index(store, previous_generation, added=None, removed_rows=None):
+    """
+    Met à jour l'index IVF après un ajout / une suppression (appelé sous store.lock).
+    L'index est optionnel : une erreur ici ne doit jamais bloquer un enrôlement.
+    Seul le mode "samples" lit l'index persisté (la galerie compacte construit
+    le sien en mémoire) : dans les autres modes, rien n'est maintenu.
+    """
+    if GALLERY_MODE != "samples":
+        return
+    path = store.directory / ANN_INDEX_FILENAME
+    try:
+        if len(store) < ANN_MIN_GALLERY_SIZE:
+            if path.exists():
+                path.unlink()
+            return
+
+        index = None
+        loaded = IVFIndex.load(path)
+        if loaded is not None and loaded[1] == previous_generation:
+            index = loaded[0]
+            if removed_rows:
+                index = index.deleted(removed_rows)
+            if added is not None:
+                index = index.appended(added)
+            if index.needs_retrain() or len(index) != len(store):
+                index = None
+
+        if index is None:
+            index = IVFIndex.build(np.array(store.matrix()))
+        index.save(path, store.generation)
+    except Exception as exc:
+        logger.error("Erreur mise à jour de l'index ANN : %s", exc)
 
 
 def _read_json(path):
-    with open(path, "r") as f:
+    with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
 
 def _write_json(path, data):
-    with open(path, "w") as f:
-        json.dump(data, f, indent=4)
+    # Écriture dans un fichier temporaire puis renommage : un crash en cours
+    # d'écriture laisse l'ancien fichier intact
+    atomic_write_json(Path(path), data, indent=4)
 
 
 def load_metadata():
@@ -42,117 +219,243 @@ def load_metadata():
     return {}
 
 
-def update_metadata_entry(uid, name, timestamp):
+def update_metadata_entries(entries, shard=None):
+    """Ajoute [(uid, name, timestamp)] aux métadonnées en une seule écriture."""
     metadata = load_metadata()
-    metadata[uid] = {
-        "name": name,
-        "date_creation": timestamp,
-    }
+    for uid, name, timestamp in entries:
+        metadata[uid] = {
+            "name": name,
+            "date_creation": timestamp,
+        }
+        if shard not in (None, DEFAULT_SHARD):
+            metadata[uid]["shard"] = shard
     _write_json(META_FILE, metadata)
 
 
-def load_existing_encodings():
-    encodings = []
-    for filepath in _iter_encoding_files():
-        try:
-            data = _read_json(filepath)
-        except (OSError, json.JSONDecodeError):
-            continue
-
-        if not validate_encoding(data):
-            continue
-
-        encodings.append({
-            "name": data["name"],
-            "encoding": np.array(data["encoding"]),
-        })
-    return encodings
-
-
-def load_encodings_map():
+def update_metadata_entry(uid, name, timestamp):
+    update_metadata_entries([(uid, name, timestamp)])
+
+
+def load_embedding_matrix(shard=None):
+    """
+    Retourne (names, matrix) : la liste des noms et la matrice (N, 128) float32
+    projetée en mémoire, ligne i ↔ names[i].
+    """
+    _, names, matrix = _get_store(shard).snapshot()
+    return names, matrix
+
+
+def load_embedding_snapshot(shard=None):
+    """Retourne (uids, names, matrix) cohérents, matrix projetée en mémoire."""
+    return _get_store(shard).snapshot()
+
+
+def load_samples_by_name(names=None, shard=None):
+    """
+    Retourne {nom: matrice (k, 128) float32} avec TOUS les échantillons de
+    chaque personne (ou seulement des personnes de names si fourni).
+    """
+    _, all_names, matrix = _get_store(shard).snapshot()
+    wanted = set(names) if names is not None else None
+    rows = {}
+    for row, name in enumerate(all_names):
+        if wanted is None or name in wanted:
+            rows.setdefault(name, []).append(row)
+    return {name: np.array(matrix[idx]) for name, idx in rows.items()}
+
+
+def load_known_names(shard=None):
+    """Noms des personnes enregistrées (sans lire la matrice ni les miniatures)."""
+    return _get_store(shard).distinct_names()
+
+
+def shards_for_names(names):
+    """Shards contenant au moins une des personnes données (ex. target_persons)."""
+    wanted = set(names)
+    return [shard for shard in list_shards() if wanted & set(load_known_names(shard))]
+
+
+def load_face_entries(shard=None):
+    """
+    Retourne [{"uid", "name", "date_creation", "has_thumbnail"}] pour chaque
+    encodage, sans lire la matrice ni les miniatures.
+    """
+    return [
+        {
+            "uid": r["uid"],
+            "name": r["name"],
+            "date_creation": r["timestamp"],
+            "has_thumbnail": r["has_thumbnail"],
+        }
+        for r in _get_store(shard).records()
+    ]
+
+
+def load_existing_encodings(shard=None):
+    names, matrix = load_embedding_matrix(shard)
+    # Une seule lecture contiguë, puis des vues ligne par ligne
+    matrix = np.array(matrix)
+    return [
+        {"name": name, "encoding": matrix[row]}
+        for row, name in enumerate(names)
+    ]
+
+
+def load_encodings_map(shard=None):
     encodings = {}
-    for entry in load_existing_encodings():
+    for entry in load_existing_encodings(shard):
         if entry["name"] not in encodings:
             encodings[entry["name"]] = entry["encoding"]
     return encodings
 
 
-def save_face_encoding(name, encoding, image=None):
-    timestamp = datetime.now().isoformat()
-    unique_id = uuid.uuid4().hex[:12]
-
-    data = {
-        "name": name,
-        "encoding": encoding.tolist(),
-        "timestamp": timestamp,
-    }
-
-    if image is not None:
-        _, buffer = cv2.imencode(".jpg", image)
-        image_base64 = base64.b64encode(buffer).decode("utf-8")
-        data["image_base64"] = image_base64
-
-    os.makedirs(ENCODED_DIR, exist_ok=True)
-    _write_json(os.path.join(ENCODED_DIR, f"{unique_id}.json"), data)
-    update_metadata_entry(unique_id, name, timestamp)
+def _encode_jpeg(image):
+    if image is None:
+        return None
+    ok, buffer = cv2.imencode(".jpg", image)
+    return buffer.tobytes() if ok else None
+
+
+def save_face_encodings_bulk(items, shard=None):
+    """
+    Enregistre [(name, encoding, image|None)] en un seul lot : une écriture de
+    la matrice, de l'index, de l'index ANN et des métadonnées, une seule
+    notification. Retourne la liste des uids créés.
+    """
+    records = []
+    for name, encoding, image in items:
+        records.append((
+            name, encoding, _encode_jpeg(image),
+            datetime.now().isoformat(), uuid.uuid4().hex[:12],
+        ))
+    if not records:
+        return []
+
+    os.makedirs(shard_directory(shard), exist_ok=True)
+    store = _get_store(shard)
+    with store.lock:
+        previous_generation = store.generation
+        uids = store.append(records)
+        _update_ann_index(
+            store, previous_generation, added=np.asarray([r[1] for r in records]),
+        )
+    update_metadata_entries(
+        [(uid, name, timestamp) for name, _, _, timestamp, uid in records], shard,
+    )
+    _notify_change(shard)
+    return uids
+
+
+class EnrolmentBatch:
+    """Lot d'enrôlements accumulés puis enregistrés d'un coup (voir enrolment_batch)."""
+
+    def __init__(self):
+        self.items = []
+        self.uids = []
+
+    def add(self, name, encoding, image=None):
+        self.items.append((name, encoding, image))
+
+    def __len__(self):
+        return len(self.items)
+
+
+@contextmanager
+def enrolment_batch(shard=None):
+    """
+    Usage :
+        with enrolment_batch() as batch:
+            batch.add("Alice", encoding, face_img)
+            batch.add("Alice", other_encoding)
+        batch.uids   # uids créés à la sortie du bloc
+
+    Rien n'est écrit si le bloc lève une exception.
+    """
+    batch = EnrolmentBatch()
+    yield batch
+    batch.uids = save_face_encodings_bulk(batch.items, shard)
+
+
+def save_face_encoding(name, encoding, image=None, shard=None):
+    return save_face_encodings_bulk([(name, encoding, image)], shard)[0]
 
 
 def validate_encoding(data):
-    required = ["name", "encoding", "timestamp"]
-    if not all(key in data for key in required):
-        return False
-    return isinstance(data["encoding"], list) and len(data["encoding"]) == 128
+    return validate_legacy_encoding(data)
 
 
-def _decode_image_base64(image_base64):
-    if not image_base64:
+def _decode_image_bytes(image_bytes):
+    if not image_bytes:
         return None
     try:
-        image_bytes = base64.b64decode(image_base64)
         image_array = np.frombuffer(image_bytes, dtype=np.uint8)
         return cv2.imdecode(image_array, cv2.IMREAD_COLOR)
     except Exception:
         return None
 
 
-def load_image_for_name(name):
-    for filepath in _iter_encoding_files():
-        try:
-            data = _read_json(filepath)
-        except (OSError, json.JSONDecodeError):
-            continue
+def load_thumbnail_bytes(uid, shard=None):
+    """Octets JPEG de la miniature de uid (ou None), lus à la demande dans le blob."""
+    return _get_store(shard).read_thumbnail(uid)
 
-        if data.get("name") != name:
-            continue
 
-        if "image_base64" in data:
-            return _decode_image_base64(data.get("image_base64"))
-
-        if "image" in data and isinstance(data["image"], str):
-            return _decode_image_base64(data.get("image"))
+def load_thumbnail(uid, shard=None):
+    """
+    Miniature décodée de uid (ou None), via un cache LRU de THUMBNAIL_CACHE_SIZE
+    entrées. L'image retournée est partagée : elle est en lecture seule.
+    """
+    key = (os.path.abspath(shard_directory(shard)), uid)
+    with _thumbnail_cache_lock:
+        image = _thumbnail_cache.get(key)
+        if image is not None:
+            _thumbnail_cache.move_to_end(key)
+            return image
 
+    image = _decode_image_bytes(load_thumbnail_bytes(uid, shard))
+    if image is None:
+        return None
+    image.flags.writeable = False
+    with _thumbnail_cache_lock:
+        _thumbnail_cache[key] = image
+        _thumbnail_cache.move_to_end(key)
+        while len(_thumbnail_cache) > THUMBNAIL_CACHE_SIZE:
+            _thumbnail_cache.popitem(last=False)
+    return image
+
+
+def _evict_thumbnails(uids, shard=None):
+    directory = os.path.abspath(shard_directory(shard))
+    with _thumbnail_cache_lock:
+        for uid in uids:
+            _thumbnail_cache.pop((directory, uid), None)
+
+
+def load_image_for_name(name, shard=None):
+    """Copie modifiable de la première miniature de name (ou None)."""
+    for entry in _get_store(shard).lookup(name):
+        if entry["thumb"] is not None:
+            image = load_thumbnail(entry["uid"], shard)
+            return image.copy() if image is not None else None
     return None
 
 
-def delete_encoding(name):
-    removed = []
-    for filepath in _iter_encoding_files():
-        try:
-            data = _read_json(filepath)
-        except (OSError, json.JSONDecodeError):
-            continue
-
-        if data.get("name") == name:
-            try:
-                os.remove(filepath)
-                removed.append(Path(filepath).stem)
-            except OSError:
-                continue
+def delete_encoding(name, shard=None):
+    store = _get_store(shard)
+    with store.lock:
+        entries = store.lookup(name)
+        uids = [e["uid"] for e in entries]
+        rows = [e["row"] for e in entries]
+        previous_generation = store.generation
+        removed = store.remove(uids)
+        if removed:
+            _update_ann_index(store, previous_generation, removed_rows=rows)
 
     if removed:
+        _evict_thumbnails(removed, shard)
         metadata = load_metadata()
         for uid in removed:
             metadata.pop(uid, None)
         _write_json(META_FILE, metadata)
+        _notify_change(shard)
 
     return removed
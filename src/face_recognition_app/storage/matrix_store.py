@@ -0,0 +1,546 @@
+"""
+matrix_store.py
+Backend binaire colonnaire pour les encodages de visages.
+
+Remplace l'ancien format « un fichier JSON par visage » : avec des dizaines de
+milliers de visages, le parsing JSON dominait le démarrage du moteur et chaque
+rechargement du cache.
+
+Fichiers (dans ENCODED_DIR) :
+  embeddings.f32  → matrice float32 contiguë N×128 (lisible par np.memmap)
+  index.json      → index colonnaire : uids, noms, dates, position des miniatures
+  thumbnails.bin  → miniatures JPEG concaténées (offset / longueur dans l'index)
+  journal.log     → journal append-only des ajouts / suppressions (JSON lines)
+
+Recherche par nom / uid : l'index persisté donne, pour chaque uid, sa ligne
+dans la matrice et la position de sa miniature dans le blob. Au chargement, on
+en dérive des tables nom → lignes et uid → ligne tenues à jour à chaque
+écriture : miniature et suppression ne touchent que les lignes concernées.
+
+Ordre d'écriture : matrice → miniatures → index (remplacement atomique).
+L'index fait foi : des octets orphelins en fin de matrice ou de blob après un
+crash sont simplement ignorés puis écrasés à l'écriture suivante.
+
+Journal des modifications : chaque ajout / suppression incrémente un compteur
+de génération (persisté dans l'index) et ajoute une ligne à journal.log. Un
+consommateur qui connaît sa dernière génération n'applique que les deltas
+(voir changes_since) au lieu de tout recharger.
+
+Migration : au premier accès, si l'index n'existe pas et que le dossier contient
+des fichiers <uid>.json, ils sont convertis puis déplacés dans legacy_json/.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = 128
+EMBEDDING_DTYPE = np.float32
+ROW_BYTES = EMBEDDING_DIM * np.dtype(EMBEDDING_DTYPE).itemsize
+
+MATRIX_FILENAME = "embeddings.f32"
+INDEX_FILENAME = "index.json"
+BLOB_FILENAME = "thumbnails.bin"
+JOURNAL_FILENAME = "journal.log"
+LEGACY_DIRNAME = "legacy_json"
+
+# Au-delà, le journal est tronqué : les consommateurs trop en retard rechargent tout
+JOURNAL_MAX_ENTRIES = 1000
+
+INDEX_VERSION = 1
+
+
+def atomic_write_json(path: Path, data, indent: Optional[int] = None) -> None:
+    """Écrit un JSON dans un fichier temporaire puis le renomme (atomique)."""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class MatrixEncodingStore:
+    """
+    Stockage des encodages sous forme de matrice float32 + index + blob.
+
+    Thread-safe. L'index est gardé en mémoire et rechargé automatiquement
+    si le fichier a été modifié par un autre processus.
+
+    Usage :
+        store = MatrixEncodingStore(Path("encodings"))
+        uids = store.append([("Alice", encoding, jpeg_bytes, timestamp, uid)])
+        matrix = store.matrix()          # np.memmap (N, 128) en lecture seule
+        store.remove(uids)
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self._dir = Path(directory)
+        self._matrix_path = self._dir / MATRIX_FILENAME
+        self._index_path = self._dir / INDEX_FILENAME
+        self._blob_path = self._dir / BLOB_FILENAME
+        self._lock = threading.RLock()
+
+        # Colonnes de l'index (alignées sur les lignes de la matrice)
+        self._uids: List[str] = []
+        self._names: List[str] = []
+        self._timestamps: List[str] = []
+        self._thumbs: List[Optional[List[int]]] = []
+        self._blob_size = 0
+        self._generation = 0
+        self._journal_path = self._dir / JOURNAL_FILENAME
+        self._journal_entries = 0
+        self._index_sig: Optional[Tuple[int, int]] = None
+        # Tables de recherche dérivées des colonnes
+        self._row_of_uid: Dict[str, int] = {}
+        self._rows_by_name: Dict[str, List[int]] = {}
+
+    # ── Propriétés ────────────────────────────────────────────────────────────
+
+    @property
+    def directory(self) -> Path:
+        return self._dir
+
+    @property
+    def lock(self) -> threading.RLock:
+        """Verrou (réentrant) pour enchaîner plusieurs lectures cohérentes."""
+        return self._lock
+
+    @property
+    def generation(self) -> int:
+        """Compteur incrémenté à chaque ajout ou suppression."""
+        with self._lock:
+            self._ensure_loaded()
+            return self._generation
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._uids)
+
+    # ── Lecture ───────────────────────────────────────────────────────────────
+
+    def records(self) -> List[Dict]:
+        """
+        Retourne les métadonnées de chaque ligne (uid, name, timestamp, row,
+        has_thumbnail) sans lire ni la matrice ni les miniatures.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return [
+                {"uid": uid, "name": name, "timestamp": ts, "row": row,
+                 "has_thumbnail": thumb is not None}
+                for row, (uid, name, ts, thumb) in enumerate(
+                    zip(self._uids, self._names, self._timestamps, self._thumbs)
+                )
+            ]
+
+    def snapshot(self) -> Tuple[List[str], List[str], np.ndarray]:
+        """Retourne (uids, names, matrix) de façon cohérente (même génération)."""
+        with self._lock:
+            self._ensure_loaded()
+            return list(self._uids), list(self._names), self.matrix()
+
+    def names(self) -> List[str]:
+        with self._lock:
+            self._ensure_loaded()
+            return list(self._names)
+
+    def distinct_names(self) -> List[str]:
+        """Noms des personnes enregistrées, dans l'ordre du premier enrôlement."""
+        with self._lock:
+            self._ensure_loaded()
+            return list(self._rows_by_name)
+
+    def matrix(self) -> np.ndarray:
+        """
+        Retourne la matrice (N, 128) float32 projetée en mémoire (lecture seule).
+
+        Ne pas conserver la référence longtemps : sous Windows un memmap ouvert
+        empêche la réécriture du fichier lors d'une suppression.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            n = len(self._uids)
+            if n == 0:
+                return np.empty((0, EMBEDDING_DIM), dtype=EMBEDDING_DTYPE)
+            return np.memmap(
+                self._matrix_path, dtype=EMBEDDING_DTYPE, mode="r",
+                shape=(n, EMBEDDING_DIM),
+            )
+
+    def rows_for_uids(self, uids: Iterable[str]) -> Dict[str, int]:
+        """Retourne {uid: ligne} pour les uids encore présents."""
+        with self._lock:
+            self._ensure_loaded()
+            return {uid: self._row_of_uid[uid] for uid in uids if uid in self._row_of_uid}
+
+    def lookup(self, name: str) -> List[Dict]:
+        """
+        Retourne les entrées d'une personne : {"uid", "row", "thumb"} où thumb
+        est [offset, longueur] dans le blob des miniatures (ou None).
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return [
+                {"uid": self._uids[row], "row": row, "thumb": self._thumbs[row]}
+                for row in self._rows_by_name.get(name, [])
+            ]
+
+    def uids_for_name(self, name: str) -> List[str]:
+        with self._lock:
+            self._ensure_loaded()
+            return [self._uids[row] for row in self._rows_by_name.get(name, [])]
+
+    def changes_since(self, generation: int) -> Optional[List[Dict]]:
+        """
+        Retourne les entrées du journal postérieures à generation, dans l'ordre :
+          {"gen": int, "op": "add" | "remove", "uids": [...], "names": [...]}
+
+        Retourne None si le journal ne couvre pas tout l'intervalle (journal
+        tronqué, store recréé…) : l'appelant doit alors tout recharger.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if generation == self._generation:
+                return []
+            if generation > self._generation:
+                return None
+            entries = [e for e in self._read_journal() if e["gen"] > generation]
+            expected = list(range(generation + 1, self._generation + 1))
+            if [e["gen"] for e in entries] != expected:
+                return None
+            return entries
+
+    def read_thumbnail(self, uid: str) -> Optional[bytes]:
+        """Retourne les octets JPEG de la miniature associée à uid (ou None)."""
+        with self._lock:
+            self._ensure_loaded()
+            row = self._row_of_uid.get(uid)
+            if row is None:
+                return None
+            return self._read_blob(self._thumbs[row])
+
+    def first_thumbnail_for_name(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            self._ensure_loaded()
+            for row in self._rows_by_name.get(name, []):
+                if self._thumbs[row] is not None:
+                    return self._read_blob(self._thumbs[row])
+            return None
+
+    # ── Écriture ──────────────────────────────────────────────────────────────
+
+    def append(
+        self,
+        items: Iterable[Tuple[str, np.ndarray, Optional[bytes], str, str]],
+    ) -> List[str]:
+        """
+        Ajoute des encodages. items : (name, encoding, jpeg_bytes, timestamp, uid).
+        Retourne la liste des uids ajoutés.
+        """
+        items = list(items)
+        if not items:
+            return []
+
+        with self._lock:
+            self._ensure_loaded()
+            self._dir.mkdir(parents=True, exist_ok=True)
+
+            rows = np.empty((len(items), EMBEDDING_DIM), dtype=EMBEDDING_DTYPE)
+            blob_chunks: List[bytes] = []
+            new_thumbs: List[Optional[List[int]]] = []
+            blob_end = self._blob_size
+            for i, (_, encoding, jpeg, _, _) in enumerate(items):
+                rows[i] = np.asarray(encoding, dtype=EMBEDDING_DTYPE).reshape(EMBEDDING_DIM)
+                if jpeg:
+                    new_thumbs.append([blob_end, len(jpeg)])
+                    blob_chunks.append(jpeg)
+                    blob_end += len(jpeg)
+                else:
+                    new_thumbs.append(None)
+
+            self._write_at(self._matrix_path, len(self._uids) * ROW_BYTES, rows.tobytes())
+            if blob_chunks:
+                self._write_at(self._blob_path, self._blob_size, b"".join(blob_chunks))
+
+            for (name, _, _, timestamp, uid), thumb in zip(items, new_thumbs):
+                self._row_of_uid[uid] = len(self._uids)
+                self._rows_by_name.setdefault(name, []).append(len(self._uids))
+                self._uids.append(uid)
+                self._names.append(name)
+                self._timestamps.append(timestamp)
+                self._thumbs.append(thumb)
+            self._blob_size = blob_end
+            self._generation += 1
+            self._save_index()
+            added = [item[4] for item in items]
+            self._append_journal("add", added, [item[0] for item in items])
+            return added
+
+    def remove(self, uids: Iterable[str]) -> List[str]:
+        """Supprime les lignes correspondant aux uids. Retourne les uids supprimés."""
+        targets = set(uids)
+        with self._lock:
+            self._ensure_loaded()
+            keep = [i for i, uid in enumerate(self._uids) if uid not in targets]
+            if len(keep) == len(self._uids):
+                return []
+            removed = [uid for uid in self._uids if uid in targets]
+            removed_names = [n for uid, n in zip(self._uids, self._names) if uid in targets]
+
+            kept_rows = np.array(self.matrix()[keep], dtype=EMBEDDING_DTYPE)
+            tmp = self._matrix_path.with_name(MATRIX_FILENAME + ".tmp")
+            with open(tmp, "wb") as f:
+                f.write(kept_rows.tobytes())
+            os.replace(tmp, self._matrix_path)
+
+            self._uids = [self._uids[i] for i in keep]
+            self._names = [self._names[i] for i in keep]
+            self._timestamps = [self._timestamps[i] for i in keep]
+            self._thumbs = [self._thumbs[i] for i in keep]
+            # Les lignes suivantes sont décalées : tables reconstruites
+            self._rebuild_lookup()
+
+            live = sum(t[1] for t in self._thumbs if t is not None)
+            if self._blob_size - live > live:
+                self._compact_blob()
+            self._generation += 1
+            self._save_index()
+            self._append_journal("remove", removed, removed_names)
+            return removed
+
+    # ── Index ─────────────────────────────────────────────────────────────────
+
+    def _ensure_loaded(self) -> None:
+        if not self._index_path.exists():
+            if self._index_sig is None and self._has_legacy_files():
+                self._migrate_legacy()
+            elif self._index_sig is not None:
+                self._reset()
+            return
+
+        st = self._index_path.stat()
+        sig = (st.st_mtime_ns, st.st_size)
+        if sig != self._index_sig:
+            self._load_index()
+            self._index_sig = sig
+
+    def _reset(self) -> None:
+        self._uids, self._names, self._timestamps, self._thumbs = [], [], [], []
+        self._blob_size = 0
+        self._generation = 0
+        self._index_sig = None
+        self._rebuild_lookup()
+
+    def _rebuild_lookup(self) -> None:
+        self._row_of_uid = {uid: row for row, uid in enumerate(self._uids)}
+        self._rows_by_name = {}
+        for row, name in enumerate(self._names):
+            self._rows_by_name.setdefault(name, []).append(row)
+
+    def _load_index(self) -> None:
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as exc:
+            logger.error("Index d'encodages illisible (%s) : %s", self._index_path, exc)
+            self._reset()
+            return
+
+        self._uids = list(data.get("uids", []))
+        self._names = list(data.get("names", []))
+        self._timestamps = list(data.get("timestamps", []))
+        self._thumbs = list(data.get("thumbs", []))
+        self._blob_size = int(data.get("blob_size", 0))
+        self._generation = int(data.get("generation", 0))
+        # Entrées déjà écrites (autres sessions, autres processus) : sans cela
+        # le journal ne serait compacté qu'après JOURNAL_MAX_ENTRIES ajouts
+        # dans un même processus
+        self._journal_entries = self._journal_length()
+
+        # Protection contre une matrice tronquée (crash pendant l'écriture)
+        available = self._matrix_path.stat().st_size // ROW_BYTES if self._matrix_path.exists() else 0
+        if available < len(self._uids):
+            logger.error(
+                "Matrice d'encodages tronquée : %d ligne(s) sur %d, index réduit",
+                available, len(self._uids),
+            )
+            del self._uids[available:], self._names[available:]
+            del self._timestamps[available:], self._thumbs[available:]
+        self._rebuild_lookup()
+
+    def _save_index(self) -> None:
+        atomic_write_json(self._index_path, {
+            "version": INDEX_VERSION,
+            "dim": EMBEDDING_DIM,
+            "dtype": np.dtype(EMBEDDING_DTYPE).name,
+            "blob_size": self._blob_size,
+            "generation": self._generation,
+            "uids": self._uids,
+            "names": self._names,
+            "timestamps": self._timestamps,
+            "thumbs": self._thumbs,
+        })
+        st = self._index_path.stat()
+        self._index_sig = (st.st_mtime_ns, st.st_size)
+
+    # ── Journal ───────────────────────────────────────────────────────────────
+
+    def _read_journal(self) -> List[Dict]:
+        entries = []
+        try:
+            with open(self._journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue   # ligne partielle (crash pendant l'écriture)
+        except OSError:
+            return []
+        return entries
+
+    def _journal_length(self) -> int:
+        try:
+            with open(self._journal_path, "rb") as f:
+                return sum(1 for _ in f)
+        except OSError:
+            return 0
+
+    def _append_journal(self, op: str, uids: List[str], names: List[str]) -> None:
+        """Écrit l'entrée de la génération courante (après l'index : gap = rechargement)."""
+        entry = {"gen": self._generation, "op": op, "uids": uids, "names": names}
+        try:
+            with open(self._journal_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._journal_entries += 1
+            if self._journal_entries > JOURNAL_MAX_ENTRIES:
+                self._truncate_journal()
+        except OSError as exc:
+            logger.warning("Écriture du journal d'encodages impossible : %s", exc)
+
+    def _truncate_journal(self) -> None:
+        entries = self._read_journal()[-(JOURNAL_MAX_ENTRIES // 2):]
+        tmp = self._journal_path.with_name(JOURNAL_FILENAME + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp, self._journal_path)
+        self._journal_entries = len(entries)
+
+    # ── Blob des miniatures ───────────────────────────────────────────────────
+
+    def _read_blob(self, thumb: Optional[List[int]]) -> Optional[bytes]:
+        if thumb is None:
+            return None
+        offset, length = thumb
+        try:
+            with open(self._blob_path, "rb") as f:
+                f.seek(offset)
+                data = f.read(length)
+        except OSError:
+            return None
+        return data if len(data) == length else None
+
+    def _compact_blob(self) -> None:
+        """Réécrit le blob sans les miniatures supprimées."""
+        chunks: List[bytes] = []
+        offset = 0
+        new_thumbs: List[Optional[List[int]]] = []
+        for thumb in self._thumbs:
+            data = self._read_blob(thumb)
+            if data is None:
+                new_thumbs.append(None)
+                continue
+            new_thumbs.append([offset, len(data)])
+            chunks.append(data)
+            offset += len(data)
+
+        tmp = self._blob_path.with_name(BLOB_FILENAME + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(b"".join(chunks))
+        os.replace(tmp, self._blob_path)
+        self._thumbs = new_thumbs
+        self._blob_size = offset
+
+    @staticmethod
+    def _write_at(path: Path, offset: int, payload: bytes) -> None:
+        """Écrit payload à offset puis tronque (écrase d'éventuels octets orphelins)."""
+        mode = "r+b" if path.exists() else "wb"
+        with open(path, mode) as f:
+            f.seek(offset)
+            f.write(payload)
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+
+    # ── Migration depuis l'ancien format JSON ─────────────────────────────────
+
+    def _legacy_files(self) -> List[Path]:
+        if not self._dir.exists():
+            return []
+        return sorted(
+            p for p in self._dir.glob("*.json")
+            if p.name not in (INDEX_FILENAME, "metadata.json") and "temp" not in p.name
+        )
+
+    def _has_legacy_files(self) -> bool:
+        return bool(self._legacy_files())
+
+    def _migrate_legacy(self) -> None:
+        files = self._legacy_files()
+        # Index vide d'abord : append() ne doit pas relancer la migration
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._save_index()
+
+        items = []
+        for path in files:
+            try:
+                with open(path, "r") as f:
+                    data = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+            if not validate_legacy_encoding(data):
+                continue
+            image_b64 = data.get("image_base64") or (
+                data["image"] if isinstance(data.get("image"), str) else None
+            )
+            jpeg = None
+            if image_b64:
+                try:
+                    jpeg = base64.b64decode(image_b64)
+                except (ValueError, TypeError):
+                    jpeg = None
+            items.append((data["name"], np.asarray(data["encoding"]), jpeg, data["timestamp"], path.stem))
+
+        self.append(items)
+
+        legacy_dir = self._dir / LEGACY_DIRNAME
+        legacy_dir.mkdir(exist_ok=True)
+        for path in files:
+            try:
+                shutil.move(str(path), str(legacy_dir / path.name))
+            except OSError as exc:
+                logger.warning("Impossible d'archiver %s : %s", path.name, exc)
+        logger.info(
+            "Migration des encodages JSON → matrice : %d visage(s), anciens fichiers dans %s",
+            len(items), legacy_dir,
+        )
+
+
+def validate_legacy_encoding(data) -> bool:
+    required = ["name", "encoding", "timestamp"]
+    if not all(key in data for key in required):
+        return False
+    return isinstance(data["encoding"], list) and len(data["encoding"]) == EMBEDDING_DIM
@@ -33,7 +33,10 @@ class SurveillanceProfile:
     name: str
     label: str                              # Nom affiché dans l'UI
     detection_model: str = "hog"            # "hog" (CPU) | "cnn" (GPU)
-    analysis_interval: float = 0.5          # Secondes entre deux analyses
+    analysis_interval: float = 0.5          # Secondes entre deux analyses (si target_cpu = 0)
+    # Fraction des cœurs allouée à l'analyse, répartie entre caméras selon leur
+    # activité (0 = intervalle fixe analysis_interval ; ordonnanceur sur option)
+    target_cpu: float = 0.0
     motion_required: bool = True            # N'analyser qu'en cas de mouvement
     motion_sensitivity: int = 500           # Seuil de sensibilité mouvement
     recognition_threshold: float = 0.5     # Distance de reconnaissance faciale
@@ -44,6 +47,8 @@ class SurveillanceProfile:
     alert_on_known: bool = False
     target_persons: List[str] = field(default_factory=list)
     enabled_camera_uids: List[str] = field(default_factory=list)  # [] = toutes
+    # Shards de la galerie chargés par le moteur ([] = tous les shards existants)
+    encoding_shards: List[str] = field(default_factory=list)
 
     def to_dict(self) -> dict:
         return asdict(self)
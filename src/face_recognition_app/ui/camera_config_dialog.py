@@ -17,6 +17,28 @@ from typing import Optional
 
 from ..services.camera_source import CameraConfig
 
+# Détecteurs proposés (voir services/face_detectors.py)
+DETECTOR_LABELS = {
+    "": "Celui du profil actif",
+    "hog": "HOG (CPU)",
+    "cnn": "CNN (GPU, précis)",
+    "haar": "Haar (très rapide)",
+    "yunet": "YuNet (DNN, rapide)",
+    "haar+hog": "Haar → HOG (cascade)",
+    "yunet+hog": "YuNet → HOG (cascade)",
+}
+
+# Options de décodage (voir CAPTURE_BACKENDS dans services/camera_source.py)
+BACKEND_LABELS = {
+    "": "Automatique",
+    "ffmpeg": "FFmpeg",
+    "gstreamer": "GStreamer",
+    "v4l2": "V4L2 (Linux)",
+    "dshow": "DirectShow (Windows)",
+    "msmf": "Media Foundation (Windows)",
+}
+TRANSPORT_LABELS = {"": "Automatique", "tcp": "TCP", "udp": "UDP"}
+
 
 class CameraConfigDialog(tk.Toplevel):
     """
@@ -119,13 +141,19 @@ class CameraConfigDialog(tk.Toplevel):
 
         # Modèle de détection
         tk.Label(form, text="Modèle détection :").grid(row=5, column=0, sticky=tk.W, **pad)
-        self._model_var = tk.StringVar(value="hog")
+        self._model_var = tk.StringVar(value=DETECTOR_LABELS[""])
         model_frame = tk.Frame(form)
         model_frame.grid(row=5, column=1, sticky=tk.W, **pad)
-        ttk.Radiobutton(model_frame, text="HOG (CPU, rapide)", variable=self._model_var,
-                        value="hog").pack(side=tk.LEFT, padx=(0, 10))
-        ttk.Radiobutton(model_frame, text="CNN (GPU, précis)", variable=self._model_var,
-                        value="cnn").pack(side=tk.LEFT)
+        ttk.Combobox(
+            model_frame, textvariable=self._model_var, state="readonly", width=24,
+            values=list(DETECTOR_LABELS.values()),
+        ).pack(side=tk.LEFT)
+
+        # Calibration de la résolution de détection
+        self._calibrate_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            model_frame, text="Calibrer la résolution", variable=self._calibrate_var,
+        ).pack(side=tk.LEFT, padx=(10, 0))
 
         # Zone d'intérêt ROI
         roi_lf = ttk.LabelFrame(form, text="Zone d'intérêt (ROI) — optionnel")
@@ -140,10 +168,51 @@ class CameraConfigDialog(tk.Toplevel):
             ttk.Entry(roi_lf, textvariable=self._roi_vars[key], width=6).grid(
                 row=1, column=i * 2 + 1, padx=(0, 4), pady=4)
 
+        # Décodage
+        dec_lf = ttk.LabelFrame(form, text="Décodage du flux")
+        dec_lf.grid(row=7, column=0, columnspan=2, sticky=tk.EW, padx=12, pady=6)
+        self._backend_var = tk.StringVar(value=BACKEND_LABELS[""])
+        self._transport_var = tk.StringVar(value=TRANSPORT_LABELS[""])
+        self._buffer_var = tk.StringVar(value="0")
+        self._keyframes_var = tk.BooleanVar(value=False)
+        self._hw_var = tk.BooleanVar(value=False)
+        self._on_demand_var = tk.BooleanVar(value=False)
+        self._analysis_var = tk.StringVar(value="")
+        self._recording_var = tk.StringVar(value="")
+        tk.Label(dec_lf, text="Backend :").grid(row=0, column=0, sticky=tk.W, padx=4, pady=2)
+        ttk.Combobox(
+            dec_lf, textvariable=self._backend_var, values=list(BACKEND_LABELS.values()),
+            state="readonly", width=24,
+        ).grid(row=0, column=1, sticky=tk.W, padx=4, pady=2)
+        tk.Label(dec_lf, text="Transport RTSP :").grid(row=0, column=2, sticky=tk.W, padx=4, pady=2)
+        ttk.Combobox(
+            dec_lf, textvariable=self._transport_var, values=list(TRANSPORT_LABELS.values()),
+            state="readonly", width=11,
+        ).grid(row=0, column=3, sticky=tk.W, padx=4, pady=2)
+        tk.Label(dec_lf, text="Tampon (frames) :").grid(row=1, column=0, sticky=tk.W, padx=4, pady=2)
+        ttk.Entry(dec_lf, textvariable=self._buffer_var, width=6).grid(row=1, column=1, sticky=tk.W, padx=4, pady=2)
+        ttk.Checkbutton(dec_lf, text="Décodage matériel", variable=self._hw_var).grid(
+            row=1, column=2, columnspan=2, sticky=tk.W, padx=4, pady=2)
+        ttk.Checkbutton(dec_lf, text="Images clés seulement (FFmpeg)", variable=self._keyframes_var).grid(
+            row=2, column=0, columnspan=2, sticky=tk.W, padx=4, pady=2)
+        ttk.Checkbutton(dec_lf, text="Décoder à la demande", variable=self._on_demand_var).grid(
+            row=2, column=2, columnspan=2, sticky=tk.W, padx=4, pady=2)
+        tk.Label(dec_lf, text="Flux d'analyse :").grid(row=3, column=0, sticky=tk.W, padx=4, pady=2)
+        ttk.Entry(dec_lf, textvariable=self._analysis_var, width=40).grid(
+            row=3, column=1, columnspan=3, sticky=tk.EW, padx=4, pady=2)
+        tk.Label(dec_lf, text="Flux d'enregistrement :").grid(row=4, column=0, sticky=tk.W, padx=4, pady=2)
+        ttk.Entry(dec_lf, textvariable=self._recording_var, width=40).grid(
+            row=4, column=1, columnspan=3, sticky=tk.EW, padx=4, pady=2)
+        tk.Label(dec_lf, text="Flux vides = Source. Sous-flux basse résolution pour l'analyse (ROI dans sa résolution).\n"
+                              "Images clés : ~1 frame/s, moins de CPU ; s'applique au flux d'analyse.\n"
+                              "À la demande : seules les frames analysées ou affichées sont décodées.",
+                 fg="gray", font=("Helvetica", 8), justify=tk.LEFT).grid(
+            row=5, column=0, columnspan=4, sticky=tk.W, padx=4)
+
         # Activée
         self._enabled_var = tk.BooleanVar(value=True)
         ttk.Checkbutton(form, text="Caméra activée", variable=self._enabled_var).grid(
-            row=7, column=1, sticky=tk.W, **pad
+            row=8, column=1, sticky=tk.W, **pad
         )
 
         # Boutons
@@ -173,7 +242,16 @@ class CameraConfigDialog(tk.Toplevel):
         self._width_var.set(str(config.width))
         self._height_var.set(str(config.height))
         self._enabled_var.set(config.enabled)
-        self._model_var.set(config.detection_model)
+        self._model_var.set(DETECTOR_LABELS.get(config.detection_model, config.detection_model))
+        self._calibrate_var.set(config.auto_calibrate)
+        self._backend_var.set(BACKEND_LABELS.get(config.capture_backend, config.capture_backend))
+        self._transport_var.set(TRANSPORT_LABELS.get(config.rtsp_transport, config.rtsp_transport))
+        self._buffer_var.set(str(config.buffer_size))
+        self._keyframes_var.set(config.keyframes_only)
+        self._hw_var.set(bool(config.hw_acceleration))
+        self._on_demand_var.set(config.decode_on_demand)
+        self._analysis_var.set(config.analysis_source)
+        self._recording_var.set(config.recording_source)
         if config.roi:
             x, y, w, h = config.roi
             self._roi_vars["x"].set(str(x))
@@ -214,6 +292,15 @@ class CameraConfigDialog(tk.Toplevel):
             messagebox.showerror("Erreur", "La résolution doit être en pixels entiers.", parent=self)
             return
 
+        # Tampon de capture
+        try:
+            buffer_size = int(self._buffer_var.get() or 0)
+            if buffer_size < 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Erreur", "Le tampon doit être un entier positif (0 = défaut).", parent=self)
+            return
+
         # ROI (optionnelle)
         roi = None
         roi_vals = [self._roi_vars[k].get().strip() for k in ("x", "y", "w", "h")]
@@ -229,6 +316,17 @@ class CameraConfigDialog(tk.Toplevel):
                 return
 
         uid = self._existing.uid if self._existing else None
+        # Réglages non édités ici : conservés
+        kept = {}
+        if self._existing:
+            kept = {
+                "encoding_shards": list(self._existing.encoding_shards),
+                "detection_scale": self._existing.detection_scale,
+                "detection_upsample": self._existing.detection_upsample,
+                "decode_threads": self._existing.decode_threads,
+            }
+            if self._existing.hw_acceleration and self._hw_var.get():
+                kept["hw_acceleration"] = self._existing.hw_acceleration
         self.result = CameraConfig(
             name=name,
             source_type=source_type,
@@ -237,7 +335,25 @@ class CameraConfigDialog(tk.Toplevel):
             width=width,
             height=height,
             roi=roi,
-            detection_model=self._model_var.get(),
+            detection_model=next(
+                # Détecteur hors de la liste (saisi dans cameras.json) : conservé
+                (k for k, v in DETECTOR_LABELS.items() if v == self._model_var.get()),
+                self._model_var.get(),
+            ),
+            auto_calibrate=self._calibrate_var.get(),
+            capture_backend=next(
+                (k for k, v in BACKEND_LABELS.items() if v == self._backend_var.get()), "",
+            ),
+            rtsp_transport=next(
+                (k for k, v in TRANSPORT_LABELS.items() if v == self._transport_var.get()), "",
+            ),
+            buffer_size=buffer_size,
+            keyframes_only=self._keyframes_var.get(),
+            decode_on_demand=self._on_demand_var.get(),
+            analysis_source=self._analysis_var.get().strip(),
+            recording_source=self._recording_var.get().strip(),
+            **({"hw_acceleration": "any"} if self._hw_var.get() and "hw_acceleration" not in kept else {}),
+            **kept,
             **({"uid": uid} if uid else {}),
         )
         self.destroy()
@@ -24,8 +24,8 @@ import face_recognition
 import numpy as np
 from PIL import Image, ImageTk
 
-from ..core.utils import is_duplicate, save_face_encoding
-from ..storage.encodings_store import load_existing_encodings
+from ..core.gallery_matcher import shared_gallery_matcher
+from ..core.utils import is_duplicate, save_face_encodings_bulk
 
 logger = logging.getLogger(__name__)
 
@@ -110,7 +110,8 @@ class ImageImporterApp(tk.Toplevel):
         list_frame = tk.Frame(right, relief=tk.GROOVE, bd=1)
         list_frame.pack(fill=tk.X, pady=6)
 
-        self._face_listbox = tk.Listbox(list_frame, height=8, selectmode=tk.SINGLE,
+        # Sélection multiple : plusieurs visages d'une même personne en un enregistrement
+        self._face_listbox = tk.Listbox(list_frame, height=8, selectmode=tk.EXTENDED,
                                          activestyle="dotbox")
         self._face_listbox.pack(fill=tk.X)
         self._face_listbox.bind("<<ListboxSelect>>", self._on_face_select)
@@ -133,7 +134,7 @@ class ImageImporterApp(tk.Toplevel):
         self._name_entry.pack(fill=tk.X)
 
         # Bouton enregistrer
-        ttk.Button(right, text="Enregistrer le visage", command=self._save_face).pack(
+        ttk.Button(right, text="Enregistrer le(s) visage(s)", command=self._save_face).pack(
             pady=10, fill=tk.X)
 
         # Journal de cette session
@@ -328,8 +329,7 @@ class ImageImporterApp(tk.Toplevel):
         sharpness = cv2.Laplacian(gray, cv2.CV_64F).var()
 
         # Doublon ?
-        existing = load_existing_encodings()
-        dup = is_duplicate(enc, existing)
+        dup = is_duplicate(enc, shared_gallery_matcher())
         dup_str = "Oui ⚠" if dup else "Non ✓"
 
         self._info_var.set(
@@ -369,19 +369,19 @@ class ImageImporterApp(tk.Toplevel):
             messagebox.showwarning("Aucun visage", "Aucun visage sélectionné.", parent=self)
             return
 
-        idx = self._selected_face
-        if idx >= len(self._face_encodings):
+        indices = list(self._face_listbox.curselection()) or [self._selected_face]
+        if any(idx >= len(self._face_encodings) for idx in indices):
             messagebox.showwarning("Sélection", "Sélectionnez un visage dans la liste.", parent=self)
             return
 
-        enc = self._face_encodings[idx]
-        loc = self._face_locations[idx]
-        top, right, bottom, left = loc
-        face_img = self._current_image[top:bottom, left:right]
+        items = []
+        for idx in indices:
+            top, right, bottom, left = self._face_locations[idx]
+            items.append((name, self._face_encodings[idx], self._current_image[top:bottom, left:right]))
 
         # Vérification doublon
-        existing = load_existing_encodings()
-        if is_duplicate(enc, existing):
+        matcher = shared_gallery_matcher()
+        if any(is_duplicate(enc, matcher) for _, enc, _ in items):
             if not messagebox.askyesno(
                 "Doublon détecté",
                 "Un visage similaire existe déjà dans la base.\nEnregistrer quand même ?",
@@ -390,8 +390,10 @@ class ImageImporterApp(tk.Toplevel):
                 return
 
         try:
-            save_face_encoding(name, enc, face_img)
-            self._log(f"✓ {name} enregistré (visage {idx + 1})")
+            # Un seul lot : une écriture du store et des métadonnées
+            save_face_encodings_bulk(items)
+            faces = ", ".join(str(idx + 1) for idx in indices)
+            self._log(f"✓ {name} enregistré (visage(s) {faces})")
             self._name_var.set("")
         except Exception as exc:
             logger.exception("Erreur sauvegarde : %s", exc)
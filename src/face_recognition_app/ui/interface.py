@@ -2,7 +2,7 @@
 import tkinter as tk
 from tkinter import messagebox
 from tkinter.filedialog import askopenfilename
-from threading import Thread, Lock
+from threading import Thread
 import logging
 import cv2
 from PIL import Image, ImageTk
@@ -11,6 +11,7 @@ import pygame
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 
+from face_recognition_app.core.gallery_matcher import shared_gallery_matcher
 from face_recognition_app.storage.config import PROJECT_ROOT, FACE_RECOGNITION_THRESHOLD
 
 logging.basicConfig(
@@ -19,7 +20,7 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 from face_recognition_app.storage.encodings_store import (
-    load_encodings_map,
+    load_known_names,
     delete_encoding as delete_stored_encoding,
 )
 from face_recognition_app.ui import import_image
@@ -46,8 +47,6 @@ class FaceRecognitionApp:
         self.new_faces = []  # Stocker encodages de nouveaux visages capturés
         self.target_person = None  # Nom de la personne à traquer
         self.alarm_running = False  # Indique si l'alarme est en cours
-        self.cached_encodings = None
-        self._encodings_lock = Lock()
 
         # Définir une taille minimale
         self.root.minsize(1024, 768)
@@ -88,27 +87,13 @@ class FaceRecognitionApp:
         :param face_encoding: L'encodage du visage à vérifier.
         :param threshold: Le seuil de distance pour considérer un visage comme correspondant.
         """
-        encoded_faces = self.load_all_encodings()
-        best_match = None
-        min_distance = float('inf')
-
-        for name, known_encoding in encoded_faces.items():
-            face_distance = face_recognition.face_distance([known_encoding], face_encoding)[0]
-            if face_distance < threshold and face_distance < min_distance:
-                min_distance = face_distance
-                best_match = name
-
+        # Galerie partagée, reconstruite seulement si le store a changé
+        best_match, _ = shared_gallery_matcher().best(face_encoding, threshold)[0]
         return (best_match is not None), best_match
 
     def load_all_encodings(self):
-        return load_encodings_map()
-
-    def get_cached_encodings(self):
-        with self._encodings_lock:
-            if self.cached_encodings is None:
-                self.cached_encodings = self.load_all_encodings()
-                logger.info("Cache des encodages chargé (%d entrée(s))", len(self.cached_encodings))
-            return self.cached_encodings
+        """Noms des personnes enregistrées (ni encodages ni miniatures ne sont lus)."""
+        return load_known_names()
 
 
     def setup_ui(self):
@@ -425,8 +410,6 @@ class FaceRecognitionApp:
             messagebox.showinfo("Succès", f"Visage de {name} enregistré avec succès")
 
             # Actualise la liste et l'affichage
-            with self._encodings_lock:
-                self.cached_encodings = None
             self.update_faces_after_save()
 
             # Réinitialise le champ de nom
@@ -491,18 +474,11 @@ class FaceRecognitionApp:
 
         if face_locations:
             face_encodings = face_recognition.face_encodings(small_frame, face_locations)
-            known_encodings = self.get_cached_encodings()
-
-            for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-                recognized = False
-                recognized_name = "Inconnu"
+            matches = shared_gallery_matcher().best(face_encodings, FACE_RECOGNITION_THRESHOLD)
 
-                for name, known_encoding in known_encodings.items():
-                    face_distance = face_recognition.face_distance([known_encoding], face_encoding)[0]
-                    if face_distance < FACE_RECOGNITION_THRESHOLD:
-                        recognized = True
-                        recognized_name = name
-                        break
+            for (top, right, bottom, left), (best_name, _) in zip(face_locations, matches):
+                recognized = best_name is not None
+                recognized_name = best_name if recognized else "Inconnu"
 
                 top, right, bottom, left = top * 2, right * 2, bottom * 2, left * 2
 
@@ -712,7 +688,7 @@ class FaceRecognitionApp:
             messagebox.showerror("Erreur", f"Erreur de chargement des encodages : {e}")
             return
 
-        for name in sorted(encodings.keys()):
+        for name in sorted(encodings):
             listbox.insert(tk.END, name)
 
         def delete_selected():
@@ -750,9 +726,7 @@ class FaceRecognitionApp:
         listbox.delete(0, tk.END)
         try:
             encodings = self.load_all_encodings()
-            with self._encodings_lock:
-                self.cached_encodings = encodings
-            for name in sorted(encodings.keys()):
+            for name in sorted(encodings):
                 listbox.insert(tk.END, name)
             self.update_target_selector()  # Mettre à jour le menu déroulant
         except Exception as e:
@@ -774,7 +748,7 @@ class FaceRecognitionApp:
         """Met à jour le menu déroulant avec les noms des personnes enregistrées."""
         try:
             encodings = self.load_all_encodings()
-            self.target_selector["values"] = sorted(encodings.keys())  # Ajouter les noms triés
+            self.target_selector["values"] = sorted(encodings)  # Ajouter les noms triés
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur lors de la mise à jour des cibles : {e}")
 
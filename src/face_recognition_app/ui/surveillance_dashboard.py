@@ -29,6 +29,7 @@ from ..services.alert_manager import AlertManager
 from ..services.api_server import ApiServer
 from ..services.camera_manager import CameraManager
 from ..services.camera_source import CameraConfig
+from ..services.frame import Frame
 from ..services.surveillance_engine import SurveillanceEngine, SurveillanceEvent
 from ..services.video_recorder import VideoRecorder
 from ..storage.config import PROJECT_ROOT
@@ -69,6 +70,9 @@ class CameraTile(tk.Frame):
         self.uid = uid
         self._on_fullscreen = on_fullscreen
         self._latest_frame = None
+        # Frame de la caméra affichée : la tuile en détient la référence tant
+        # que _latest_frame pointe sur son image (slot non réutilisé)
+        self._held: Optional[Frame] = None
 
         # Image
         self._canvas = tk.Canvas(self, width=THUMB_W, height=THUMB_H, bg="#0d0d0d",
@@ -96,21 +100,38 @@ class CameraTile(tk.Frame):
 
         self._draw_placeholder()
 
+    def _hold(self, frame: Optional[Frame]) -> None:
+        previous, self._held = self._held, frame
+        if previous is not None and previous is not frame:
+            previous.release()
+
+    def destroy(self) -> None:
+        self._hold(None)
+        self._latest_frame = None
+        super().destroy()
+
     def _handle_dblclick(self, _event) -> None:
         if self._on_fullscreen:
             self._on_fullscreen(self.uid)
 
     def update_frame(self, frame_bgr, connected: bool = True,
                      detections: str = "", fps: str = "") -> None:
-        """Appelé périodiquement depuis le thread Tkinter."""
+        """
+        Appelé périodiquement depuis le thread Tkinter. frame_bgr : image
+        annotée, ou Frame de la caméra dont la tuile reprend la référence.
+        """
         self._status_dot.configure(fg="#2ecc71" if connected else "#e74c3c")
         self._det_label.configure(text=detections)
         self._fps_label.configure(text=fps)
-        if frame_bgr is not None:
-            self._latest_frame = frame_bgr
 
         if frame_bgr is None:
             return
+        if isinstance(frame_bgr, Frame):
+            self._hold(frame_bgr)
+            frame_bgr = frame_bgr.image
+        else:
+            self._hold(None)
+        self._latest_frame = frame_bgr
 
         # Redimensionner
         h, w = frame_bgr.shape[:2]
@@ -458,7 +479,7 @@ class SurveillanceDashboard(tk.Toplevel):
         """Reçu depuis un thread d'analyse — on stocke et planifie la mise à jour UI."""
         # Enregistrer l'événement
         faces_data = [
-            {"name": f.name, "confidence": f.confidence, "is_known": f.is_known}
+            {"name": f.name, "confidence": f.confidence, "is_known": f.is_known, "track_id": f.track_id}
             for f in event.faces
         ]
         self._event_store.record(
@@ -551,7 +572,8 @@ class SurveillanceDashboard(tk.Toplevel):
             if annotated is not None:
                 tile.update_frame(annotated, connected=connected, fps=fps_str)
             else:
-                frame = self._cam_mgr.get_frame(uid)
+                # Frame partagée, sans copie : la tuile en garde la référence
+                frame = self._cam_mgr.get_display_frame(uid)
                 tile.update_frame(frame, connected=connected, fps=fps_str)
 
         if self._engine._running:
@@ -580,17 +602,22 @@ class SurveillanceDashboard(tk.Toplevel):
             if not running[0]:
                 return
             tile = self._tiles.get(uid)
-            frame = None
+            held = None
             if tile and tile._latest_frame is not None:
-                frame = tile._latest_frame
+                frame = tile._latest_frame   # sous la référence de la tuile
             else:
-                frame = self._cam_mgr.get_frame(uid)
+                held = self._cam_mgr.get_display_frame(uid)
+                frame = held.image if held is not None else None
             if frame is not None:
                 cw, ch = canvas.winfo_width() or 800, canvas.winfo_height() or 600
                 h, w = frame.shape[:2]
                 scale = min(cw / w, ch / h)
                 nw, nh = int(w * scale), int(h * scale)
-                resized = cv2.resize(frame, (nw, nh))
+                try:
+                    resized = cv2.resize(frame, (nw, nh))
+                finally:
+                    if held is not None:
+                        held.release()
                 rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
                 pil = Image.fromarray(rgb)
                 photo = ImageTk.PhotoImage(pil)
@@ -13,14 +13,15 @@ import numpy as np
 from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from queue import Queue
 
+from face_recognition_app.core.gallery_matcher import shared_gallery_matcher
 from face_recognition_app.core.utils import is_duplicate
 from face_recognition_app.storage.config import VIDEO_FACE_TOLERANCE
 from face_recognition_app.services.video_processor import process_chunk
 from face_recognition_app.storage.encodings_store import (
-    load_existing_encodings,
     save_face_encoding,
     delete_encoding,
     load_image_for_name,
+    load_known_names,
 )
 
 logging.basicConfig(filename='app.log', level=logging.INFO)
@@ -39,7 +40,6 @@ class VideoImporterApp:
         self.io_executor = ThreadPoolExecutor(max_workers=4)  # Pour les tâches I/O bound
         self.progress_queue = Queue()
         self.running = True
-        self.existing_encodings = load_existing_encodings()
 
         self.setup_ui()
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -271,6 +271,8 @@ class VideoImporterApp:
         """Regroupe les visages similaires en utilisant une double vérification"""
         unique_groups = []
         total_faces = len(faces)
+        # Galerie empilée une seule fois pour tout le lot
+        existing_matcher = shared_gallery_matcher()
 
         for idx, face_data in enumerate(faces):
             try:
@@ -283,7 +285,7 @@ class VideoImporterApp:
                 self.update_progress(2, (idx / total_faces) * 100)
 
                 # Vérification des doublons existants
-                existing_name = is_duplicate(face_encoding, self.existing_encodings, self.tolerance)
+                existing_name = is_duplicate(face_encoding, existing_matcher, self.tolerance)
                 if existing_name:
                     unique_groups.append({
                         'name': existing_name,
@@ -398,7 +400,6 @@ class VideoImporterApp:
                                    parent=self.current_face_window)
         if name and isinstance(name, str) and name.strip():
             save_face_encoding(name.strip(), group['encoding'], group['thumbnail'])
-            self.existing_encodings = load_existing_encodings()
             self.refresh_face_window()
         else:
             Messagebox.show_warning("Nom invalide", "Veuillez entrer un nom valide.")
@@ -423,7 +424,8 @@ class VideoImporterApp:
         self.io_executor.submit(self.load_encodings_async, manager)
 
     def load_encodings_async(self, window):
-        encodings = load_existing_encodings()
+        # Une ligne par personne ; les miniatures sont chargées à l'affichage
+        encodings = [{'name': name} for name in load_known_names()]
         self.root.after(0, self.display_encodings, window, encodings)
 
     def display_encodings(self, window, encodings):
@@ -436,7 +438,15 @@ class VideoImporterApp:
         scrollbar = ttk.Scrollbar(window, orient="vertical", command=canvas.yview)
         frame = Frame(canvas)
 
-        canvas.configure(yscrollcommand=scrollbar.set)
+        # Miniatures chargées quand leur ligne devient visible (défilement,
+        # redimensionnement) : yscrollcommand est appelé à chaque changement de vue
+        pending = []
+
+        def on_view_change(first, last):
+            scrollbar.set(first, last)
+            self.load_visible_thumbnails(canvas, pending)
+
+        canvas.configure(yscrollcommand=on_view_change)
         scrollbar.pack(side="right", fill="y")
         canvas.pack(side="left", fill="both", expand=True)
         canvas.create_window((0, 0), window=frame, anchor="nw")
@@ -446,10 +456,9 @@ class VideoImporterApp:
             row = ttk.Frame(frame)
             row.pack(fill='x', pady=5)
 
-            img_data = self.load_encoding_data(enc['name'])
-            if img_data is not None:
-                img = self.convert_cv_to_tk(img_data)
-                ttk.Label(row, image=img).pack(side=LEFT)
+            thumb = ttk.Label(row, width=12)
+            thumb.pack(side=LEFT)
+            pending.append((row, thumb, enc['name']))
 
             ttk.Label(row, text=enc['name'], width=30).pack(side=LEFT)
             ttk.Button(row,
@@ -459,6 +468,21 @@ class VideoImporterApp:
 
         frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
 
+    def load_visible_thumbnails(self, canvas, pending):
+        """Charge les miniatures des lignes de pending entrées dans la zone visible."""
+        top = canvas.canvasy(0)
+        bottom = top + canvas.winfo_height()
+        for item in list(pending):
+            row, label, name = item
+            y = row.winfo_y()
+            if y + row.winfo_height() < top or y > bottom:
+                continue
+            pending.remove(item)
+            img = self.convert_cv_to_tk(self.load_encoding_data(name))
+            if img is not None:
+                label.configure(image=img, width=0)
+                label.image = img   # garder une référence (sinon image vide)
+
     def load_encoding_data(self, name):
         return load_image_for_name(name)
 
@@ -476,8 +500,7 @@ class VideoImporterApp:
     def delete_encoding(self, name, window):
         if Messagebox.show_question(f"Delete {name}?", parent=window):
             delete_encoding(name)
-            self.existing_encodings = load_existing_encodings()
-            self.display_encodings(window, self.existing_encodings)  # Mettre à jour la fenêtre
+            self.io_executor.submit(self.load_encodings_async, window)  # Mettre à jour la fenêtre
 
     def update_progress(self, stage_idx, progress):
         self.stage_bars[stage_idx]['value'] = progress
@@ -1,7 +1,19 @@
 from pathlib import Path
 import sys
 
+import pytest
+
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 SRC_PATH = PROJECT_ROOT / "src"
 if str(SRC_PATH) not in sys.path:
-    sys.path.insert(0, str(SRC_PATH))
\ No newline at end of file
+    sys.path.insert(0, str(SRC_PATH))
+
+
+@pytest.fixture
+def tmp_store(tmp_path, monkeypatch):
+    """Store d'encodages vide dans tmp_path, rétabli après le test."""
+    from face_recognition_app.storage import encodings_store as store
+
+    monkeypatch.setattr(store, "ENCODED_DIR", str(tmp_path))
+    monkeypatch.setattr(store, "META_FILE", str(tmp_path / "metadata.json"))
+    return store
@@ -0,0 +1,94 @@
+import numpy as np
+
+from face_recognition_app.core import gallery_matcher as gm
+from face_recognition_app.core.ann_index import IVFIndex
+from face_recognition_app.core.gallery_matcher import GalleryMatcher
+from face_recognition_app.storage import encodings_store as store
+
+
+def _clustered(n, seed=0, identities=200):
+    """Galerie synthétique : des identités bien séparées, quelques variantes chacune."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(0, 0.15, size=(identities, 128))
+    labels = rng.integers(0, identities, size=n)
+    return (centers[labels] + rng.normal(0, 0.02, size=(n, 128))).astype(np.float32)
+
+
+def test_bounded_search_matches_brute_force():
+    gallery = _clustered(3000)
+    names = [f"P{i}" for i in range(len(gallery))]
+    probes = _clustered(50, seed=1)
+
+    exact = GalleryMatcher(names, gallery)
+    ann = GalleryMatcher(names, gallery, index=IVFIndex.build(gallery), nprobe=1, bounded=True)
+
+    for threshold in (0.3, 0.6):
+        exact_names = [n for n, _ in exact.best(probes, threshold)]
+        ann_names = [n for n, _ in ann.best(probes, threshold)]
+        assert ann_names == exact_names
+
+    top_exact = exact.match(probes, k=5)
+    top_ann = ann.match(probes, k=5)
+    for a, b in zip(top_exact, top_ann):
+        np.testing.assert_allclose([m.distance for m in a], [m.distance for m in b], atol=1e-5)
+
+
+def test_incremental_updates_follow_gallery_rows():
+    gallery = _clustered(1000)
+    index = IVFIndex.build(gallery)
+
+    extra = _clustered(10, seed=2)
+    updated = index.appended(extra).deleted([0, 5, 999])
+    rebuilt_gallery = np.concatenate([np.delete(gallery, [0, 5, 999], axis=0), extra])
+    assert len(updated) == len(rebuilt_gallery)
+
+    names = [str(i) for i in range(len(rebuilt_gallery))]
+    exact = GalleryMatcher(names, rebuilt_gallery)
+    ann = GalleryMatcher(names, rebuilt_gallery, index=updated, nprobe=1, bounded=True)
+    assert [n for n, _ in ann.best(extra, 0.5)] == [n for n, _ in exact.best(extra, 0.5)]
+
+
+def test_index_persisted_and_updated_with_store(tmp_store, monkeypatch):
+    monkeypatch.setattr(store, "ANN_MIN_GALLERY_SIZE", 20)
+    monkeypatch.setattr(gm, "ANN_MIN_GALLERY_SIZE", 20)
+    monkeypatch.setattr(store, "GALLERY_MODE", "samples")
+
+    vectors = _clustered(25, identities=5)
+    for i, vec in enumerate(vectors):
+        store.save_face_encoding(f"P{i}", vec)
+
+    index = store.load_ann_index()
+    assert index is not None
+    assert len(index) == 25
+
+    store.delete_encoding("P3")
+    index = store.load_ann_index()
+    assert index is not None and len(index) == 24
+
+    matcher = GalleryMatcher.from_store(mode="samples")
+    assert matcher.index is not None
+    assert matcher.best(vectors[10], 0.1)[0][0] == "P10"
+
+
+def test_compact_mode_maintains_no_persisted_index(tmp_store, monkeypatch):
+    monkeypatch.setattr(store, "ANN_MIN_GALLERY_SIZE", 20)
+    monkeypatch.setattr(store, "GALLERY_MODE", "compact")
+
+    for i, vec in enumerate(_clustered(25, identities=5)):
+        store.save_face_encoding(f"P{i}", vec)
+    assert store.load_ann_index() is None
+
+
+def test_incremental_changes_retrain_drifted_index(monkeypatch):
+    monkeypatch.setattr(gm, "ANN_MIN_GALLERY_SIZE", 20)
+    gallery = _clustered(30, seed=3)
+    names = [str(i) for i in range(30)]
+    matcher = GalleryMatcher(names, gallery, keys=names, index=IVFIndex.build(gallery))
+
+    extra = _clustered(40, seed=4)
+    updated = matcher.with_changes(added=[(f"x{i}", f"x{i}", v) for i, v in enumerate(extra)])
+    assert updated.index is not None and not updated.index.needs_retrain()
+    assert updated.index.trained_size == 70
+
+    shrunk = updated.with_changes(removed_keys=[f"x{i}" for i in range(40)] + names[:20])
+    assert shrunk.index is None
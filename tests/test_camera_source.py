@@ -0,0 +1,199 @@
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from face_recognition_app.services.camera_source import CameraConfig, IPCameraSource, open_video_capture
+
+
+def _clip(path, frames=60, size=(160, 120)):
+    """Vidéo à mouvement lent : peu d'images clés (GOP de l'encodeur mpeg4)."""
+    width, height = size
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), 30, size)
+    texture = np.random.default_rng(0).integers(0, 255, size=(height, width + frames, 3), dtype=np.uint8)
+    for i in range(frames):
+        writer.write(np.ascontiguousarray(texture[:, i:i + width]))
+    writer.release()
+
+
+def _count(cap):
+    count = 0
+    while cap.read()[0]:
+        count += 1
+    return count
+
+
+def test_decode_options_round_trip():
+    config = CameraConfig(
+        name="Portail", source_type="ip", source="rtsp://cam/live",
+        capture_backend="ffmpeg", rtsp_transport="tcp", buffer_size=2,
+        keyframes_only=True, hw_acceleration="any", decode_threads=2,
+    )
+    restored = CameraConfig.from_dict(config.to_dict())
+    assert restored == config
+    assert restored.ffmpeg_options() == "rtsp_transport;tcp|avdiscard;nonkey"
+    assert restored.capture_params() == [
+        cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY, cv2.CAP_PROP_N_THREADS, 2,
+    ]
+    assert CameraConfig.from_dict({"name": "a", "source_type": "webcam", "source": 0}).ffmpeg_options() == ""
+
+
+def test_keyframes_only_decodes_fewer_frames(tmp_path):
+    path = tmp_path / "clip.mp4"
+    _clip(path)
+    config = CameraConfig(name="Test", source_type="ip", source=str(path), capture_backend="ffmpeg")
+    full = _count(open_video_capture(str(path), config))
+
+    config.keyframes_only = True
+    keyframes = _count(open_video_capture(str(path), config))
+    assert full == 60
+    assert 0 < keyframes < full
+    assert "OPENCV_FFMPEG_CAPTURE_OPTIONS" not in os.environ
+
+
+def test_dual_stream_routes_analysis_and_recording(tmp_path):
+    main, sub = tmp_path / "main.mp4", tmp_path / "sub.mp4"
+    _clip(main, size=(320, 240))
+    _clip(sub, size=(160, 120))
+    config = CameraConfig(
+        name="Portail", source_type="ip", source=str(main),
+        analysis_source=str(sub), keyframes_only=True,
+    )
+    assert config.stream_sources() == (str(sub), str(main))
+    assert config.ffmpeg_options(keyframes=False) == ""
+
+    source = IPCameraSource(config)
+    assert source.dual_stream
+    assert source.start()
+    try:
+        frame = source.wait_frame(0, timeout=2.0)
+        assert frame is not None and frame.shape == (120, 160, 3)
+        frame.release()
+        # Sans enregistreur, le flux principal n'est pas lu
+        assert not source._recording.is_running
+
+        source.reserve_history(4)
+        assert source._recording.is_running
+        for _ in range(50):
+            history = source.get_history(4)
+            if history:
+                break
+            time.sleep(0.02)
+        assert history and all(f.shape == (240, 320, 3) for f in history)
+        for f in history:
+            f.release()
+        assert source.get_frame().shape == (240, 320, 3)
+    finally:
+        source.stop()
+
+
+class _CountingCapture:
+    """Capture factice : compte les grab() et les décodages."""
+
+    def __init__(self):
+        self.grabbed = 0
+        self.decoded = 0
+
+    def grab(self):
+        self.grabbed += 1
+        return True
+
+    def retrieve(self, image=None):
+        self.decoded += 1
+        return True, np.full((4, 4, 3), self.grabbed, dtype=np.uint8)
+
+
+def test_decode_on_demand_only_retrieves_wanted_frames():
+    config = CameraConfig(name="Cour", source_type="ip", source="rtsp://cam/live", decode_on_demand=True)
+    assert CameraConfig.from_dict(config.to_dict()).decode_on_demand
+    source = IPCameraSource(config)
+    stream = source._analysis
+    stream._cap = cap = _CountingCapture()
+
+    for _ in range(5):
+        assert stream._next_frame()
+    assert cap.grabbed == 5 and cap.decoded == 0
+    assert source.get_frame() is None
+
+    # Lecture demandée : seule l'image suivante est décodée
+    stream._next_frame()
+    stream._next_frame()
+    assert cap.decoded == 1
+    with source.get_latest() as frame:
+        assert frame.seq == 6 and frame.image[0, 0, 0] == 6
+
+    # Un appel de wait_frame en cours force le décodage
+    stream._waiters = 1
+    stream._next_frame()
+    stream._waiters = 0
+    assert cap.decoded == 2 and source.get_frame()[0, 0, 0] == 8
+
+    # Historique réservé (enregistreur) : tout est décodé
+    source.reserve_history(2)
+    for _ in range(3):
+        stream._next_frame()
+    assert cap.decoded == 5 and cap.grabbed == 11
+    assert [f.seq for f in source.get_history(2)] == [10, 11]
+
+
+def test_plain_open_does_not_inherit_other_camera_options(monkeypatch):
+    from face_recognition_app.services import camera_source
+
+    opened = threading.Event()
+    release = threading.Event()
+    seen = {}
+
+    def fake_capture(source, backend, params):
+        seen[source] = os.environ.get("OPENCV_FFMPEG_CAPTURE_OPTIONS")
+        if source == "keyframes":
+            opened.set()
+            release.wait(2.0)
+        return object()
+
+    monkeypatch.setattr(camera_source.cv2, "VideoCapture", fake_capture)
+    tuned = CameraConfig(name="A", source_type="ip", source="keyframes", keyframes_only=True)
+    plain = CameraConfig(name="B", source_type="ip", source="plain")
+
+    first = threading.Thread(target=open_video_capture, args=("keyframes", tuned))
+    first.start()
+    assert opened.wait(2.0)
+    second = threading.Thread(target=open_video_capture, args=("plain", plain))
+    second.start()
+    time.sleep(0.05)
+    release.set()
+    first.join()
+    second.join()
+    assert seen == {"keyframes": "avdiscard;nonkey", "plain": None}
+
+
+def test_legacy_hog_default_defers_to_profile():
+    legacy = {"name": "Entrée", "source_type": "webcam", "source": 0, "detection_model": "hog"}
+    assert CameraConfig.from_dict(legacy).detection_model == ""
+    assert CameraConfig.from_dict({**legacy, "detection_model": "cnn"}).detection_model == "cnn"
+
+    chosen = CameraConfig(name="Entrée", source_type="webcam", source=0, detection_model="hog")
+    assert CameraConfig.from_dict(chosen.to_dict()).detection_model == "hog"
+
+
+def test_decode_on_demand_paces_recorder_history(tmp_path):
+    from face_recognition_app.services.camera_manager import CameraManager
+    from face_recognition_app.services.surveillance_engine import SurveillanceEngine
+    from face_recognition_app.services.video_recorder import VideoRecorder
+
+    config = CameraConfig(name="Cour", source_type="ip", source="rtsp://cam/live", decode_on_demand=True)
+    manager = CameraManager(tmp_path / "cameras.json")
+    source = IPCameraSource(config)
+    manager._sources[config.uid] = source
+    SurveillanceEngine(manager).set_recorder(VideoRecorder(tmp_path / "clips", fps=15))
+
+    stream = source._analysis
+    stream._cap = cap = _CountingCapture()
+    for _ in range(30):          # caméra à 60 i/s pendant 0,5 s
+        stream._next_frame()
+        time.sleep(1 / 60)
+    assert cap.grabbed == 30
+    # Historique décodé à la cadence des clips (15 i/s), pas à celle de la caméra
+    assert 4 <= cap.decoded <= 12
+    assert len(source.get_history(30)) == cap.decoded
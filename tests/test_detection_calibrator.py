@@ -0,0 +1,58 @@
+from face_recognition_app.services.camera_source import CameraConfig
+from face_recognition_app.services.detection_calibrator import (
+    CALIBRATION_SCALE,
+    DetectionCalibrator,
+    HOG_MIN_FACE,
+    SAFETY_MARGIN,
+    choose_detection_settings,
+    detection_cost,
+)
+
+
+def test_large_faces_allow_strong_downscale():
+    scale, upsample = choose_detection_settings([400] * 50)
+    assert (scale, upsample) == (0.25, 0)
+
+
+def test_small_faces_need_upsampling():
+    scale, upsample = choose_detection_settings([60] * 50)
+    assert 60 * scale * 2 ** upsample >= HOG_MIN_FACE * SAFETY_MARGIN
+    assert upsample >= 1
+
+
+def test_choice_is_cheapest_sufficient_setting():
+    sizes = [120, 150, 200, 250, 300] * 20
+    scale, upsample = choose_detection_settings(sizes)
+    # Le réglage historique (0.5, 1) détecte aussi ces visages : jamais plus cher
+    assert detection_cost(scale, upsample) <= detection_cost(0.5, 1)
+
+
+def test_calibrator_collects_samples():
+    calibrator = DetectionCalibrator(samples=3)
+    assert calibrator.settings[0] == CALIBRATION_SCALE
+    calibrator.add([(0, 200, 200, 0), (0, 210, 210, 0)])
+    assert not calibrator.done and calibrator.result() is None
+    calibrator.add([(0, 220, 220, 0)])
+    assert calibrator.done
+    assert calibrator.result() == choose_detection_settings([200, 210, 220])
+
+
+def test_tracked_face_sampled_once():
+    calibrator = DetectionCalibrator(samples=3)
+    # Visage immobile suivi sur plusieurs frames : un seul échantillon
+    for _ in range(5):
+        calibrator.add([(0, 200, 200, 0)], [7])
+    assert not calibrator.done
+    calibrator.add([(0, 200, 200, 0), (0, 300, 300, 0)], [7, 8])
+    calibrator.add([(0, 400, 400, 0)], [None])
+    assert calibrator.done
+    assert calibrator.result() == choose_detection_settings([200, 300, 400])
+
+
+def test_camera_config_roundtrip():
+    config = CameraConfig(name="c", source_type="webcam", source=0,
+                          detection_scale=0.25, detection_upsample=0, auto_calibrate=True)
+    restored = CameraConfig.from_dict(config.to_dict())
+    assert (restored.detection_scale, restored.detection_upsample, restored.auto_calibrate) == (0.25, 0, True)
+    legacy = CameraConfig.from_dict({"name": "c", "source_type": "webcam", "source": 0})
+    assert (legacy.detection_scale, legacy.detection_upsample, legacy.auto_calibrate) == (0.5, 1, False)
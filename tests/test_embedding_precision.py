@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from face_recognition_app.core.embedding_precision import QuantizedMatrix, accuracy_report
+from face_recognition_app.core.gallery_matcher import GalleryMatcher
+
+
+def _gallery(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    return [f"P{i}" for i in range(n)], rng.normal(0, 0.1, size=(n, 128))
+
+
+@pytest.mark.parametrize("precision, atol", [("float32", 1e-6), ("float16", 1e-3), ("int8", 2e-3)])
+def test_quantized_rows_close_to_original(precision, atol):
+    _, gallery = _gallery()
+    q = QuantizedMatrix.from_float(gallery, precision)
+    np.testing.assert_allclose(q.dequantize(), gallery, atol=atol)
+    np.testing.assert_allclose(q.dot(gallery[:3]), gallery[:3] @ q.dequantize().T, rtol=1e-4, atol=1e-5)
+
+
+def test_memory_per_face():
+    _, gallery = _gallery()
+    sizes = {p: QuantizedMatrix.from_float(gallery, p).nbytes / len(gallery)
+             for p in ("float32", "float16", "int8")}
+    assert sizes == {"float32": 512, "float16": 256, "int8": 132}
+
+
+def test_reduced_precision_matcher_keeps_decisions():
+    names, gallery = _gallery()
+    probes = gallery[:50] + np.random.default_rng(1).normal(0, 0.01, size=(50, 128))
+    exact = GalleryMatcher(names, gallery).best(probes, 0.5)
+
+    for precision in ("float16", "int8"):
+        matcher = GalleryMatcher(names, gallery, keys=names, precision=precision)
+        assert [n for n, _ in matcher.best(probes, 0.5)] == [n for n, _ in exact]
+        updated = matcher.with_changes({"P0"}, [("X", "X", gallery[0])])
+        assert updated.precision == precision
+        assert updated.best(gallery[0], 0.1)[0][0] == "X"
+
+
+def test_accuracy_report():
+    names, gallery = _gallery()
+    report = accuracy_report(names, gallery, threshold=0.6, max_probes=100)
+    assert set(report) == {"float32", "float16", "int8"}
+    assert report["float32"]["agreement"] == 1.0
+    assert report["int8"]["max_distance_error"] < 0.01
+
+
+def test_accuracy_report_by_probe_blocks(monkeypatch):
+    from face_recognition_app.core import embedding_precision
+
+    names, gallery = _gallery()
+    whole = accuracy_report(names, gallery, threshold=0.6, max_probes=100)
+    monkeypatch.setattr(embedding_precision, "_REPORT_BLOCK_DISTANCES", 7 * len(gallery))
+    blocked = accuracy_report(names, gallery, threshold=0.6, max_probes=100)
+    for precision, entry in whole.items():
+        assert blocked[precision] == pytest.approx(entry)
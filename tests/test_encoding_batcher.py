@@ -0,0 +1,128 @@
+import threading
+
+import numpy as np
+import pytest
+
+from face_recognition_app.core.gallery_matcher import GalleryMatcher
+from face_recognition_app.services import encoding_batcher
+from face_recognition_app.services.encoding_batcher import EncodingBatcher, crop_faces
+
+
+def _fake_encoder(calls):
+    """Encodage factice : chaque découpe porte l'indice de sa personne dans son premier pixel."""
+    gallery = np.random.default_rng(0).normal(0, 0.1, size=(4, 128))
+
+    def encode(items):
+        calls.append(len(items))
+        return [[gallery[int(rgb[0, 0, 0])]] if locs else [] for rgb, locs in items]
+
+    return gallery, encode
+
+
+def _crop(person):
+    return (np.full((10, 10, 3), person, dtype=np.uint8), [(0, 10, 10, 0)])
+
+
+def test_requests_from_several_cameras_share_one_batch(monkeypatch):
+    calls = []
+    gallery, encode = _fake_encoder(calls)
+    monkeypatch.setattr(encoding_batcher, "encode_faces_batch", encode)
+    matcher = GalleryMatcher(["A", "B", "C", "D"], gallery)
+
+    batcher = EncodingBatcher(pool=None, max_batch=64, max_latency=0.5)
+    batcher.start()
+    results = {}
+    barrier = threading.Barrier(4)
+
+    def camera(person):
+        barrier.wait()
+        crops = [_crop(person), _crop((person + 1) % 4)]
+        results[person] = batcher.submit(crops, [matcher], 0.5).result(timeout=5)
+
+    threads = [threading.Thread(target=camera, args=(p,)) for p in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.stop()
+
+    names = "ABCD"
+    for person, matches in results.items():
+        assert [m[0] for m in matches] == [names[person], names[(person + 1) % 4]]
+    assert sum(calls) == 8
+    assert len(calls) < 4
+    assert batcher.mean_batch_size > 2
+
+
+def test_batch_flushed_at_max_size(monkeypatch):
+    calls = []
+    gallery, encode = _fake_encoder(calls)
+    monkeypatch.setattr(encoding_batcher, "encode_faces_batch", encode)
+    matcher = GalleryMatcher(["A", "B", "C", "D"], gallery)
+
+    batcher = EncodingBatcher(pool=None, max_batch=2, max_latency=10.0)
+    batcher.start()
+    try:
+        future = batcher.submit([_crop(0), _crop(1)], [matcher], 0.5)
+        assert [m[0] for m in future.result(timeout=2)] == ["A", "B"]
+    finally:
+        batcher.stop()
+    assert calls == [2]
+
+
+def test_face_without_encoding_is_unknown(monkeypatch):
+    calls = []
+    gallery, encode = _fake_encoder(calls)
+    monkeypatch.setattr(encoding_batcher, "encode_faces_batch", encode)
+    matcher = GalleryMatcher(["A", "B", "C", "D"], gallery)
+
+    batcher = EncodingBatcher(pool=None)
+    no_face = (np.zeros((10, 10, 3), dtype=np.uint8), [])
+    matches = batcher.submit([no_face, _crop(2)], [matcher], 0.5).result()
+    assert matches[0] == (None, float("inf"))
+    assert matches[1][0] == "C"
+
+
+def test_crop_faces_clips_and_shifts_locations():
+    rgb = np.zeros((100, 100, 3), dtype=np.uint8)
+    (edge, edge_locs), (inner, inner_locs) = crop_faces(rgb, [(10, 60, 50, 20), (40, 80, 60, 60)])
+    assert edge.shape == (70, 80, 3)
+    assert edge_locs == [(10, 60, 50, 20)]
+    assert inner.shape == (40, 40, 3)
+    assert inner_locs == [(10, 30, 30, 10)]
+
+
+def test_batch_timings_reported(monkeypatch):
+    calls = []
+    gallery, encode = _fake_encoder(calls)
+    monkeypatch.setattr(encoding_batcher, "encode_faces_batch", encode)
+    matcher = GalleryMatcher(["A", "B", "C", "D"], gallery)
+
+    timings = {}
+    EncodingBatcher(pool=None).submit([_crop(0)], [matcher], 0.5, timings).result(timeout=5)
+    assert set(timings) == {"encode", "match"}
+    assert all(v >= 0 for v in timings.values())
+
+
+def test_matching_error_fails_batch_and_keeps_loop(monkeypatch):
+    calls = []
+    gallery, encode = _fake_encoder(calls)
+    monkeypatch.setattr(encoding_batcher, "encode_faces_batch", encode)
+    matcher = GalleryMatcher(["A", "B", "C", "D"], gallery)
+    real_best_across = encoding_batcher.best_across
+    failures = [RuntimeError("galerie corrompue")]
+
+    def flaky(*args):
+        if failures:
+            raise failures.pop()
+        return real_best_across(*args)
+
+    monkeypatch.setattr(encoding_batcher, "best_across", flaky)
+    batcher = EncodingBatcher(pool=None, max_batch=1, max_latency=0.0)
+    batcher.start()
+    try:
+        with pytest.raises(RuntimeError):
+            batcher.submit([_crop(0)], [matcher], 0.5).result(timeout=2)
+        assert batcher.submit([_crop(1)], [matcher], 0.5).result(timeout=2)[0][0] == "B"
+    finally:
+        batcher.stop()
@@ -4,18 +4,11 @@ import pytest
 from face_recognition_app.storage import encodings_store as store
 
 
-def _setup_tmp_store(tmp_path):
-    store.ENCODED_DIR = str(tmp_path)
-    store.META_FILE = str(tmp_path / "metadata.json")
-
-
 # ---------------------------------------------------------------------------
 # encodings_store
 # ---------------------------------------------------------------------------
 
-def test_save_load_delete_encoding(tmp_path):
-    _setup_tmp_store(tmp_path)
-
+def test_save_load_delete_encoding(tmp_store):
     encoding = np.zeros(128, dtype=float)
     image = np.zeros((50, 50, 3), dtype=np.uint8)
     store.save_face_encoding("Alice", encoding, image=image)
@@ -33,9 +26,7 @@ def test_save_load_delete_encoding(tmp_path):
     assert not any(e["name"] == "Alice" for e in encodings_after)
 
 
-def test_save_without_image(tmp_path):
-    _setup_tmp_store(tmp_path)
-
+def test_save_without_image(tmp_store):
     encoding = np.ones(128, dtype=float)
     store.save_face_encoding("Bob", encoding)
 
@@ -47,9 +38,7 @@ def test_save_without_image(tmp_path):
     assert img is None
 
 
-def test_load_encodings_map(tmp_path):
-    _setup_tmp_store(tmp_path)
-
+def test_load_encodings_map(tmp_store):
     enc1 = np.zeros(128, dtype=float)
     enc2 = np.ones(128, dtype=float)
     store.save_face_encoding("Alice", enc1)
@@ -61,10 +50,8 @@ def test_load_encodings_map(tmp_path):
     assert mapping["Alice"].shape == (128,)
 
 
-def test_load_encodings_map_deduplication(tmp_path):
+def test_load_encodings_map_deduplication(tmp_store):
     """Si deux fichiers portent le même nom, load_encodings_map ne garde que le premier."""
-    _setup_tmp_store(tmp_path)
-
     enc = np.zeros(128, dtype=float)
     store.save_face_encoding("Alice", enc)
     store.save_face_encoding("Alice", enc)
@@ -73,8 +60,7 @@ def test_load_encodings_map_deduplication(tmp_path):
     assert list(mapping.keys()).count("Alice") == 1
 
 
-def test_delete_nonexistent_encoding(tmp_path):
-    _setup_tmp_store(tmp_path)
+def test_delete_nonexistent_encoding(tmp_store):
     removed = store.delete_encoding("Inconnu")
     assert removed == []
 
@@ -94,9 +80,7 @@ def test_validate_encoding_wrong_length():
     assert store.validate_encoding(data) is False
 
 
-def test_metadata_updated_on_save(tmp_path):
-    _setup_tmp_store(tmp_path)
-
+def test_metadata_updated_on_save(tmp_store):
     encoding = np.zeros(128, dtype=float)
     store.save_face_encoding("Charlie", encoding)
 
@@ -105,9 +89,7 @@ def test_metadata_updated_on_save(tmp_path):
     assert "Charlie" in names
 
 
-def test_metadata_cleaned_on_delete(tmp_path):
-    _setup_tmp_store(tmp_path)
-
+def test_metadata_cleaned_on_delete(tmp_store):
     encoding = np.zeros(128, dtype=float)
     store.save_face_encoding("Dave", encoding)
     store.delete_encoding("Dave")
@@ -117,6 +99,211 @@ def test_metadata_cleaned_on_delete(tmp_path):
     assert "Dave" not in names
 
 
+def test_matrix_layout_on_disk(tmp_path, tmp_store):
+    store.save_face_encoding("Alice", np.full(128, 0.25), image=np.zeros((20, 20, 3), dtype=np.uint8))
+    store.save_face_encoding("Bob", np.full(128, 0.5))
+
+    assert (tmp_path / "embeddings.f32").stat().st_size == 2 * 128 * 4
+    assert (tmp_path / "thumbnails.bin").exists()
+    assert not [p for p in tmp_path.glob("*.json") if p.name not in ("index.json", "metadata.json")]
+
+    names, matrix = store.load_embedding_matrix()
+    assert names == ["Alice", "Bob"]
+    assert matrix.dtype == np.float32
+    assert matrix.shape == (2, 128)
+    np.testing.assert_allclose(matrix[1], 0.5)
+
+
+def test_delete_keeps_rows_aligned(tmp_store):
+    for i, name in enumerate(["A", "B", "C"]):
+        store.save_face_encoding(name, np.full(128, float(i)))
+    store.delete_encoding("B")
+
+    names, matrix = store.load_embedding_matrix()
+    assert names == ["A", "C"]
+    np.testing.assert_allclose(matrix[:, 0], [0.0, 2.0])
+
+
+def test_migration_from_legacy_json(tmp_path, tmp_store):
+    import base64
+    import json
+
+    import cv2
+
+    _, jpeg = cv2.imencode(".jpg", np.zeros((10, 10, 3), dtype=np.uint8))
+    legacy = {
+        "name": "Legacy",
+        "encoding": [0.1] * 128,
+        "timestamp": "2024-01-01T00:00:00",
+        "image_base64": base64.b64encode(jpeg).decode("utf-8"),
+    }
+    (tmp_path / "abc123.json").write_text(json.dumps(legacy))
+    (tmp_path / "broken.json").write_text("{")
+    mapping = store.load_encodings_map()
+    assert list(mapping) == ["Legacy"]
+    np.testing.assert_allclose(mapping["Legacy"], 0.1, rtol=1e-6)
+    assert store.load_image_for_name("Legacy") is not None
+
+    # Les anciens fichiers sont archivés, la migration n'a lieu qu'une fois
+    assert (tmp_path / "legacy_json" / "abc123.json").exists()
+    assert not (tmp_path / "abc123.json").exists()
+    assert len(store.load_existing_encodings()) == 1
+
+
+def test_encoding_changes_since_generation(tmp_store):
+    store.save_face_encoding("Alice", np.zeros(128))
+    gen = store.encodings_generation()
+
+    store.save_face_encoding("Bob", np.ones(128))
+    store.delete_encoding("Alice")
+
+    new_gen, changes = store.load_encoding_changes(gen)
+    assert new_gen == gen + 2
+    assert [(c["op"], c["name"]) for c in changes] == [("add", "Bob"), ("remove", "Alice")]
+    np.testing.assert_allclose(changes[0]["encoding"], 1.0)
+
+    assert store.load_encoding_changes(new_gen) == (new_gen, [])
+
+
+def test_encoding_changes_gap_requires_full_reload(tmp_path, tmp_store):
+    store.save_face_encoding("Alice", np.zeros(128))
+    store.save_face_encoding("Bob", np.zeros(128))
+    (tmp_path / "journal.log").write_text("")
+
+    _, changes = store.load_encoding_changes(0)
+    assert changes is None
+
+
+def test_journal_compacted_across_sessions(tmp_path, monkeypatch):
+    from face_recognition_app.storage import matrix_store
+
+    monkeypatch.setattr(matrix_store, "JOURNAL_MAX_ENTRIES", 10)
+    first = matrix_store.MatrixEncodingStore(tmp_path)
+    for i in range(8):
+        first.append([(f"p{i}", np.zeros(128), None, "", f"p{i}")])
+
+    # Nouveau processus : les 8 entrées existantes comptent
+    second = matrix_store.MatrixEncodingStore(tmp_path)
+    for i in range(3):
+        second.append([(f"q{i}", np.zeros(128), None, "", f"q{i}")])
+    lines = (tmp_path / "journal.log").read_text().splitlines()
+    assert len(lines) <= 10
+
+
+def test_change_listener_notified(tmp_store):
+    seen = []
+    store.add_change_listener(seen.append)
+    try:
+        store.save_face_encoding("Alice", np.zeros(128))
+        store.delete_encoding("Alice")
+    finally:
+        store.remove_change_listener(seen.append)
+
+    assert len(seen) == 2
+    assert seen[1] > seen[0]
+
+
+def test_name_lookup_follows_deletions(tmp_path, tmp_store):
+    image = np.zeros((20, 20, 3), dtype=np.uint8)
+    store.save_face_encoding("A", np.zeros(128))
+    store.save_face_encoding("B", np.ones(128))
+    store.save_face_encoding("C", np.full(128, 2.0), image=image)
+    store.save_face_encoding("A", np.full(128, 3.0))
+
+    lookup = store._get_store().lookup("A")
+    assert [e["row"] for e in lookup] == [0, 3]
+
+    store.delete_encoding("B")
+    assert [e["row"] for e in store._get_store().lookup("A")] == [0, 2]
+    assert store._get_store().lookup("C")[0]["row"] == 1
+    assert store.load_image_for_name("C") is not None
+
+    # Un second processus (nouvelle instance) reconstruit les tables depuis l'index
+    from face_recognition_app.storage.matrix_store import MatrixEncodingStore
+    other = MatrixEncodingStore(tmp_path)
+    assert other.uids_for_name("A") == store._get_store().uids_for_name("A")
+
+
+def test_bulk_save_single_write(tmp_path, tmp_store):
+    seen = []
+    store.add_change_listener(seen.append)
+    try:
+        image = np.zeros((20, 20, 3), dtype=np.uint8)
+        uids = store.save_face_encodings_bulk(
+            [("Alice", np.zeros(128), image), ("Alice", np.ones(128), None), ("Bob", np.full(128, 2.0), None)]
+        )
+    finally:
+        store.remove_change_listener(seen.append)
+
+    assert len(uids) == 3
+    assert len(seen) == 1
+    assert store.encodings_generation() == 1
+    metadata = store.load_metadata()
+    assert sorted(metadata) == sorted(uids)
+    assert not (tmp_path / "metadata.json.tmp").exists()
+
+
+def test_enrolment_batch_discarded_on_error(tmp_store):
+    with store.enrolment_batch() as batch:
+        batch.add("Alice", np.zeros(128))
+        batch.add("Bob", np.ones(128))
+    assert len(batch.uids) == 2
+
+    with pytest.raises(RuntimeError):
+        with store.enrolment_batch() as batch:
+            batch.add("Carol", np.zeros(128))
+            raise RuntimeError("interrompu")
+    assert store.load_embedding_matrix()[0] == ["Alice", "Bob"]
+
+
+def test_thumbnails_loaded_lazily_with_lru(tmp_store, monkeypatch):
+    monkeypatch.setattr(store, "THUMBNAIL_CACHE_SIZE", 1)
+    image = np.full((20, 20, 3), 128, dtype=np.uint8)
+    uid_a, uid_b = store.save_face_encodings_bulk(
+        [("Alice", np.zeros(128), image), ("Bob", np.ones(128), image)]
+    )
+    store.save_face_encoding("Carol", np.full(128, 2.0))
+
+    entries = store.load_face_entries()
+    assert [e["has_thumbnail"] for e in entries] == [True, True, False]
+    assert store.load_known_names() == ["Alice", "Bob", "Carol"]
+
+    first = store.load_thumbnail(uid_a)
+    assert store.load_thumbnail(uid_a) is first
+    assert not first.flags.writeable
+    store.load_thumbnail(uid_b)            # évince Alice (cache de taille 1)
+    assert store.load_thumbnail(uid_a) is not first
+    assert store.load_thumbnail_bytes(uid_a)[:2] == b"\xff\xd8"
+
+    # Par nom : copie modifiable, le cache reste intact
+    drawn = store.load_image_for_name("Bob")
+    drawn[:] = 0
+    assert store.load_thumbnail(uid_b).max() > 0
+    assert store.load_image_for_name("Carol") is None
+
+    store.delete_encoding("Alice")
+    assert store.load_thumbnail(uid_a) is None
+
+
+def test_named_shards_are_independent(tmp_path, tmp_store):
+    store.save_face_encoding("Alice", np.zeros(128))
+    store.save_face_encoding("Suspect", np.ones(128), shard="watchlist")
+
+    assert store.list_shards() == ["default", "watchlist"]
+    assert store.load_known_names() == ["Alice"]
+    assert store.load_known_names("watchlist") == ["Suspect"]
+    assert (tmp_path / "shards" / "watchlist" / "embeddings.f32").exists()
+    assert store.shards_for_names(["Suspect"]) == ["watchlist"]
+
+    assert store.delete_encoding("Suspect") == []
+    assert store.delete_encoding("Suspect", shard="watchlist")
+    assert store.encodings_generation("watchlist") == 2
+    assert store.encodings_generation() == 1
+
+    with pytest.raises(ValueError):
+        store.shard_directory("../ailleurs")
+
+
 # ---------------------------------------------------------------------------
 # utils (is_duplicate)
 # ---------------------------------------------------------------------------
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from face_recognition_app.services import face_detectors
+from face_recognition_app.services.face_detectors import (
+    CascadeDetector,
+    DlibHogDetector,
+    FaceDetector,
+    create_detector,
+    get_detector,
+)
+
+
+class _FixedDetector(FaceDetector):
+    """Retourne des boîtes fixes (coordonnées de l'image complète) et note les tailles reçues."""
+
+    def __init__(self, boxes, name="fixed"):
+        super().__init__()
+        self.name = name
+        self.boxes = boxes
+        self.calls = []
+
+    def detect(self, rgb, upsample=1):
+        self.calls.append(rgb.shape[:2])
+        return list(self.boxes)
+
+
+def test_cascade_verifies_only_candidate_crops():
+    gate = _FixedDetector([(100, 140, 140, 100)], "gate")
+    verifier = _FixedDetector([(20, 60, 60, 20)], "verifier")
+    cascade = CascadeDetector(gate, verifier)
+
+    found = cascade.detect(np.zeros((480, 640, 3), dtype=np.uint8))
+
+    assert cascade.name == "gate+verifier"
+    assert verifier.calls == [(80, 80)]          # découpe avec marge, pas l'image entière
+    assert found == [(100, 140, 140, 100)]       # ramené dans l'image complète
+
+
+def test_cascade_skips_verifier_without_candidates():
+    verifier = _FixedDetector([(0, 10, 10, 0)])
+    cascade = CascadeDetector(_FixedDetector([]), verifier)
+    assert cascade.detect(np.zeros((100, 100, 3), dtype=np.uint8)) == []
+    assert verifier.calls == []
+
+
+def test_create_detector_names():
+    assert isinstance(create_detector("hog"), DlibHogDetector)
+    assert create_detector("haar+hog").name == "haar+hog"
+    with pytest.raises(ValueError):
+        create_detector("ssd")
+
+
+def test_missing_model_falls_back_to_hog(monkeypatch, tmp_path):
+    monkeypatch.setattr(face_detectors, "YUNET_MODEL_PATH", tmp_path / "absent.onnx")
+    monkeypatch.setattr(face_detectors, "_detectors", {})
+    assert get_detector("yunet").name == "hog"
+
+
+def test_hog_finds_nothing_on_blank_frame():
+    assert get_detector("hog").detect(np.zeros((120, 160, 3), dtype=np.uint8)) == []
+
+
+def test_benchmark_reports_recall_against_reference(monkeypatch):
+    truth = [(100, 140, 140, 100), (300, 360, 360, 300)]
+    monkeypatch.setitem(face_detectors._FACTORIES, "haar", lambda: _FixedDetector(truth[:1] + [(0, 20, 20, 0)]))
+    monkeypatch.setitem(face_detectors._FACTORIES, "cnn", lambda: _FixedDetector(truth))
+
+    report = face_detectors.benchmark([np.zeros((480, 640, 3), dtype=np.uint8)], ["haar"], repeat=2)
+    assert report["haar"]["faces_per_frame"] == 2
+    assert report["haar"]["recall"] == 0.5
+
+    blind = face_detectors.benchmark([np.zeros((480, 640, 3), dtype=np.uint8)], ["haar"], repeat=1, reference=None)
+    assert np.isnan(blind["haar"]["recall"])
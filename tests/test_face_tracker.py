@@ -0,0 +1,90 @@
+import numpy as np
+
+from face_recognition_app.services.face_tracker import FaceTracker, iou
+
+
+def _frame(top, left, size=40, shape=(240, 320), seed=0):
+    """Frame grise avec un patch texturé (le « visage ») en (top, left)."""
+    gray = np.full(shape, 90, dtype=np.uint8)
+    texture = np.random.default_rng(seed).integers(0, 255, size=(size, size), dtype=np.uint8)
+    gray[top:top + size, left:left + size] = texture
+    return gray
+
+
+def _box(top, left, size=40):
+    return (top, left + size, top + size, left)
+
+
+def test_iou():
+    assert iou(_box(0, 0), _box(0, 0)) == 1.0
+    assert iou(_box(0, 0), _box(100, 100)) == 0.0
+    assert 0.3 < iou(_box(0, 0), _box(0, 10)) < 0.7
+
+
+def test_track_followed_between_detections():
+    tracker = FaceTracker(redetect_every=5)
+    assert tracker.needs_detection()
+    pending = tracker.update_detections(_frame(50, 50), [_box(50, 50)])
+    assert len(pending) == 1
+    track = pending[0]
+    tracker.identify(track, "Alice", 0.3)
+
+    # Petits déplacements : suivis par corrélation, pas de ré-encodage
+    for step in range(1, 5):
+        assert not tracker.needs_detection()
+        assert tracker.follow(_frame(50 + step, 50 + 2 * step)) == []
+    assert track.location == _box(54, 58)
+    assert tracker.needs_detection()   # K-ième frame
+
+    # La redétection garde le même identifiant
+    assert tracker.update_detections(_frame(54, 58), [_box(54, 58)]) == []
+    assert [t.track_id for t in tracker.visible()] == [track.track_id]
+    assert tracker.visible()[0].name == "Alice"
+
+
+def test_large_move_triggers_reencoding():
+    tracker = FaceTracker(redetect_every=10)
+    track = tracker.update_detections(_frame(50, 50), [_box(50, 50)])[0]
+    tracker.identify(track, "Alice", 0.3)
+    for step in range(1, 4):
+        pending = tracker.follow(_frame(50, 50 + 8 * step))
+        if pending:
+            break
+    assert pending == [track]
+
+
+def test_lost_track_requests_detection():
+    tracker = FaceTracker(redetect_every=10)
+    track = tracker.update_detections(_frame(50, 50), [_box(50, 50)])[0]
+    tracker.identify(track, "Alice", 0.3)
+
+    assert tracker.follow(np.full((240, 320), 90, dtype=np.uint8)) is None
+    assert tracker.needs_detection()
+
+
+def test_new_and_vanished_faces():
+    tracker = FaceTracker(redetect_every=1)
+    first = tracker.update_detections(_frame(50, 50), [_box(50, 50)])[0]
+    tracker.identify(first, "Alice", 0.3)
+
+    pending = tracker.update_detections(_frame(50, 50), [_box(50, 50), _box(150, 200)])
+    assert len(pending) == 1 and pending[0].track_id != first.track_id
+
+    for _ in range(3):
+        tracker.update_detections(_frame(50, 50), [_box(150, 200)])
+    assert first.track_id not in [t.track_id for t in tracker.tracks]
+
+
+def test_unknown_track_reencoded_on_detection():
+    tracker = FaceTracker(redetect_every=1)
+    track = tracker.update_detections(_frame(50, 50), [_box(50, 50)])[0]
+    tracker.identify(track, None, float("inf"))
+    assert tracker.update_detections(_frame(50, 50), [_box(50, 50)]) == [track]
+
+
+def test_gallery_change_invalidates_identities():
+    tracker = FaceTracker(redetect_every=10)
+    track = tracker.update_detections(_frame(50, 50), [_box(50, 50)])[0]
+    tracker.identify(track, "Alice", 0.3)
+    tracker.invalidate_identities()
+    assert tracker.follow(_frame(50, 50)) == [track]
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from face_recognition_app.services.camera_source import CameraConfig, WebcamSource
+from face_recognition_app.services.frame import Frame
+
+
+def test_frame_is_read_only_and_shared():
+    image = np.zeros((4, 4, 3), dtype=np.uint8)
+    frame = Frame(image, seq=7)
+    with pytest.raises(ValueError):
+        frame.image[0, 0, 0] = 1
+    assert np.shares_memory(frame.image, image)
+    assert frame.copy().flags.writeable
+
+
+def test_on_release_called_when_last_reference_returned():
+    released = []
+    frame = Frame(np.zeros((2, 2), dtype=np.uint8), on_release=released.append)
+    frame.acquire()
+    frame.release()
+    assert released == [] and frame.refs == 1
+    with frame:
+        pass
+    assert released == [frame] and frame.refs == 0
+    frame.release()   # release de trop : ignoré
+    assert released == [frame]
+
+
+def test_source_publishes_numbered_frames_without_copy():
+    source = WebcamSource(CameraConfig(name="Test", source_type="webcam", source=0))
+    first = np.zeros((4, 4, 3), dtype=np.uint8)
+    source._publish(first)
+    held = source.get_latest()
+    assert held.seq == 1 and np.shares_memory(held.image, first)
+    snapshot = source.get_frame()
+    assert snapshot.flags.writeable and not np.shares_memory(snapshot, first)
+
+    source._publish(np.ones((4, 4, 3), dtype=np.uint8))
+    assert source.get_latest().seq == 2
+    # La source a rendu sa référence, le détenteur garde la sienne
+    assert held.refs == 1
+
+
+def test_get_frame_survives_slot_reuse():
+    source = WebcamSource(CameraConfig(name="Test", source_type="webcam", source=0))
+    stream = source._analysis
+    snapshots = []
+    for value in range(12):
+        slot, buffer = stream._ring.next_slot()
+        image = np.full((4, 4, 3), value, dtype=np.uint8) if buffer is None else buffer
+        image[:] = value
+        stream._publish(image, slot)
+        snapshots.append(source.get_frame())
+    assert [int(s[0, 0, 0]) for s in snapshots] == list(range(12))
+
+
+def test_display_frame_is_shared_and_pins_its_slot():
+    source = WebcamSource(CameraConfig(name="Test", source_type="webcam", source=0))
+    stream = source._analysis
+
+    def publish(value):
+        slot, buffer = stream._ring.next_slot()
+        image = np.full((4, 4, 3), value, dtype=np.uint8) if buffer is None else buffer
+        image[:] = value
+        stream._publish(image, slot)
+        return slot
+
+    slot = publish(0)
+    shown = source.get_display_frame()
+    assert np.shares_memory(shown.image, stream._ring._buffers[slot])
+    # Tant que l'affichage détient la référence, son slot n'est pas réécrit
+    for value in range(1, 12):
+        assert publish(value) != slot
+    assert int(shown.image[0, 0, 0]) == 0
+    shown.release()
+    assert slot in {publish(value) for value in range(12, 20)}
+
+
+def test_wait_frame_wakes_on_new_frame():
+    import threading
+
+    source = WebcamSource(CameraConfig(name="Test", source_type="webcam", source=0))
+    source._analysis._running = True
+    assert source.wait_frame(0, timeout=0.01) is None
+
+    timer = threading.Timer(0.05, source._publish, args=(np.zeros((4, 4, 3), dtype=np.uint8),))
+    timer.start()
+    frame = source.wait_frame(0, timeout=5)
+    assert frame is not None and frame.seq == 1
+    # Rien de nouveau depuis la séquence 1
+    assert source.wait_frame(1, timeout=0.01) is None
+    # Séquence inconnue (source redémarrée) : la frame courante est nouvelle
+    assert source.wait_frame(42, timeout=0.01).seq == 1
@@ -0,0 +1,58 @@
+import queue
+
+import numpy as np
+import pytest
+
+from face_recognition_app.services.frame import Frame
+from face_recognition_app.services.frame_queue import FrameQueue
+
+
+def _frames(count, released, captured_at=None):
+    return [
+        Frame(np.zeros((2, 2), dtype=np.uint8), seq=i, monotonic=captured_at, on_release=released.append)
+        for i in range(1, count + 1)
+    ]
+
+
+def test_drop_oldest_keeps_newest_frames():
+    released = []
+    q = FrameQueue(maxsize=2, policy="drop-oldest")
+    for frame in _frames(4, released):
+        q.put(frame)
+    assert q.dropped == 2 and [f.seq for f in released] == [1, 2]
+    assert [q.get(timeout=0)[1].seq for _ in range(2)] == [3, 4]
+
+
+def test_latest_only_replaces_pending_frame():
+    released = []
+    q = FrameQueue(maxsize=4, policy="latest-only")
+    for frame in _frames(3, released):
+        q.put(frame)
+    assert q.qsize() == 1 and q.dropped == 2
+    assert q.get(timeout=0)[1].seq == 3
+    with pytest.raises(queue.Empty):
+        q.get(timeout=0.01)
+
+
+def test_bounded_age_skips_stale_frames_but_not_the_newest():
+    released = []
+    q = FrameQueue(maxsize=4, policy="bounded-age", max_age=0.5)
+    old = _frames(2, released, captured_at=0.0)
+    for frame in old:
+        q.put(frame)
+    assert q.get(timeout=0)[1].seq == 2   # la plus récente, même trop vieille
+    assert q.stale == 1 and released == [old[0]]
+
+
+def test_unknown_policy_rejected():
+    with pytest.raises(ValueError):
+        FrameQueue(policy="drop-newest")
+
+
+def test_clear_releases_pending_frames():
+    released = []
+    q = FrameQueue(maxsize=4, policy="drop-oldest")
+    for frame in _frames(3, released):
+        q.put(frame)
+    q.clear()
+    assert len(released) == 3 and q.qsize() == 0
@@ -0,0 +1,85 @@
+import numpy as np
+
+from face_recognition_app.services.frame_ring import FrameRing
+from face_recognition_app.services.video_recorder import VideoRecorder
+
+
+def _read(ring, seq, value=0):
+    """Simule cap.read(image=slot) : écrit dans le slot s'il existe."""
+    index, buffer = ring.next_slot()
+    if buffer is None:
+        buffer = np.empty((4, 4, 3), dtype=np.uint8)
+    buffer[:] = value
+    return ring.publish(buffer, seq, index)
+
+
+def test_slots_reused_once_released():
+    ring = FrameRing(slots=2)
+    for seq in range(1, 20):
+        _read(ring, seq, seq)
+    assert ring.allocations == 2 and ring.overflows == 0
+
+    latest = ring.latest()
+    assert latest.seq == 19 and latest.image[0, 0, 0] == 19
+    # Frame retenue : son slot n'est pas réécrit
+    for seq in range(20, 30):
+        _read(ring, seq, seq)
+    assert latest.image[0, 0, 0] == 19
+    latest.release()
+
+
+def test_overflow_when_all_slots_held():
+    ring = FrameRing(slots=2)
+    held = [_read(ring, 1).acquire(), _read(ring, 2).acquire()]
+    index, _ = ring.next_slot()
+    assert index is None
+    frame = ring.publish(np.zeros((4, 4, 3), dtype=np.uint8), 3, index)
+    assert ring.overflows == 1 and frame.seq == 3
+    for f in held:
+        f.release()
+
+
+def test_history_for_recorder():
+    ring = FrameRing(slots=2)
+    ring.reserve(3)
+    for seq in range(1, 10):
+        _read(ring, seq)
+    frames = ring.history(10)
+    assert [f.seq for f in frames] == [6, 7, 8, 9]
+    assert [f.seq for f in ring.history(10, after_seq=8)] == [9]
+    for f in frames:
+        f.release()
+    assert ring.allocations <= ring.capacity
+
+
+def test_recorder_writes_history(tmp_path):
+    ring = FrameRing(slots=2, history=4)
+    for seq in range(1, 6):
+        _read(ring, seq)
+    recorder = VideoRecorder(tmp_path, pre_seconds=1, post_seconds=0.1, fps=4)
+    recorder.set_frame_source(lambda uid, count, after: ring.history(count, after))
+
+    clip = recorder.trigger_recording("cam1", "Entrée")
+    recorder._rec_threads["cam1"].join(timeout=5)
+    assert clip.exists()
+    ring.clear()
+    assert all(not busy for busy in ring._busy)
+
+
+def test_recorder_paces_clip_to_its_fps(tmp_path):
+    import cv2
+
+    ring = FrameRing(slots=2, history=30)
+    for seq in range(1, 31):
+        frame = _read(ring, seq)
+        frame.timestamp = 1000.0 + seq / 30.0   # caméra à 30 i/s
+    recorder = VideoRecorder(tmp_path, pre_seconds=2, post_seconds=0.05, fps=15)
+    recorder.set_frame_source(lambda uid, count, after: ring.history(count, after))
+
+    clip = recorder.trigger_recording("cam1", "Entrée")
+    recorder._rec_threads["cam1"].join(timeout=5)
+    cap = cv2.VideoCapture(str(clip))
+    written = 0
+    while cap.read()[0]:
+        written += 1
+    assert written == 15
@@ -0,0 +1,89 @@
+import pytest
+
+from face_recognition_app.services.camera_manager import CameraManager
+from face_recognition_app.services.frame_scheduler import FrameScheduler
+from face_recognition_app.services.surveillance_engine import SurveillanceEngine
+from face_recognition_app.storage.config import (
+    SCHEDULER_MAX_INTERVAL,
+    SCHEDULER_MIN_INTERVAL,
+    SCHEDULER_POLL_ACTIVE,
+    SCHEDULER_POLL_IDLE,
+)
+from face_recognition_app.storage.profile_store import DEFAULT_PROFILES, SurveillanceProfile
+
+
+def _scheduler(target_cpu=0.5, cores=2):
+    scheduler = FrameScheduler(target_cpu=target_cpu, base_interval=0.5, cores=cores)
+    for uid in ("busy", "idle"):
+        scheduler.register(uid)
+        scheduler.record_analysis(uid, 0.2)
+    return scheduler
+
+
+def test_busy_camera_gets_shorter_interval():
+    scheduler = _scheduler()
+    for _ in range(20):
+        scheduler.record_motion("busy", True)
+        scheduler.record_motion("idle", False)
+    scheduler.record_analysis("busy", 0.2, detections=1, now=100.0)
+
+    busy = scheduler.next_interval("busy", now=101.0)
+    idle = scheduler.next_interval("idle", now=101.0)
+    assert busy < idle
+    assert SCHEDULER_MIN_INTERVAL <= busy and idle <= SCHEDULER_MAX_INTERVAL
+
+
+def test_allocation_matches_cpu_budget():
+    scheduler = _scheduler(target_cpu=0.5, cores=1)
+    for _ in range(5):
+        scheduler.record_motion("busy", True)
+
+    used = sum(scheduler._cameras[uid].cost / scheduler.next_interval(uid, now=0.0) for uid in ("busy", "idle"))
+    assert used == pytest.approx(0.5, rel=1e-6)
+
+
+def test_costly_camera_is_slowed_down():
+    scheduler = _scheduler()
+    before = scheduler.next_interval("busy", now=0.0)
+    for _ in range(10):
+        scheduler.record_analysis("busy", 1.0)
+    assert scheduler.next_interval("busy", now=0.0) > before
+
+
+def test_zero_target_keeps_fixed_interval():
+    scheduler = _scheduler(target_cpu=0.0)
+    scheduler.record_analysis("busy", 3.0, detections=2)
+    assert scheduler.next_interval("busy") == 0.5
+    assert scheduler.next_interval("unknown") == 0.5
+
+
+def test_idle_camera_polled_less_often_unless_recording():
+    scheduler = _scheduler()
+    assert scheduler.poll_interval("idle") > scheduler.poll_interval("idle", recording=True)
+    scheduler.record_analysis("busy", 0.2, detections=1)
+    assert scheduler.poll_interval("busy") < scheduler.poll_interval("idle")
+
+
+class _Recorder:
+    def __init__(self):
+        self.recording = set()
+
+    def is_recording(self, uid):
+        return uid in self.recording
+
+
+def test_engine_keeps_polling_recorded_camera(tmp_path):
+    engine = SurveillanceEngine(CameraManager(tmp_path / "cameras.json"))
+    engine._scheduler.configure(0.5, 0.5)
+    engine._scheduler.register("cour")
+    assert engine._poll_interval("cour") == SCHEDULER_POLL_IDLE
+
+    engine._recorder = recorder = _Recorder()
+    recorder.recording.add("cour")
+    assert engine._poll_interval("cour") == SCHEDULER_POLL_ACTIVE
+
+
+def test_scheduler_is_opt_in(tmp_path):
+    assert SurveillanceProfile(name="p", label="p").target_cpu == 0.0
+    assert all(profile.target_cpu == 0.0 for profile in DEFAULT_PROFILES.values())
+    assert not SurveillanceEngine(CameraManager(tmp_path / "cameras.json"))._scheduler.adaptive
@@ -0,0 +1,105 @@
+import numpy as np
+
+from face_recognition_app.core.gallery_matcher import (
+    GalleryMatcher,
+    best_across,
+    compact_identity,
+    shared_gallery_matcher,
+)
+from face_recognition_app.storage import encodings_store as store
+
+
+def _random_gallery(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [f"P{i}" for i in range(n)], rng.normal(0, 0.1, size=(n, 128))
+
+
+def test_distances_match_euclidean_norm():
+    names, gallery = _random_gallery(50)
+    probes = np.random.default_rng(1).normal(0, 0.1, size=(7, 128))
+
+    matcher = GalleryMatcher(names, gallery)
+    expected = np.linalg.norm(gallery[None, :, :] - probes[:, None, :], axis=2)
+    np.testing.assert_allclose(matcher.distances(probes), expected, atol=1e-5)
+
+
+def test_match_top_k_sorted():
+    names, gallery = _random_gallery(20)
+    matcher = GalleryMatcher(names, gallery)
+
+    matches = matcher.match(gallery[3] + 0.001, k=3)[0]
+    assert matches[0].name == "P3"
+    assert [m.distance for m in matches] == sorted(m.distance for m in matches)
+    assert len(matches) == 3
+
+
+def test_best_respects_threshold():
+    names, gallery = _random_gallery(5)
+    matcher = GalleryMatcher(names, gallery)
+
+    far = np.full(128, 10.0)
+    (near_name, _), (far_name, far_dist) = matcher.best([gallery[2], far], threshold=0.5)
+    assert near_name == "P2"
+    assert far_name is None
+    assert far_dist > 0.5
+
+
+def test_empty_gallery():
+    matcher = GalleryMatcher([], None)
+    assert len(matcher) == 0
+    assert matcher.best(np.zeros(128), threshold=0.5) == [(None, float("inf"))]
+
+
+def test_shared_matcher_follows_store_generation(tmp_store):
+    store.save_face_encoding("Alice", np.zeros(128))
+    first = shared_gallery_matcher()
+    assert shared_gallery_matcher() is first
+
+    store.save_face_encoding("Bob", np.ones(128))
+    second = shared_gallery_matcher()
+    assert second is not first
+    assert second.names == ["Alice", "Bob"]
+
+
+def test_compact_identity_keeps_centroid_and_exemplars():
+    rng = np.random.default_rng(2)
+    samples = rng.normal(0, 0.1, size=(12, 128))
+
+    rows = compact_identity(samples, max_exemplars=4)
+    assert 2 <= len(rows) <= 5
+    np.testing.assert_allclose(rows[0], samples.mean(axis=0), atol=1e-6)
+    # Les exemplaires sont de vrais échantillons
+    for row in rows[1:]:
+        assert np.min(np.linalg.norm(samples - row, axis=1)) < 1e-6
+
+    few = compact_identity(samples[:3], max_exemplars=4)
+    assert len(few) == 3
+
+
+def test_multiple_enrolments_are_all_used(tmp_store):
+    rng = np.random.default_rng(3)
+    frontal, profile = rng.normal(0, 0.1, size=(2, 128))
+    store.save_face_encoding("Alice", frontal)
+    store.save_face_encoding("Alice", profile)
+    store.save_face_encoding("Bob", np.full(128, 0.3))
+
+    samples = store.load_samples_by_name()
+    assert samples["Alice"].shape == (2, 128)
+
+    matcher = GalleryMatcher.from_store(mode="compact")
+    assert matcher.names.count("Alice") == 2
+    assert matcher.best(profile + 0.001, threshold=0.1)[0][0] == "Alice"
+
+    store.delete_encoding("Alice")
+    updated = matcher.with_identities(store.load_samples_by_name({"Alice"}), {"Alice"})
+    assert updated.names == ["Bob"]
+
+
+def test_best_across_shards():
+    names, gallery = _random_gallery(10)
+    site = GalleryMatcher(names[:5], gallery[:5])
+    watchlist = GalleryMatcher(names[5:], gallery[5:])
+
+    results = best_across([site, watchlist], [gallery[1], gallery[7], np.full(128, 10.0)], 0.5)
+    assert [n for n, _ in results] == ["P1", "P7", None]
+    assert best_across([], gallery[0], 0.5) == [(None, float("inf"))]
@@ -0,0 +1,79 @@
+from concurrent.futures import wait
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from face_recognition_app.services.inference_pool import (
+    SLOTS_PER_WORKER,
+    InferencePool,
+    InferenceResult,
+    _SharedFrameSlots,
+)
+
+
+@pytest.mark.parametrize("backend", ["thread", "process"])
+def test_pool_runs_frames_from_several_callers(backend):
+    pool = InferencePool(workers=2, backend=backend)
+    pool.start()
+    try:
+        frames = [np.full((120, 160, 3), i * 40, dtype=np.uint8) for i in range(5)]
+        futures = [pool.submit(frame) for frame in frames]
+        wait(futures, timeout=120)
+        results = [f.result() for f in futures]
+    finally:
+        pool.shutdown()
+
+    assert all(isinstance(r, InferenceResult) for r in results)
+    assert all(r.locations == [] and r.encodings == [] for r in results)
+    assert pool.pending == 0
+
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError):
+        InferencePool(workers=1, backend="gpu")
+
+
+def test_shared_slots_reused_and_grown():
+    slots = _SharedFrameSlots(1)
+    try:
+        first = slots.acquire(1000)
+        name = first.name
+        slots.release(first)
+
+        again = slots.acquire(500)          # assez grand : même bloc
+        assert again.name == name
+        slots.release(again)
+
+        bigger = slots.acquire(first.size + 4096)   # trop petit : remplacé
+        assert bigger.name != name and bigger.size >= first.size + 4096
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+        slots.release(bigger)
+    finally:
+        slots.close()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=bigger.name)
+
+
+@pytest.mark.parametrize("backend", ["thread", "process"])
+def test_worker_error_reported_and_slot_released(backend):
+    pool = InferencePool(workers=1, backend=backend)
+    pool.start()
+    try:
+        # dlib refuse les images float64 : l'exception remonte par le Future
+        bad = pool.submit_locate(np.zeros((40, 40, 3), dtype=np.float64))
+        with pytest.raises(Exception):
+            bad.result(timeout=120)
+        assert pool.pending == 0
+        if backend == "process":
+            assert pool._slots._free.qsize() == SLOTS_PER_WORKER
+
+        # Le pool reste utilisable (bloc rendu, worker vivant)
+        frame = np.zeros((60, 80, 3), dtype=np.uint8)
+        assert pool.submit_locate(frame).result(timeout=120) == []
+        assert pool.submit_encode([(frame, [])]).result(timeout=120) == [[]]
+        # Frame plus grande que les blocs existants : bloc agrandi
+        assert pool.submit_locate(np.zeros((240, 320, 3), dtype=np.uint8)).result(timeout=120) == []
+    finally:
+        pool.shutdown()
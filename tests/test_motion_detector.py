@@ -0,0 +1,39 @@
+import numpy as np
+
+from face_recognition_app.services.motion_detector import MotionDetector, merge_boxes
+
+
+def test_merge_boxes():
+    boxes = [(0, 0, 10, 10), (12, 0, 10, 10), (100, 100, 5, 5)]
+    assert sorted(merge_boxes(boxes, gap=4)) == [(0, 0, 22, 10), (100, 100, 5, 5)]
+    assert len(merge_boxes(boxes, gap=0)) == 3
+
+
+def test_update_regions_returns_moving_areas():
+    detector = MotionDetector(sensitivity=100)
+    background = np.full((240, 320, 3), 80, dtype=np.uint8)
+    for _ in range(30):
+        detector.update_regions(background)
+
+    frame = background.copy()
+    frame[40:100, 200:260] = 250
+    detected, score, regions = detector.update_regions(frame)
+
+    assert detected and score > 0
+    assert len(regions) == 1
+    x, y, w, h = regions[0]
+    assert x <= 200 and y <= 40 and x + w >= 260 and y + h >= 100
+    assert w < 120 and h < 120
+
+
+def test_regions_are_in_full_frame_coordinates_with_roi():
+    detector = MotionDetector(sensitivity=100, roi=(100, 20, 200, 200))
+    background = np.full((240, 320, 3), 80, dtype=np.uint8)
+    for _ in range(30):
+        detector.update(background)
+
+    frame = background.copy()
+    frame[40:100, 200:260] = 250
+    _, _, regions = detector.update_regions(frame)
+    x, y, w, h = regions[0]
+    assert x <= 200 and y <= 40 and x + w >= 260
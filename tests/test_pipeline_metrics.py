@@ -0,0 +1,70 @@
+import numpy as np
+
+from face_recognition_app.services.pipeline_metrics import (
+    PRECISION,
+    LatencyHistogram,
+    PipelineMetrics,
+    prometheus_text,
+)
+from face_recognition_app.services.surveillance_engine import CameraStats
+
+
+def test_percentiles_within_bucket_precision():
+    hist = LatencyHistogram()
+    values = np.random.default_rng(0).lognormal(mean=-4, sigma=1, size=5000)
+    for v in values:
+        hist.record(float(v), now=0.0)
+
+    found = hist.percentiles(now=0.0)
+    for q in (0.5, 0.95, 0.99):
+        expected = float(np.quantile(values, q))
+        assert abs(found[q] - expected) / expected < 2 * PRECISION
+    assert hist.count == 5000
+    assert abs(hist.sum - values.sum()) < 1e-9
+
+
+def test_window_forgets_old_measurements():
+    hist = LatencyHistogram(window=10.0)
+    hist.record(1.0, now=0.0)
+    hist.record(0.001, now=12.0)
+    # Fenêtre précédente encore prise en compte
+    assert hist.percentiles((0.99,), now=12.0)[0.99] > 0.5
+    # Plus de deux fenêtres écoulées : seule la mesure récente reste
+    hist.record(0.001, now=25.0)
+    assert hist.percentiles((0.99,), now=25.0)[0.99] < 0.01
+    assert hist.percentiles(now=60.0) == {}
+    assert hist.count == 3
+
+
+def test_stages_recorded_only_inside_trace():
+    metrics = PipelineMetrics()
+    with metrics.stage("detect"):
+        pass
+    assert metrics.cameras() == ()
+
+    metrics.begin("cam1")
+    with metrics.stage("detect"):
+        pass
+    metrics.add("queue", 0.002)
+    metrics.end()
+    metrics.add("queue", 0.002)
+
+    snapshot = metrics.snapshot("cam1")
+    assert list(snapshot) == ["queue", "detect"]
+    assert snapshot["queue"]["count"] == 1
+    assert set(snapshot["detect"]) == {"p50", "p95", "p99", "count", "sum"}
+
+
+def test_prometheus_text():
+    metrics = PipelineMetrics()
+    metrics.record("cam1", "detect", 0.05)
+    stats = {"cam1": CameraStats(frames_analysed=3, fps=2.5)}
+
+    text = prometheus_text(metrics, stats, {"cam1": 'Entrée "A"'})
+    labels = 'camera="cam1",name="Entrée \\"A\\""'
+    assert "# TYPE face_recognition_stage_latency_seconds summary" in text
+    assert f'face_recognition_stage_latency_seconds{{{labels},stage="detect",quantile="0.99"}}' in text
+    assert f'face_recognition_stage_latency_seconds_count{{{labels},stage="detect"}} 1' in text
+    assert f"face_recognition_frames_analysed_total{{{labels}}} 3" in text
+    assert f"face_recognition_fps{{{labels}}} 2.5" in text
+    assert text.endswith("\n")
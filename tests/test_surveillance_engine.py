@@ -0,0 +1,262 @@
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+from face_recognition_app.services import face_detectors
+from face_recognition_app.services.camera_manager import CameraManager
+from face_recognition_app.services.camera_source import CameraConfig
+from face_recognition_app.services.detection_calibrator import DetectionCalibrator
+from face_recognition_app.services.face_detectors import FaceDetector
+from face_recognition_app.services.face_tracker import FaceTracker
+from face_recognition_app.services.frame import Frame
+from face_recognition_app.services.inference_pool import encode_faces_batch
+from face_recognition_app.services.surveillance_engine import CameraStats, SurveillanceEngine, detection_crops
+from face_recognition_app.storage.profile_store import SurveillanceProfile
+
+
+class _ScriptedDetector(FaceDetector):
+    """Détecteur "scripted" : boîtes fixes de l'image analysée ; note la taille de chaque image reçue."""
+
+    name = "scripted"
+
+    def __init__(self):
+        super().__init__()
+        self.boxes = []
+        self.calls = []
+
+    def detect(self, rgb, upsample=1):
+        self.calls.append(rgb.shape[:2])
+        return list(self.boxes)
+
+
+@pytest.fixture
+def detector(monkeypatch):
+    scripted = _ScriptedDetector()
+    monkeypatch.setitem(face_detectors._detectors, "scripted", scripted)
+    return scripted
+
+
+@pytest.fixture
+def manager(tmp_path):
+    # Hors du dossier du store (tmp_path) : cameras.json y passerait pour un encodage
+    folder = tmp_path / "config"
+    folder.mkdir()
+    return CameraManager(folder / "cameras.json")
+
+
+def _camera(manager, **options):
+    config = CameraConfig(name="Entrée", source_type="webcam", source=0, detection_model="scripted", **options)
+    manager.add_camera(config)
+    return config
+
+
+def _scene(height=240, width=320, face=(100, 180, 180, 100)):
+    """Fond uni et un visage texturé (top, right, bottom, left) immobile."""
+    image = np.full((height, width, 3), 90, dtype=np.uint8)
+    top, right, bottom, left = face
+    image[top:bottom, left:right] = np.random.default_rng(0).integers(0, 255, size=(bottom - top, right - left, 3))
+    return image
+
+
+def _analyse(engine, config, image, tracker=None):
+    engine._metrics.begin(config.uid)
+    try:
+        engine._analyse_frame(config.uid, Frame(image), config, None, tracker)
+    finally:
+        engine._metrics.end()
+
+
+# ── Galeries et shards ────────────────────────────────────────────────────────
+
+def test_profile_selects_shards(tmp_store, manager):
+    tmp_store.save_face_encoding("Alice", np.zeros(128))
+    tmp_store.save_face_encoding("Suspect", np.ones(128), shard="watchlist")
+    tmp_store.save_face_encoding("Autre", np.full(128, 2.0), shard="site-b")
+
+    engine = SurveillanceEngine(manager)
+    engine.apply_profile(SurveillanceProfile(name="p", label="p", target_persons=["Suspect"]))
+    engine._sync_encodings()
+    assert sorted(engine._matchers) == ["default", "watchlist"]
+
+    engine.apply_profile(SurveillanceProfile(name="p", label="p", encoding_shards=["site-b"]))
+    engine._sync_encodings()
+    assert sorted(engine._matchers) == ["site-b"]
+
+
+def test_camera_shards_override_profile(tmp_store, manager):
+    tmp_store.save_face_encoding("Alice", np.zeros(128))
+    tmp_store.save_face_encoding("Suspect", np.ones(128), shard="watchlist")
+    gate = _camera(manager, encoding_shards=["watchlist"])
+
+    engine = SurveillanceEngine(manager)
+    engine.apply_profile(SurveillanceProfile(name="p", label="p", encoding_shards=["default"]))
+    engine._sync_encodings()
+
+    assert [m.names for m in engine._matchers_for(gate)] == [["Suspect"]]
+    assert [m.names for m in engine._matchers_for(None)] == [["Alice"]]
+
+    tmp_store.save_face_encoding("Bob", np.full(128, 3.0))
+    engine._sync_encodings()
+    assert engine._matchers_for(None)[0].names == ["Alice", "Bob"]
+
+
+def test_enrolment_syncs_in_watcher_thread(tmp_store, manager):
+    tmp_store.save_face_encoding("Alice", np.zeros(128))
+    engine = SurveillanceEngine(manager)
+    engine._sync_encodings()
+
+    synced = threading.Event()
+    sync_threads = []
+    real_sync = engine._sync_encodings
+
+    def sync():
+        sync_threads.append(threading.current_thread().name)
+        real_sync()
+        synced.set()
+
+    engine._sync_encodings = sync
+    watcher = threading.Thread(target=engine._encodings_watch_loop, name="surv-encodings")
+    watcher.start()
+    tmp_store.add_change_listener(engine._on_encodings_changed)
+    try:
+        tmp_store.save_face_encoding("Bob", np.ones(128))
+        assert synced.wait(2.0)
+    finally:
+        tmp_store.remove_change_listener(engine._on_encodings_changed)
+        engine._encodings_stop.set()
+        engine._encodings_changed.set()
+        watcher.join(2.0)
+    assert sync_threads == ["surv-encodings"]
+    assert sorted(engine._matchers["default"].names) == ["Alice", "Bob"]
+
+
+# ── Suivi ─────────────────────────────────────────────────────────────────────
+
+def test_tracked_face_is_detected_periodically_and_encoded_once(tmp_store, manager, detector):
+    config = _camera(manager)   # réduction 0.5 : visage en (50, 90, 90, 50)
+    scene = _scene()
+    detector.boxes = [(50, 90, 90, 50)]
+    small = cv2.cvtColor(cv2.resize(scene, (0, 0), fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2RGB)
+    tmp_store.save_face_encoding("Alice", encode_faces_batch([(small, detector.boxes)])[0][0])
+
+    engine = SurveillanceEngine(manager)
+    engine._sync_encodings()
+    events = []
+    engine.add_event_listener(events.append)
+    tracker = FaceTracker(redetect_every=3)
+    for _ in range(6):
+        _analyse(engine, config, scene, tracker)
+
+    # Détection aux frames 1 et 4, suivi entre les deux ; un seul encodage
+    assert len(detector.calls) == 2
+    assert engine._metrics.snapshot(config.uid)["encode"]["count"] == 1
+    faces = [event.faces[0] for event in events]
+    assert [f.name for f in faces] == ["Alice"] * 6
+    assert {f.location for f in faces} == {(100, 180, 180, 100)}
+    assert len({f.track_id for f in faces}) == 1
+
+
+# ── Zones en mouvement ────────────────────────────────────────────────────────
+
+def test_detection_crops_follow_motion_regions():
+    shape = (240, 320, 3)   # frame réduite d'une image 640×480
+    crops = detection_crops(shape, [(100, 100, 80, 80), (500, 300, 40, 40)])
+    assert len(crops) == 2
+    y0, x0, y1, x1 = crops[0]
+    assert (y0, x0) == (40, 40) and (y1, x1) == (100, 100)
+
+    # Zones couvrant presque toute l'image → frame entière
+    assert detection_crops(shape, [(0, 0, 600, 460)]) is None
+
+
+def test_motion_region_limits_detection_to_its_crop(tmp_store, manager, detector):
+    config = _camera(manager)
+    engine = SurveillanceEngine(manager)
+    detector.boxes = [(5, 25, 25, 5)]   # dans la découpe reçue
+
+    faces = engine._process_frame(_scene(), config, regions=[(100, 100, 80, 80)])
+    assert detector.calls == [(60, 60)]
+    # Découpe (40, 40)–(100, 100) de la frame réduite, ramenée en pleine résolution
+    assert [f.location for f in faces] == [(90, 130, 130, 90)]
+
+    engine._process_frame(_scene(), config)
+    assert detector.calls[-1] == (120, 160)
+
+
+# ── Calibration ───────────────────────────────────────────────────────────────
+
+def test_calibrated_settings_saved_and_applied(tmp_store, manager, detector):
+    config = _camera(manager, auto_calibrate=True)
+    engine = SurveillanceEngine(manager)
+    engine._calibrators[config.uid] = DetectionCalibrator(samples=2)
+    scene = _scene(480, 640, face=(40, 440, 440, 40))
+    detector.boxes = [(40, 440, 440, 40)]   # grand visage, à la pleine résolution de calibration
+
+    for _ in range(2):
+        _analyse(engine, config, scene)
+    assert detector.calls == [(480, 640)] * 2
+
+    saved = CameraManager(manager._file).get_config(config.uid)
+    assert (saved.detection_scale, saved.detection_upsample, saved.auto_calibrate) == (0.25, 0, False)
+    _analyse(engine, config, scene)
+    assert detector.calls[-1] == (120, 160)
+
+
+def test_stationary_tracked_face_fills_one_calibration_sample(tmp_store, manager, detector):
+    config = _camera(manager, auto_calibrate=True)
+    engine = SurveillanceEngine(manager)
+    engine._calibrators[config.uid] = DetectionCalibrator(samples=2)
+    scene = _scene(480, 640, face=(40, 440, 440, 40))
+    detector.boxes = [(40, 440, 440, 40)]
+
+    tracker = FaceTracker(redetect_every=2)
+    for _ in range(6):
+        _analyse(engine, config, scene, tracker)
+    assert len(detector.calls) == 3
+    assert config.auto_calibrate and config.uid in engine._calibrators
+
+
+# ── Mesures et frames partagées ───────────────────────────────────────────────
+
+def test_stage_latencies_in_stats(tmp_store, manager, detector):
+    config = _camera(manager)
+    engine = SurveillanceEngine(manager)
+    engine.stats[config.uid] = CameraStats()
+    detector.boxes = [(50, 90, 90, 50)]
+
+    _analyse(engine, config, _scene())
+
+    latency = engine.get_stats(config.uid).latency
+    assert latency["resize"]["count"] == latency["detect"]["count"] == 1
+    assert "p95" in latency["resize"]
+    assert 'stage="detect"' in engine.prometheus_metrics()
+
+
+def test_read_only_frame_analysed_without_copy(tmp_store, manager, detector):
+    config = _camera(manager)
+    engine = SurveillanceEngine(manager)
+    events = []
+    engine.add_event_listener(events.append)
+    detector.boxes = [(50, 90, 90, 50)]
+
+    frame = Frame(np.zeros((240, 320, 3), dtype=np.uint8))
+    assert engine._analyse_frame(config.uid, frame, config, None, None)
+    assert events[0].frame.flags.writeable and events[0].frame.any()
+    assert not frame.image.any()   # annotations sur une copie
+
+
+def test_dropped_and_duplicate_frames_counted(manager):
+    engine = SurveillanceEngine(manager)
+    engine.stats["cam1"] = CameraStats()
+
+    def frame(seq):
+        return Frame(np.zeros((2, 2), dtype=np.uint8), seq)
+
+    assert engine._accept_frame("cam1", frame(5), 0)        # première frame : pas d'écart
+    assert engine._accept_frame("cam1", frame(8), 5)        # 6 et 7 jamais vues
+    assert not engine._accept_frame("cam1", frame(8), 8)    # doublon
+    assert engine._accept_frame("cam1", frame(1), 8)        # source redémarrée
+    stats = engine.get_stats("cam1")
+    assert (stats.frames_dropped, stats.frames_duplicate) == (2, 1)